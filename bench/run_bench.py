@@ -0,0 +1,203 @@
+"""Offline benchmarks: micro-benchmarks of the hot helpers, each provider against a
+simulated store, and ``run_all.py`` end to end against one store of every kind.
+
+    python bench/run_bench.py                               # sizes 100,1000
+    python bench/run_bench.py --sizes 100,10000,100000 --latency-ms 20 --rate-429 0.02
+    python bench/run_bench.py --out bench/results.json --baseline bench/baseline.json
+
+Reports requests/s, product pages parsed/s, peak RSS and wall time. With
+``--baseline`` (a previous ``--out`` file) any metric that got worse by more than
+``--tolerance`` is listed and the exit code is 1.
+"""
+import argparse, json, os, resource, subprocess, sys, tempfile, time, timeit
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scraper"))  # run_all.py's import layout
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import yaml
+
+from store_sim import KINDS, SimulatedStore, Store, product
+from util import parse_price_any, norm_name
+from providers.base import HttpClient, soup_from, guess_price
+from providers.extract import extract_product
+from providers.rate_limit import HostRateLimiter
+from providers.telemetry import configure_telemetry
+from providers.shopify_sitemap import ShopifySitemapProvider
+from providers.woocommerce_store_api import WooCommerceStoreApiProvider
+from providers.generic_sitemap import GenericSitemapProvider
+from providers.heuristic_catalog import HeuristicCatalogProvider
+
+PROVIDERS = {"shopify": ShopifySitemapProvider, "woo": WooCommerceStoreApiProvider, "generic": GenericSitemapProvider,
+             "catalog": HeuristicCatalogProvider}
+# Higher is better for these; every other metric (wall_s, peak_rss_mb, us_per_op) is lower-is-better
+THROUGHPUT = ("ops_per_s", "requests_per_s", "pages_per_s")
+
+
+class _Resp:
+    """Just enough of ``requests.Response`` for ``soup_from``."""
+    def __init__(self, text: str):
+        self.text = text
+
+
+def micro(seconds: float) -> Dict[str, Dict]:
+    html = Store("shopify", 1).product_page("http://sim", product(0)).decode()
+    soup = soup_from(_Resp(html))
+    cases = {
+        "parse_price_any": lambda: parse_price_any("Sale price EGP 1,250.00 Regular price 1,499.00"),
+        "norm_name": lambda: norm_name("Logitech G102 LIGHTSYNC – Gaming Mouse (Black) | فأرة"),
+        "guess_price": lambda: guess_price(soup),
+        "soup_from": lambda: soup_from(_Resp(html)),
+        "extract_product": lambda: extract_product(html, "http://sim/products/x", "sim"),
+    }
+    out = {}
+    for name, fn in cases.items():
+        n, t = timeit.Timer(fn).autorange()  # calls per ~0.2s
+        reps = max(1, int(n * seconds / max(t, 1e-9)))
+        t = min(timeit.Timer(fn).repeat(repeat=3, number=reps)) / reps
+        out[name] = {"ops_per_s": round(1 / t, 1), "us_per_op": round(t * 1e6, 2)}
+    return out
+
+
+def client(rps: float) -> HttpClient:
+    return HttpClient(timeout=30, rate_limiter=HostRateLimiter(rps=rps, burst=rps), max_retries=3)
+
+
+def providers(sizes: List[int], store_opts: Dict, rps: float) -> Dict[str, Dict]:
+    out = {}
+    for kind in KINDS:
+        for n in sizes:
+            with SimulatedStore(kind, n, **store_opts) as store:
+                telemetry = configure_telemetry()
+                prov = PROVIDERS[kind](store.base_url, client(rps))
+                t0 = time.perf_counter()
+                items = prov.search([])
+                wall = time.perf_counter() - t0
+                stats = store.stats()
+            pages = sum(s["parse_pages"] for s in telemetry.report().values())
+            out[f"{kind}-{n}"] = {"provider": type(prov).__name__, "items": len(items), "requests": stats["requests"] - 1,
+                                  "throttled": stats["throttled"], "wall_s": round(wall, 2),
+                                  "requests_per_s": round((stats["requests"] - 1) / wall, 1), "pages_per_s": round(pages / wall, 1)}
+    return out
+
+
+def end_to_end(sizes: List[int], store_opts: Dict, rps: float, concurrency: int) -> Dict[str, Dict]:
+    with open(os.path.join(ROOT, "scraper", "scrape_config.yaml"), "r", encoding="utf-8") as f:
+        cfg = yaml.safe_load(f) or {}
+    # Measure the scraper, not politeness: let the limiter run at `rps` per host
+    cfg["rate_limit"] = {**(cfg.get("rate_limit") or {}), "rps": rps, "burst": rps, "max_retries": 3, "hosts": {}}
+    out = {}
+    for n in sizes:
+        stores = [SimulatedStore(kind, n, **store_opts) for kind in KINDS]
+        with tempfile.TemporaryDirectory(prefix="bench-") as work:
+            try:
+                for s in stores:
+                    s.__enter__()
+                with open(os.path.join(work, "sites.txt"), "w") as f:
+                    f.write("\n".join(s.base_url for s in stores) + "\n")
+                with open(os.path.join(work, "config.yaml"), "w") as f:
+                    yaml.safe_dump(cfg, f)
+                os.makedirs(os.path.join(work, "web"))
+                cmd = [sys.executable, os.path.join(ROOT, "scraper", "run_all.py"), "--sites-file", "sites.txt", "--config", "config.yaml",
+                       "--dynamic-mode", "never", "--site-concurrency", str(concurrency)]
+                t0 = time.perf_counter()
+                with open(os.path.join(work, "run.log"), "w") as log:
+                    proc = subprocess.Popen(cmd, cwd=work, stdout=log, stderr=subprocess.STDOUT)
+                    # wait4 gives this child's own peak RSS (RUSAGE_CHILDREN would be the max over all runs)
+                    _, status, usage = os.wait4(proc.pid, 0)
+                    proc.returncode = os.waitstatus_to_exitcode(status)
+                wall = time.perf_counter() - t0
+                if proc.returncode != 0:
+                    with open(os.path.join(work, "run.log")) as f:
+                        raise RuntimeError(f"run_all.py exited with {proc.returncode}:\n{f.read()[-2000:]}")
+                requests_ = sum(s.stats()["requests"] - 1 for s in stores)
+                throttled = sum(s.stats()["throttled"] for s in stores)
+            finally:
+                for s in stores:
+                    s.__exit__(None, None, None)
+            with open(os.path.join(work, "data", "run_report.json"), "r", encoding="utf-8") as f:
+                report = json.load(f)
+        pages = sum(s.get("parse_pages", 0) for s in report.get("telemetry", {}).values())
+        out[str(n)] = {"stores": len(stores), "items": report.get("total_raw"), "requests": requests_, "throttled": throttled,
+                       "wall_s": round(wall, 2), "requests_per_s": round(requests_ / wall, 1), "pages_per_s": round(pages / wall, 1),
+                       "peak_rss_mb": round(usage.ru_maxrss / 1024, 1)}  # ru_maxrss is KiB on Linux
+    return out
+
+
+def regressions(result: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    found = []
+    for section in ("micro", "providers", "e2e"):
+        for key, metrics in (result.get(section) or {}).items():
+            base = (baseline.get(section) or {}).get(key) or {}
+            for m, v in metrics.items():
+                b = base.get(m)
+                if not isinstance(v, (int, float)) or not isinstance(b, (int, float)) or not b or m in ("items", "requests", "throttled", "stores"):
+                    continue
+                worse = (b - v) / b if m in THROUGHPUT else (v - b) / b
+                if worse > tolerance:
+                    found.append(f"{section}/{key} {m}: {b} -> {v} ({worse:+.0%} worse)")
+    return found
+
+
+def print_table(title: str, rows: Dict[str, Dict]):
+    if not rows:
+        return
+    cols = list(dict.fromkeys(c for r in rows.values() for c in r))
+    print(f"\n== {title}")
+    width = max(len(k) for k in rows) + 2
+    print("".ljust(width) + "".join(c.rjust(16) for c in cols))
+    for key, r in rows.items():
+        print(key.ljust(width) + "".join(str(r.get(c, "")).rjust(16) for c in cols))
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--sizes", default="100,1000", help="Catalog sizes, comma separated (100 .. 100000)")
+    p.add_argument("--only", default="micro,providers,e2e", help="Subset of micro,providers,e2e")
+    p.add_argument("--latency-ms", type=float, default=5.0)
+    p.add_argument("--jitter-ms", type=float, default=5.0)
+    p.add_argument("--rate-429", type=float, default=0.01, help="Fraction of requests the stores throttle")
+    p.add_argument("--page-kb", type=int, default=40, help="Approximate product page size")
+    p.add_argument("--rps", type=float, default=500.0, help="Per-host rate limit for the scraper under test")
+    p.add_argument("--site-concurrency", type=int, default=3)
+    p.add_argument("--micro-seconds", type=float, default=1.0, help="Time per micro-benchmark repeat")
+    p.add_argument("--out", default=None, help="Write results as JSON")
+    p.add_argument("--baseline", default=None, help="Previous --out file to compare against")
+    p.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before a metric counts as a regression")
+    a = p.parse_args()
+    sizes = [int(s) for s in a.sizes.split(",") if s.strip()]
+    only = set(a.only.split(","))
+    store_opts = {"latency_ms": a.latency_ms, "jitter_ms": a.jitter_ms, "rate_429": a.rate_429, "page_kb": a.page_kb}
+
+    result: Dict = {"python": sys.version.split()[0], "sizes": sizes, "store": store_opts}
+    t0 = time.perf_counter()
+    if "micro" in only:
+        result["micro"] = micro(a.micro_seconds)
+        print_table("micro-benchmarks", result["micro"])
+    if "providers" in only:
+        result["providers"] = providers(sizes, store_opts, a.rps)
+        print_table("providers (in process)", result["providers"])
+    if "e2e" in only:
+        result["e2e"] = end_to_end(sizes, store_opts, a.rps, a.site_concurrency)
+        print_table("run_all.py end to end (one store of each kind)", result["e2e"])
+    result["bench_wall_s"] = round(time.perf_counter() - t0, 1)
+    result["bench_peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(f"\nbenchmark wall time {result['bench_wall_s']}s, harness peak RSS {result['bench_peak_rss_mb']} MB")
+
+    if a.out:
+        os.makedirs(os.path.dirname(os.path.abspath(a.out)), exist_ok=True)
+        with open(a.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if a.baseline:
+        with open(a.baseline, "r", encoding="utf-8") as f:
+            found = regressions(result, json.load(f), a.tolerance)
+        print("\nregressions vs baseline:" if found else "\nno regressions vs baseline")
+        for line in found:
+            print("  " + line)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
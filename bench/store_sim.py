@@ -0,0 +1,288 @@
+"""Local HTTP simulator of the store types the scraper handles, for offline benchmarks.
+
+``shopify``: ``/products.json`` pagination, a sitemap index with plain children and
+``/products/<handle>`` pages with OG price tags. ``woo``: the Store API
+(``/wp-json/wc/store/v1/products`` with ``X-WP-TotalPages``), a Yoast-style sitemap
+index and ``/product/<slug>/`` pages. ``generic``: no API, a sitemap index with
+``.xml.gz`` children and ``/item/<id>-<slug>`` pages that carry either JSON-LD or
+only a price element. ``catalog``: no API or sitemap, only ``/shop?page=N`` grids of
+product cards (every 10th without a price) linking to ``/p/<id>-<slug>`` pages. Catalogs are generated on the fly from the product index, so
+100k products cost no memory. Every response waits ``latency_ms`` (+ jitter) and
+every ``1 / rate_429``-th request is answered 429 with ``Retry-After: 0``.
+
+Standalone: ``python bench/store_sim.py --kind generic --products 10000 --port 8001``
+"""
+import argparse, gzip, json, random, threading, time
+import multiprocessing as mp
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+KINDS = ("shopify", "woo", "generic", "catalog")
+CARDS_PER_PAGE = 24
+SITEMAP_CHUNK = 5000  # URLs per child sitemap (Shopify uses 5000 too)
+BRANDS = ["Logitech", "Razer", "HyperX", "Redragon", "SteelSeries", "Corsair", "Fantech", "Marvo", "Havit", "Glorious"]
+# (product type, gaming accessory?) - the off-topic ones exercise the filters
+TYPES = [("Gaming Mouse", True), ("Mechanical Keyboard", True), ("Gaming Headset", True), ("Mouse Pad XL", True),
+         ("Wireless Controller", True), ("Racing Wheel", True), ("Gaming Chair", False), ("USB Hub", False),
+         ("Phone Case", False), ("HDMI Cable", False)]
+
+
+def product(i: int) -> Dict:
+    brand, (kind, _) = BRANDS[i % len(BRANDS)], TYPES[(i // len(BRANDS)) % len(TYPES)]
+    name = f"{brand} {kind} {'GKMHX'[i % 5]}{100 + (i * 7) % 900}"
+    slug = name.lower().replace(" ", "-")
+    return {"i": i, "name": name, "slug": f"{slug}-{i}", "brand": brand, "type": kind, "price": 150 + (i * 37) % 4000}
+
+
+def _filler(kb: int) -> Tuple[str, str]:
+    """Header / footer boilerplate so pages cost about as much to parse as real ones."""
+    block = "".join(f'<li class="menu-item"><a href="/collections/c{j}">Category {j}</a></li>' for j in range(20))
+    unit = f'<nav class="site-nav"><ul>{block}</ul></nav><div class="promo"><p>{"Free delivery in Cairo and Giza. " * 8}</p></div>'
+    n = max(2, kb * 1024 // len(unit))
+    return unit * (n // 2), unit * (n - n // 2)
+
+
+class Store:
+    def __init__(self, kind: str, products: int, latency_ms: float = 0, jitter_ms: float = 0, rate_429: float = 0,
+                 page_kb: int = 40):
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}")
+        self.kind = kind
+        self.products = products
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.every_429 = int(round(1 / rate_429)) if rate_429 > 0 else 0
+        self.header, self.footer = _filler(page_kb)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "bytes": 0}
+
+    # -- URLs ----------------------------------------------------------------
+    def page_path(self, p: Dict) -> str:
+        if self.kind == "shopify":
+            return f"/products/{p['slug']}"
+        if self.kind == "woo":
+            return f"/product/{p['slug']}/"
+        if self.kind == "catalog":
+            return f"/p/{p['i']}-{p['slug']}"
+        return f"/item/{p['i']}-{p['slug']}"
+
+    def child_path(self, k: int) -> str:
+        return {"shopify": f"/sitemap_products_{k + 1}.xml", "woo": f"/product-sitemap{k + 1}.xml"}.get(self.kind, f"/sitemaps/products-{k + 1}.xml.gz")
+
+    def index_of(self, path: str) -> Optional[int]:
+        head = {"shopify": "/products/", "woo": "/product/", "generic": "/item/", "catalog": "/p/"}[self.kind]
+        if not path.startswith(head):
+            return None
+        tail = path[len(head):].strip("/")
+        num = tail.split("-", 1)[0] if self.kind in ("generic", "catalog") else tail.rsplit("-", 1)[-1]
+        return int(num) if num.isdigit() and int(num) < self.products else None
+
+    # -- bodies --------------------------------------------------------------
+    def sitemap_index(self, base: str) -> bytes:
+        n = (self.products + SITEMAP_CHUNK - 1) // SITEMAP_CHUNK
+        kids = "".join(f"<sitemap><loc>{base}{self.child_path(k)}</loc></sitemap>" for k in range(n))
+        return ('<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f"{kids}<sitemap><loc>{base}/sitemap_pages_1.xml</loc></sitemap></sitemapindex>").encode()
+
+    def sitemap_child(self, base: str, k: int) -> bytes:
+        rows = []
+        for i in range(k * SITEMAP_CHUNK, min(self.products, (k + 1) * SITEMAP_CHUNK)):
+            p = product(i)
+            rows.append(f"<url><loc>{base}{self.page_path(p)}</loc><lastmod>2026-{1 + i % 12:02d}-{1 + i % 28:02d}</lastmod>"
+                        f"<image:image><image:loc>{base}/cdn/{i}.jpg</image:loc><image:title>{p['name']}</image:title></image:image></url>")
+        body = ('<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" '
+                'xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">' + "".join(rows) + "</urlset>").encode()
+        return gzip.compress(body) if self.kind == "generic" else body
+
+    def pages_sitemap(self, base: str) -> bytes:
+        locs = "".join(f"<url><loc>{base}/pages/{s}</loc></url>" for s in ("about", "contact", "shipping", "returns"))
+        return f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{locs}</urlset>'.encode()
+
+    def product_page(self, base: str, p: Dict) -> bytes:
+        url = base + self.page_path(p)
+        ld = json.dumps({"@context": "https://schema.org", "@type": "Product", "name": p["name"], "image": f"{base}/cdn/{p['i']}.jpg",
+                         "brand": {"@type": "Brand", "name": p["brand"]},
+                         "offers": {"@type": "Offer", "price": f"{p['price']:.2f}", "priceCurrency": "EGP", "url": url}})
+        head = [f"<title>{p['name']} | Sim {self.kind}</title>", f'<meta property="og:title" content="{p["name"]}">',
+                f'<meta property="og:image" content="{base}/cdn/{p["i"]}.jpg">']
+        if self.kind == "shopify":
+            head.append(f'<meta property="product:price:amount" content="{p["price"]:,.2f}"><meta property="product:price:currency" content="EGP">')
+        if self.kind not in ("generic", "catalog") or p["i"] % 2 == 0:
+            head.append(f'<script type="application/ld+json">{ld}</script>')
+        if self.kind == "woo":
+            price = f'<p class="price"><span class="woocommerce-Price-amount amount"><bdi>{p["price"]:,.2f}&nbsp;EGP</bdi></span></p>'
+        else:
+            price = f'<div class="product__price"><span class="price-item">EGP {p["price"]:,}</span></div>'
+        return (f'<!doctype html><html lang="en"><head><meta charset="utf-8">{"".join(head)}</head><body>{self.header}'
+                f'<main><h1 class="product-title">{p["name"]}</h1>{price}<div class="desc"><p>{p["type"]} by {p["brand"]}.</p></div></main>'
+                f"{self.footer}</body></html>").encode()
+
+    def listing_page(self, page: int) -> Optional[bytes]:
+        first = (page - 1) * CARDS_PER_PAGE
+        if page < 1 or first >= self.products:
+            return None
+        cards = []
+        for p in map(product, range(first, min(self.products, first + CARDS_PER_PAGE))):
+            price = "" if p["i"] % 10 == 9 else f'<span class="price">EGP {p["price"]:,}</span>'
+            cards.append(f'<li class="product-card"><a href="{self.page_path(p)}"><img src="/cdn/{p["i"]}.jpg" alt="{p["name"]}">'
+                         f'<h3 class="card-title">{p["name"]}</h3></a>{price}<a class="add-to-cart" href="/cart/add?id={p["i"]}">Add</a></li>')
+        last = (self.products + CARDS_PER_PAGE - 1) // CARDS_PER_PAGE
+        nxt = f'<a class="next" rel="next" href="/shop?page={page + 1}">Next</a>' if page < last else ""
+        return (f'<!doctype html><html><head><title>Shop - page {page}</title></head><body>{self.header}'
+                f'<ul class="products">{"".join(cards)}</ul><nav class="pagination">{nxt}</nav>{self.footer}</body></html>').encode()
+
+    def home_page(self, base: str) -> bytes:
+        links = "".join(f'<a href="{self.page_path(product(i))}">{product(i)["name"]}</a>' for i in range(min(60, self.products)))
+        # The platform markers real storefronts carry (what the scraper fingerprints)
+        marker = {"shopify": '<script src="//cdn.shopify.com/s/files/1/theme.js"></script>',
+                  "woo": '<meta name="generator" content="WooCommerce 8.9.1">'}.get(self.kind, "")
+        return f"<!doctype html><html><head><title>Sim {self.kind}</title>{marker}</head><body>{self.header}<main>{links}</main></body></html>".encode()
+
+    def shopify_json(self, base: str, q: Dict) -> bytes:
+        limit, page = int(q.get("limit", ["30"])[0]), int(q.get("page", ["1"])[0])
+        rows = [{"title": p["name"], "handle": p["slug"], "vendor": p["brand"], "product_type": p["type"],
+                 "variants": [{"price": f"{p['price']:.2f}", "available": True}], "images": [{"src": f"{base}/cdn/{p['i']}.jpg"}]}
+                for p in map(product, range((page - 1) * limit, min(self.products, page * limit)))]
+        return json.dumps({"products": rows}).encode()
+
+    def woo_json(self, base: str, q: Dict) -> Tuple[bytes, int]:
+        per_page, page = int(q.get("per_page", ["10"])[0]), int(q.get("page", ["1"])[0])
+        rows = [{"id": p["i"], "name": p["name"], "permalink": base + self.page_path(p),
+                 "prices": {"price": str(p["price"] * 100), "currency_code": "EGP", "currency_minor_unit": 2},
+                 "images": [{"src": f"{base}/cdn/{p['i']}.jpg"}], "categories": [{"name": "Gaming"}, {"name": p["type"]}]}
+                for p in map(product, range((page - 1) * per_page, min(self.products, page * per_page)))]
+        return json.dumps(rows).encode(), (self.products + per_page - 1) // per_page
+
+    def respond(self, base: str, raw_path: str) -> Tuple[int, str, bytes, Dict[str, str]]:
+        u = urlparse(raw_path)
+        path, q = u.path, parse_qs(u.query)
+        if path == "/__stats":
+            with self.lock:
+                return 200, "application/json", json.dumps(self.stats).encode(), {}
+        if path in ("/", ""):
+            headers = {"shopify": {"X-ShopId": "1"}, "woo": {"Link": f'<{base}/wp-json/>; rel="https://api.w.org/"'}}.get(self.kind, {})
+            return 200, "text/html; charset=utf-8", self.home_page(base), headers
+        if self.kind == "catalog":
+            if path == "/shop":
+                body = self.listing_page(int(q.get("page", ["1"])[0]))
+                if body is not None:
+                    return 200, "text/html; charset=utf-8", body, {}
+            i = self.index_of(path)
+            if i is not None:
+                return 200, "text/html; charset=utf-8", self.product_page(base, product(i)), {}
+            return 404, "text/html", b"<html><body>Not found</body></html>", {}
+        if path == "/sitemap.xml":
+            return 200, "application/xml", self.sitemap_index(base), {}
+        if path == "/sitemap_pages_1.xml":
+            return 200, "application/xml", self.pages_sitemap(base), {}
+        for k in range((self.products + SITEMAP_CHUNK - 1) // SITEMAP_CHUNK):
+            if path == self.child_path(k):
+                return 200, "application/x-gzip" if path.endswith(".gz") else "application/xml", self.sitemap_child(base, k), {}
+        if self.kind == "shopify" and path == "/products.json":
+            return 200, "application/json", self.shopify_json(base, q), {}
+        if self.kind == "woo" and path == "/wp-json/wc/store/v1/products":
+            body, pages = self.woo_json(base, q)
+            return 200, "application/json", body, {"X-WP-TotalPages": str(pages)}
+        i = self.index_of(path)
+        if i is not None:
+            return 200, "text/html; charset=utf-8", self.product_page(base, product(i)), {}
+        return 404, "text/html", b"<html><body>Not found</body></html>", {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like real stores
+    disable_nagle_algorithm = True  # headers and body are separate writes; avoid delayed-ACK stalls
+
+    def do_GET(self):
+        store: Store = self.server.store
+        if store.latency_ms or store.jitter_ms:
+            time.sleep((store.latency_ms + random.uniform(0, store.jitter_ms)) / 1000)
+        with store.lock:
+            store.stats["requests"] += 1
+            throttle = store.every_429 and self.path != "/__stats" and store.stats["requests"] % store.every_429 == 0
+            if throttle:
+                store.stats["throttled"] += 1
+        if throttle:
+            status, ctype, body, headers = 429, "text/plain", b"Too Many Requests", {"Retry-After": "0"}
+        else:
+            status, ctype, body, headers = store.respond(f"http://{self.headers.get('Host', 'localhost')}", self.path)
+        with store.lock:
+            store.stats["bytes"] += len(body)
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # clients dropping keep-alive connections at exit is not an error here
+
+
+def make_server(store: Store, port: int = 0) -> ThreadingHTTPServer:
+    srv = _Server(("127.0.0.1", port), _Handler)
+    srv.store = store
+    return srv
+
+
+def _serve(store_kwargs: Dict, port: int, ready):
+    srv = make_server(Store(**store_kwargs), port)
+    ready.put(srv.server_port)
+    srv.serve_forever()
+
+
+class SimulatedStore:
+    """A ``Store`` served from a child process (so it does not compete with the scraper for the GIL).
+
+    Use as a context manager; ``base_url`` is ``http://127.0.0.1:<port>`` and
+    ``stats()`` returns the server-side request / 429 / byte counters.
+    """
+    def __init__(self, kind: str, products: int, **kwargs):
+        self.store_kwargs = dict(kind=kind, products=products, **kwargs)
+        self.proc = None
+        self.base_url = ""
+
+    def __enter__(self) -> "SimulatedStore":
+        ready = mp.Queue()
+        self.proc = mp.Process(target=_serve, args=(self.store_kwargs, 0, ready), daemon=True)
+        self.proc.start()
+        self.base_url = f"http://127.0.0.1:{ready.get(timeout=30)}"
+        return self
+
+    def stats(self) -> Dict[str, int]:
+        return requests.get(self.base_url + "/__stats", timeout=10).json()
+
+    def __exit__(self, *exc):
+        if self.proc is not None:
+            self.proc.terminate()
+            self.proc.join(timeout=10)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Serve a simulated store")
+    p.add_argument("--kind", choices=KINDS, default="generic")
+    p.add_argument("--products", type=int, default=1000)
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--latency-ms", type=float, default=0)
+    p.add_argument("--jitter-ms", type=float, default=0)
+    p.add_argument("--rate-429", type=float, default=0, help="Fraction of requests answered 429")
+    p.add_argument("--page-kb", type=int, default=40)
+    a = p.parse_args()
+    srv = make_server(Store(a.kind, a.products, a.latency_ms, a.jitter_ms, a.rate_429, a.page_kb), a.port)
+    print(f"{a.kind} store with {a.products} products on http://127.0.0.1:{srv.server_port}")
+    srv.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
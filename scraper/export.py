@@ -0,0 +1,294 @@
+import os, re, json, csv
+from datetime import datetime
+from typing import List, Dict, Iterable, Iterator, Optional, Set
+
+try:  # optional: the columnar export is skipped without pyarrow
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from util import norm_name
+from viewer import ViewerBundle
+
+# Desired export columns in exact order
+EXPORT_COLUMNS = ["id", "product name", "product price", "currency", "product url", "site name", "time stamp"]
+ISO_CURRENCY_RE = re.compile(r"[A-Z]{3}")
+
+def to_export_row(it: Dict) -> Dict:
+    """Map internal item -> strict ordered export row with required keys only."""
+    return {
+        "id": it.get("id") or "",
+        "product name": it.get("name") or "",
+        "product price": it.get("price_egp", None),
+        "currency": it.get("currency") or "EGP",
+        "product url": it.get("url") or "",
+        "site name": it.get("source") or "",
+        "time stamp": it.get("scraped_at") or "",
+    }
+
+def from_export_row(row: Dict) -> Dict:
+    """Export row -> internal item (what survives of it: no image or brand)."""
+    return {
+        "id": row.get("id") or None,
+        "name": row.get("product name"),
+        "price_egp": row.get("product price"),
+        "currency": row.get("currency") or "EGP",
+        "url": row.get("product url"),
+        "source": row.get("site name"),
+        "scraped_at": row.get("time stamp"),
+    }
+
+def to_view_row(it: Dict) -> Dict:
+    """Minimal viewer data: keep name, price, url, image, source."""
+    return {
+        "id": it.get("id"),
+        "name": it.get("name"),
+        "price_egp": it.get("price_egp"),
+        "currency": it.get("currency","EGP"),
+        "url": it.get("url"),
+        "image_url": it.get("image_url",""),
+        "source": it.get("source"),
+        "scraped_at": it.get("scraped_at"),
+    }
+
+def clean_items(items: Iterable[Dict], min_price: float, max_price: float) -> Iterator[Dict]:
+    """Clean: price within range, non-empty name, not priced in another currency."""
+    for it in items:
+        price = it.get("price_egp")
+        if price is None:
+            continue
+        # price_egp holds the page's own price; the EGP range means nothing for e.g. a USD one.
+        # Local spellings (LE, ج.م) are not ISO codes and stay in.
+        currency = (it.get("currency") or "EGP").strip().upper()
+        if currency != "EGP" and ISO_CURRENCY_RE.fullmatch(currency):
+            continue
+        if not (min_price <= float(price) <= max_price):
+            continue
+        if not it.get("name"):
+            continue
+        yield it
+
+def dedupe(items: Iterable[Dict], seen: Optional[Set] = None) -> Iterator[Dict]:
+    """Drop repeated (id, source) pairs; pass ``seen`` to dedupe across several calls."""
+    seen = seen if seen is not None else set()
+    for it in items:
+        key=(it.get("id") or norm_name(it.get("name","")), it.get("source",""))
+        if key in seen: continue
+        seen.add(key)
+        yield it
+
+
+class _AtomicFile:
+    """Text file written to ``path.tmp`` and moved into place on close."""
+    def __init__(self, path: str, newline: Optional[str] = None):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.path = path
+        self.f = open(path + ".tmp", "w", encoding="utf-8", newline=newline)
+        self.count = 0
+
+    def close(self):
+        if self.f.closed:
+            return
+        self._finish()
+        self.f.close()
+        os.replace(self.path + ".tmp", self.path)
+
+    def discard(self):
+        """Drop the partial file and leave any previous output untouched."""
+        if not self.f.closed:
+            self.f.close()
+        if os.path.exists(self.path + ".tmp"):
+            os.remove(self.path + ".tmp")
+
+    def _finish(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.discard() if exc_type else self.close()
+
+
+class JsonArrayWriter(_AtomicFile):
+    """Streams a JSON array byte-for-byte identical to ``json.dump(rows, f, ensure_ascii=False, indent=2)``."""
+    def write(self, row: Dict):
+        # JSON strings never contain raw newlines, so re-indenting by line is safe
+        self.f.write(("[\n  " if self.count == 0 else ",\n  ") + json.dumps(row, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+        self.count += 1
+
+    def _finish(self):
+        self.f.write("[]" if self.count == 0 else "\n]")
+
+
+class NdjsonWriter(_AtomicFile):
+    def write(self, row: Dict):
+        self.f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.count += 1
+
+
+class CsvWriter(_AtomicFile):
+    def __init__(self, path: str, fieldnames: List[str] = EXPORT_COLUMNS):
+        super().__init__(path, newline="")
+        self.w = csv.DictWriter(self.f, fieldnames=fieldnames)
+        self.w.writeheader()
+
+    def write(self, row: Dict):
+        self.w.writerow(row)
+        self.count += 1
+
+
+def parquet_supported() -> bool:
+    return pa is not None
+
+
+class ParquetSink:
+    """Columnar copy of the raw export rows, one Parquet file per completed site.
+
+    Files are hive-partitioned as ``<root>/site=<domain>/date=<YYYY-MM-DD>/<scraped_at>.parquet``
+    (readable with ``pyarrow.dataset.dataset(root, partitioning="hive")``, DuckDB or
+    pandas) and keep the ``EXPORT_COLUMNS`` names with a float ``product price``, a
+    UTC ``time stamp`` and dictionary-encoded ``currency`` / ``site name``. The file
+    name comes from the site's scrape time, so re-exporting a resumed site replaces
+    its file instead of duplicating rows.
+    """
+    def __init__(self, root: str):
+        if pa is None:
+            raise RuntimeError("pyarrow is not installed")
+        self.root = root
+        self.files = 0
+        self.rows = 0
+
+    @staticmethod
+    def _timestamp(value: str) -> Optional[datetime]:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+        except ValueError:
+            return None
+
+    def table(self, rows: List[Dict]):
+        col = lambda name: [r[name] for r in rows]
+        return pa.table({
+            "id": pa.array(col("id"), pa.string()),
+            "product name": pa.array(col("product name"), pa.string()),
+            "product price": pa.array([None if p is None else float(p) for p in col("product price")], pa.float64()),
+            "currency": pa.array(col("currency"), pa.string()).dictionary_encode(),
+            "product url": pa.array(col("product url"), pa.string()),
+            "site name": pa.array(col("site name"), pa.string()).dictionary_encode(),
+            "time stamp": pa.array([self._timestamp(t) for t in col("time stamp")], pa.timestamp("us", tz="UTC")),
+        })
+
+    def write_site(self, dom: str, rows: List[Dict]):
+        if not rows:
+            return
+        stamp = max(r["time stamp"] for r in rows) or datetime.utcnow().isoformat() + "Z"
+        part = os.path.join(self.root, f"site={dom}", f"date={stamp[:10]}")
+        os.makedirs(part, exist_ok=True)
+        path = os.path.join(part, stamp.replace(":", "").replace("-", "").replace(".", "") + ".parquet")
+        pq.write_table(self.table(rows), path + ".tmp", compression="zstd", use_dictionary=["currency", "site name"])
+        os.replace(path + ".tmp", path)
+        self.files += 1
+        self.rows += len(rows)
+
+
+def write_rows(path_base: str, rows: Iterable[Dict], formats=("json", "csv")):
+    """Write strict-schema rows to ``<path_base>.<fmt>`` for each format in one pass."""
+    writers = [{"json": JsonArrayWriter, "csv": CsvWriter, "ndjson": NdjsonWriter}[fmt](f"{path_base}.{fmt}") for fmt in formats]
+    try:
+        for row in rows:
+            for w in writers:
+                w.write(row)
+    except BaseException:
+        for w in writers:
+            w.discard()
+        raise
+    for w in writers:
+        w.close()
+
+
+class ExportPipeline:
+    """Streaming output stage fed one completed site at a time.
+
+    Each item is converted to its export row once and written straight to the
+    per-site, combined raw, combined clean and viewer files; the clean filter and
+    dedupe run as generators. Only the dedupe keys and the compact viewer rows
+    (sorted into the ``web/data/bundle`` shards on close) are kept in memory. With
+    ``parquet_dir`` each site's raw rows also go to a ``ParquetSink``.
+    """
+    def __init__(self, min_price: float, max_price: float, data_dir: str = "data", web_dir: str = "web/data",
+                 parquet_dir: Optional[str] = None):
+        self.min_price = min_price
+        self.max_price = max_price
+        self.data_dir = data_dir
+        combined = os.path.join(data_dir, "combined")
+        self.raw = [JsonArrayWriter(f"{combined}/products_raw.json"), CsvWriter(f"{combined}/products_raw.csv"), NdjsonWriter(f"{combined}/products_raw.ndjson")]
+        self.clean = [JsonArrayWriter(f"{combined}/products_clean.json"), CsvWriter(f"{combined}/products_clean.csv"), NdjsonWriter(f"{combined}/products_clean.ndjson")]
+        self.view = JsonArrayWriter(f"{web_dir}/products.json")
+        self.bundle = ViewerBundle(f"{web_dir}/bundle")
+        self.parquet = ParquetSink(parquet_dir) if parquet_dir else None
+        self._seen: Set = set()
+        self.total_raw = 0
+        self.total_clean = 0
+        self.total_groups = 0
+
+    def add_site(self, dom: str, items: List[Dict]):
+        """Per-site exports, then stream the site's items into the combined outputs."""
+        rows = [to_export_row(it) for it in items]
+        write_rows(os.path.join(self.data_dir, "raw", dom), rows)
+        if self.parquet is not None:
+            self.parquet.write_site(dom, rows)
+        self._combine(items, rows)
+
+    def carry_site(self, dom: str) -> int:
+        """Put last run's ``raw/<dom>.json`` rows back into the combined outputs.
+
+        For sites that were not crawled this time (a shard that did not finish); the
+        per-site files and Parquet are left as they are. Returns the row count.
+        """
+        try:
+            with open(os.path.join(self.data_dir, "raw", f"{dom}.json"), "r", encoding="utf-8") as f:
+                rows = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        self._combine([from_export_row(r) for r in rows], rows)
+        return len(rows)
+
+    def _combine(self, items: List[Dict], rows: List[Dict]):
+        for row in rows:
+            for w in self.raw:
+                w.write(row)
+        self.total_raw += len(rows)
+        for it in dedupe(clean_items(items, self.min_price, self.max_price), self._seen):
+            row = to_export_row(it)
+            for w in self.clean:
+                w.write(row)
+            view = to_view_row(it)
+            self.view.write(view)
+            self.bundle.add(view)
+            self.total_clean += 1
+
+    def writers(self):
+        return self.raw + self.clean + [self.view]
+
+    def close(self):
+        for w in self.writers():
+            w.close()
+        self.bundle.close()
+        # Same product sold by several stores (matched on normalized names), cheapest first
+        with JsonArrayWriter(os.path.join(self.data_dir, "combined", "product_groups.json")) as w:
+            for g in self.bundle.groups:
+                w.write(g)
+        self.total_groups = len(self.bundle.groups)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type:
+            for w in self.writers():
+                w.discard()
+        else:
+            self.close()
@@ -0,0 +1,108 @@
+import os, json, time, threading
+from typing import List, Dict, Optional
+
+
+class RunJournal:
+    """Append-only NDJSON progress journal for one (possibly interrupted) run.
+
+    Record types (``t``):
+      ``run``  – start of a fresh run
+      ``url``  – a product page parsed during the run (``site``, ``url``, ``item``)
+      ``site`` – a site finished; its final items follow as the ``items`` list
+      ``done`` – the whole run finished and its outputs were written
+
+    Writes are flushed and fsync'd in batches (every ``fsync_every`` records or
+    ``fsync_seconds``) and always on a ``site`` record, so a killed job loses at
+    most the last batch of parsed URLs and never a completed site.
+    """
+    def __init__(self, path: str, fsync_every: int = 100, fsync_seconds: float = 2.0):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self.sites: Dict[str, List[Dict]] = {}
+        self.urls: Dict[str, Dict[str, Dict]] = {}
+        self.resumed = False
+        self._f = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: str, resume: bool, **kw) -> "RunJournal":
+        """Resume an unfinished journal at ``path`` or start a fresh one."""
+        j = cls(path, **kw)
+        if resume and os.path.exists(path):
+            j._load()
+        if j.resumed:
+            j._f = open(path, "a", encoding="utf-8")
+        else:
+            j.sites, j.urls = {}, {}
+            j._f = open(path, "w", encoding="utf-8")
+            j._append({"t": "run", "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}, sync=True)
+        return j
+
+    def _load(self):
+        finished = False
+        with open(self.path, "r", encoding="utf-8") as f:
+            for ln in f:
+                try:
+                    rec = json.loads(ln)
+                except ValueError:
+                    break  # torn last line from a killed writer
+                t = rec.get("t")
+                if t == "url":
+                    self.urls.setdefault(rec["site"], {})[rec["url"]] = rec["item"]
+                elif t == "site":
+                    self.sites[rec["site"]] = rec["items"]
+                    self.urls.pop(rec["site"], None)
+                elif t == "done":
+                    finished = True
+        # A finished journal has nothing left to resume; the next run starts over
+        self.resumed = not finished
+        if finished:
+            self.sites, self.urls = {}, {}
+        elif os.path.getsize(self.path):
+            # Drop a torn trailing line so appended records start on a fresh line
+            with open(self.path, "rb+") as f:
+                data = f.read()
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _append(self, rec: Dict, sync: bool = False):
+        with self._lock:
+            self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self._pending += 1
+            if sync or self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_seconds:
+                self._sync()
+
+    def _sync(self):
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    # -- recording -----------------------------------------------------------
+    def record_url(self, site: str, url: str, item: Dict):
+        self._append({"t": "url", "site": site, "url": url, "item": item})
+
+    def record_site(self, site: str, items: List[Dict]):
+        self._append({"t": "site", "site": site, "items": items}, sync=True)
+
+    def finish(self):
+        self._append({"t": "done"}, sync=True)
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._f is not None and not self._f.closed:
+                self._sync()
+                self._f.close()
+
+    # -- resume --------------------------------------------------------------
+    def completed(self, site: str) -> Optional[List[Dict]]:
+        return self.sites.get(site)
+
+    def parsed_urls(self, site: str) -> Dict[str, Dict]:
+        return self.urls.get(site, {})
@@ -0,0 +1,88 @@
+import re, zlib, random, hashlib
+from typing import List, Dict, Tuple
+
+from util import norm_name
+
+NUM_PERM = 64
+BANDS = 16            # 16 bands x 4 rows: pairs above ~0.5 Jaccard collide in some band
+THRESHOLD = 0.6       # verified token Jaccard needed to merge two names
+WINDOW = 20           # each bucket member is verified against at most this many earlier members
+MERSENNE = (1 << 61) - 1
+DIGIT_RE = re.compile(r"\d")
+# Words that say nothing about which product it is
+STOP = {"the", "and", "for", "with", "new", "original", "gaming", "edition", "black", "white"}
+
+_rng = random.Random(20240601)
+_PERMS = [(_rng.randrange(1, MERSENNE), _rng.randrange(0, MERSENNE)) for _ in range(NUM_PERM)]
+
+
+def name_tokens(name: str) -> frozenset:
+    return frozenset(t for t in norm_name(name).split() if t not in STOP and (len(t) > 1 or t.isdigit()))
+
+
+def _token_hashes(tok: str) -> Tuple[int, ...]:
+    x = zlib.crc32(tok.encode())
+    return tuple((a * x + b) % MERSENNE for a, b in _PERMS)
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def model_tokens(tokens: frozenset) -> frozenset:
+    """Model numbers and sizes (any token with a digit): G102 vs G203, 16gb vs 32gb."""
+    return frozenset(t for t in tokens if DIGIT_RE.search(t))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def match_names(names: List[str], threshold: float = THRESHOLD, bands: int = BANDS, window: int = WINDOW) -> List[int]:
+    """Group near-identical product names; returns each name's group label (lowest member index).
+
+    Names with the same token set are merged outright. The remaining distinct token
+    sets get MinHash signatures split into ``bands`` LSH buckets (keyed by their model
+    tokens too, which must match exactly), so only colliding sets are compared, each
+    against at most ``window`` earlier bucket members. Work is linear in the input.
+    """
+    rows = NUM_PERM // bands
+    uf = _UnionFind(len(names))
+    first: Dict[frozenset, int] = {}
+    for i, n in enumerate(names):
+        ts = name_tokens(n)
+        if ts:
+            uf.union(i, first.setdefault(ts, i))
+
+    hashes: Dict[str, Tuple[int, ...]] = {}
+    buckets: Dict[Tuple, List[frozenset]] = {}
+    for ts in first:
+        sig = [min(col) for col in zip(*(hashes.get(t) or hashes.setdefault(t, _token_hashes(t)) for t in ts))]
+        models = model_tokens(ts)
+        for band in range(bands):
+            buckets.setdefault((band, models, *sig[band * rows:(band + 1) * rows]), []).append(ts)
+
+    for members in buckets.values():
+        for k in range(1, len(members)):
+            a = members[k]
+            for b in members[max(0, k - window):k]:
+                if uf.find(first[a]) != uf.find(first[b]) and jaccard(a, b) >= threshold:
+                    uf.union(first[a], first[b])
+    return [uf.find(i) for i in range(len(names))]
+
+
+def group_id(member_ids: List[str]) -> str:
+    """Stable while the group's lowest member id is unchanged."""
+    return "g" + hashlib.md5(min(member_ids).encode()).hexdigest()[:11]
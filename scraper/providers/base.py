@@ -1,23 +1,156 @@
-import time, random, requests, re, os
-from typing import Optional
+import requests, re, os, time, threading
+from typing import Optional, List, Dict, Tuple, Iterable
 from bs4 import BeautifulSoup
 
+from .rate_limit import HostRateLimiter
+from .http_cache import HttpCache
+from .pipeline import get_pipeline
+from .budget import BudgetExceeded
+from .health import HostHealth
+from .telemetry import Telemetry, get_telemetry
+
 class HttpClient:
-    def __init__(self, timeout: int = 25, delay_ms: int = 900, user_agent: Optional[str] = None):
-        self.session = requests.Session()
+    """Thread-safe HTTP client shared by all site workers.
+
+    Sessions are pooled: a GET checks one out and returns it, so each session is
+    used by one thread at a time, while keep-alive connections outlive the short-lived
+    fetch threads; ``close`` shuts them down. Politeness is enforced by a
+    per-host token bucket (see ``HostRateLimiter``): a request only waits when its
+    own host is over budget, and 429/503 responses slow that host down and are
+    retried up to ``max_retries`` times. With an ``HttpCache`` attached, plain GETs
+    are served from disk or revalidated conditionally, transparently to providers.
+    Every GET is reported to ``telemetry`` and to ``health``, whose per-host circuit
+    breaker fails requests to a dead host fast (``CircuitOpen``). ``timeout`` is the
+    read timeout; ``connect_timeout`` (when set) bounds the TCP/TLS connect separately.
+    """
+    def __init__(self, timeout: int = 25, delay_ms: int = 900, user_agent: Optional[str] = None,
+                 rate_limiter: Optional[HostRateLimiter] = None, max_retries: int = 2,
+                 cache: Optional[HttpCache] = None, telemetry: Optional[Telemetry] = None,
+                 health: Optional[HostHealth] = None, connect_timeout: Optional[float] = None):
         self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.health = health or HostHealth(failure_threshold=0)
         self.delay_ms = delay_ms
         self.user_agent = user_agent or os.getenv("SCRAPER_USER_AGENT") or "Mozilla/5.0 (compatible; EdithScraper/2.0)"
+        self.rate_limiter = rate_limiter or HostRateLimiter.from_config(None, delay_ms=delay_ms)
+        self.max_retries = max_retries
+        self.cache = cache
+        self.telemetry = telemetry or get_telemetry()
+        self._sessions: List[requests.Session] = []  # idle
+        self._sessions_lock = threading.Lock()
+
+    def _checkout(self) -> requests.Session:
+        with self._sessions_lock:
+            return self._sessions.pop() if self._sessions else requests.Session()
+
+    def _checkin(self, sess: requests.Session):
+        with self._sessions_lock:
+            self._sessions.append(sess)
+
+    def close(self):
+        """Close the pooled sessions and their keep-alive connections."""
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for sess in sessions:
+            sess.close()
 
-    def get(self, url: str, **kwargs):
+    def get(self, url: str, *, budget=None, **kwargs):
+        """GET through the cache, breaker, rate limiter and retries. ``budget`` (a stage's
+        ``Budget``) is charged only when the request actually goes to the network."""
         headers = kwargs.pop("headers", {})
         headers.setdefault("User-Agent", self.user_agent)
         headers.setdefault("Accept-Language", "en-EG,en;q=0.9,ar-EG;q=0.8")
-        time.sleep((self.delay_ms + random.randint(0, 300)) / 1000.0)
-        resp = self.session.get(url, headers=headers, timeout=self.timeout, **kwargs)
+        t0 = time.perf_counter()
+        # Only plain GETs are cacheable: query params and other request options bypass the cache.
+        # A streamed response that gets stored is buffered once; cached bodies replay via iter_content.
+        cache = self.cache if self.cache is not None and set(kwargs) <= {"stream"} else None
+        entry = cache.lookup(url) if cache else None
+        if entry is not None:
+            if cache.is_fresh(entry):
+                cache.count("hits")
+                resp = cache.to_response(entry)
+                self.telemetry.request(url, resp.status_code, (time.perf_counter() - t0) * 1000, nbytes=len(resp.content), cache="hit")
+                return resp
+            headers.update(cache.conditional_headers(entry))
+        if budget is not None:
+            budget.on_request()
+        self.health.before(url)
+        timeout = (self.connect_timeout, self.timeout) if self.connect_timeout else self.timeout
+        slept = 0.0
+        attempt = 0
+        sess = self._checkout()
+        try:
+            for attempt in range(self.max_retries + 1):
+                slept += self.rate_limiter.acquire(url)
+                resp = sess.get(url, headers=headers, timeout=timeout, **kwargs)
+                throttled = self.rate_limiter.on_response(url, resp.status_code, resp.headers.get("Retry-After"))
+                if not throttled or attempt == self.max_retries:
+                    break
+                resp.close()
+        except requests.RequestException as e:
+            # ConnectTimeout / ReadTimeout / ConnectionError (DNS, refused, reset) ...
+            self.health.record(url, error=e)
+            self.telemetry.request(url, None, (time.perf_counter() - t0 - slept) * 1000, retries=attempt,
+                                   sleep_ms=slept * 1000, error=type(e).__name__)
+            raise
+        finally:
+            self._checkin(sess)
+        self.health.record(url, status=resp.status_code)
+        ttfb_ms = resp.elapsed.total_seconds() * 1000
+        outcome = None
+        if cache is not None:
+            if resp.status_code == 304 and entry is not None:
+                cache.count("revalidated")
+                cache.refresh(entry, resp)
+                resp = cache.to_response(entry)
+                outcome = "revalidated"
+            else:
+                cache.count("misses")
+                outcome = "miss"
+                if resp.status_code == 200:
+                    cache.store(url, resp)
+        # Latency excludes the rate-limit sleep, which is reported separately
+        ms = (time.perf_counter() - t0 - slept) * 1000
+        def record(ms, nbytes):
+            self.telemetry.request(url, resp.status_code, ms, ttfb_ms=ttfb_ms, nbytes=nbytes,
+                                   retries=attempt, sleep_ms=slept * 1000, cache=outcome)
+        if kwargs.get("stream") and resp.ok and not getattr(resp, "from_cache", False):
+            _record_when_read(resp, ms, record)
+        else:
+            record(ms, len(resp.content))
         resp.raise_for_status()
         return resp
 
+def _record_when_read(resp, headers_ms: float, record):
+    """Report a streamed GET once the caller has read its body (or closed it early):
+    latency is time to headers plus the time spent reading, bytes are what was read."""
+    read_iter, close = resp.iter_content, resp.close
+    state = {"ms": headers_ms, "bytes": 0, "done": False}
+    def finish():
+        if not state["done"]:
+            state["done"] = True
+            record(state["ms"], state["bytes"])
+    def iter_content(chunk_size=1, decode_unicode=False):
+        it = read_iter(chunk_size, decode_unicode)
+        try:
+            while True:
+                t = time.perf_counter()
+                try:
+                    chunk = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    state["ms"] += (time.perf_counter() - t) * 1000
+                state["bytes"] += len(chunk)
+                yield chunk
+        finally:
+            finish()
+    def close_and_record():
+        finish()
+        close()
+    # resp.content reads through iter_content too
+    resp.iter_content, resp.close = iter_content, close_and_record
+
 def soup_from(resp) -> BeautifulSoup:
     return BeautifulSoup(resp.text, "lxml")
 
@@ -26,7 +159,7 @@ def og_content(soup: BeautifulSoup, prop: str):
     return tag["content"].strip() if tag and tag.get("content") else None
 
 def guess_price(soup: BeautifulSoup):
-    from .util import parse_price_any  # Import here to avoid circular import
+    from util import parse_price_any  # scraper/ is on sys.path; providers/ has no util module
     for prop in ["product:price:amount", "og:price:amount"]:
         c = og_content(soup, prop)
         if c:
@@ -39,3 +172,67 @@ def guess_price(soup: BeautifulSoup):
         if price is not None:
             return price
     return None
+
+def page_done(provider, url: str, item: Dict, fresh: bool = True):
+    """Per-page hooks for a parsed product page or a complete listing card: the site's
+    ``FetchMemo`` (and through it the run journal) for ``fresh`` items, the relevance
+    recall check and the ``Budget``, which may raise ``BudgetExceeded``."""
+    memo = getattr(provider.client, "memo", None)
+    if fresh and memo is not None:
+        memo.put_parsed(url, item)
+    relevance = getattr(provider, "relevance", None)
+    if relevance is not None and item:
+        relevance.observe(url, item.get("name"))
+    budget = getattr(provider.client, "budget", None)
+    if budget is not None:
+        budget.on_page(bool(item.get("name")) and item.get("price_egp") is not None)
+
+def collect_products(provider, entries: Iterable[Tuple[str, Optional[str]]], keywords: List[str]) -> List[Dict]:
+    """Shared product loop for the page-per-product providers.
+
+    Parses each ``(url, lastmod)`` entry (reusing the previous run's item when the
+    sitemap lastmod is unchanged), applies the keyword filter, and consults the
+    site's ``FetchMemo`` (when the client is a ``SiteClient``) so a URL that an
+    earlier provider already resolved is skipped and no page is parsed twice.
+    Pages are downloaded and parsed through the shared ``PagePipeline`` (fetches
+    overlap parsing; results stay in entry order). Every page is reported to the
+    client's ``Budget``; once it is exceeded the items collected so far are returned.
+    """
+    memo = getattr(provider.client, "memo", None)
+    state = getattr(provider, "lastmod_state", None)
+    relevance = getattr(provider, "relevance", None)
+    if relevance is not None:
+        # Drop pages whose slug / sitemap title / anchor text rules them out, before any fetch
+        if memo is not None:
+            entries = (e for e in entries if not memo.is_resolved(e[0]))
+        entries = relevance.select(entries, getattr(provider, "url_hints", {}).get)
+    def jobs():
+        # (url, ready item, lastmod, from memo); a ready item skips the fetch
+        for u, lastmod in entries:
+            if memo is not None and memo.is_resolved(u):
+                continue
+            cached = memo.parsed(u) if memo is not None else None
+            if cached is not None:
+                yield u, cached, lastmod, True
+            else:
+                yield u, state.unchanged(u, lastmod) if state is not None else None, lastmod, False
+
+    out = []
+    results = get_pipeline().run(provider, jobs())
+    try:
+        for (u, _, lastmod, cached), item in results:
+            if isinstance(item, BudgetExceeded):
+                raise item
+            fresh = not cached and not isinstance(item, Exception)
+            if isinstance(item, Exception):
+                item = {}
+            elif fresh and state is not None:
+                state.record(u, lastmod, item)
+            if item.get("name") and (not keywords or any(k.lower() in item["name"].lower() for k in keywords)):
+                out.append(item)
+            page_done(provider, u, item, fresh)
+    except BudgetExceeded:
+        pass  # the decision is on the budget; run_for_site logs it
+    finally:
+        results.close()  # stop downloading pages nobody will read
+    return out
@@ -0,0 +1,87 @@
+import time, threading
+from typing import Dict, Optional
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class Budget:
+    """Request / wall-time / failure limits for one provider stage or a whole site.
+
+    ``HttpClient`` calls ``on_request`` before every GET that goes to the network
+    (memo and fresh cache hits are free) and ``page_done`` calls ``on_page`` after
+    every parsed page; both raise ``BudgetExceeded`` once a limit is hit (and keep
+    raising, so broad ``except`` blocks in providers unwind quickly). Pipeline fetch threads charge it concurrently,
+    so the counters are updated under a lock. Sample-first: after ``sample_size`` pages,
+    a hit rate below ``min_yield`` abandons the stage. Requests and pages are also
+    charged to ``parent`` (the site budget). 0 disables a limit.
+    """
+    def __init__(self, name: str = "", max_requests: int = 0, max_seconds: float = 0, max_consecutive_failures: int = 0,
+                 sample_size: int = 0, min_yield: float = 0.0, parent: Optional["Budget"] = None):
+        self.name = name
+        self.max_requests = max_requests
+        self.max_seconds = max_seconds
+        self.max_consecutive_failures = max_consecutive_failures
+        self.sample_size = sample_size
+        self.min_yield = min_yield
+        self.parent = parent
+        self.requests = self.pages = self.hits = self.failures_in_row = 0
+        self.started = time.monotonic()
+        self.decision: Optional[str] = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls, name: str, cfg: Optional[Dict], parent: Optional["Budget"] = None) -> "Budget":
+        cfg = cfg or {}
+        return cls(name, max_requests=int(cfg.get("max_requests", 0)), max_seconds=float(cfg.get("max_seconds", 0)),
+                   max_consecutive_failures=int(cfg.get("max_consecutive_failures", 0)),
+                   sample_size=int(cfg.get("sample_size", 0)), min_yield=float(cfg.get("min_yield", 0.0)), parent=parent)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.decision is not None
+
+    def _stop(self, reason: str):
+        self.decision = self.decision or reason
+        raise BudgetExceeded(self.decision)
+
+    def _charge_parent(self, fn):
+        try:
+            fn()
+        except BudgetExceeded as e:
+            self._stop(f"{self.parent.name} {e}")
+
+    def check(self):
+        if self.decision is not None:
+            raise BudgetExceeded(self.decision)
+        if self.parent is not None:
+            self._charge_parent(self.parent.check)
+        if self.max_seconds and time.monotonic() - self.started > self.max_seconds:
+            self._stop(f"wall time over {self.max_seconds:g}s")
+
+    def on_request(self):
+        with self._lock:
+            self.check()
+            if self.max_requests and self.requests >= self.max_requests:
+                self._stop(f"request budget of {self.max_requests} used up")
+            if self.parent is not None:
+                self._charge_parent(self.parent.on_request)
+            self.requests += 1
+
+    def on_page(self, hit: bool):
+        with self._lock:
+            self.pages += 1
+            self.hits += 1 if hit else 0
+            self.failures_in_row = 0 if hit else self.failures_in_row + 1
+            if self.max_consecutive_failures and self.failures_in_row >= self.max_consecutive_failures:
+                self._stop(f"{self.failures_in_row} consecutive pages without a product")
+            if self.parent is not None:
+                self._charge_parent(lambda: self.parent.on_page(hit))
+            if self.sample_size and self.pages == self.sample_size and self.hits < self.min_yield * self.pages:
+                self._stop(f"yield {self.hits}/{self.pages} in the first {self.pages} pages is below {self.min_yield:.0%}")
+            self.check()
+
+    def summary(self) -> str:
+        state = f"stopped: {self.decision}" if self.decision else "within budget"
+        return f"{self.name} {state} ({self.requests} requests, {self.hits}/{self.pages} pages with a product, {time.monotonic() - self.started:.1f}s)"
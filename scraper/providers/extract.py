@@ -0,0 +1,185 @@
+import re, json, time
+from typing import Dict, Optional, List, Any, Tuple
+from urllib.parse import urljoin
+
+import lxml.html
+
+from util import parse_price_any
+from .telemetry import get_telemetry
+
+HEAD_END_RE = re.compile(r"</head\s*>", re.I)
+XML_DECL_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+# Cheap substring probes deciding whether parsing only <head> can be enough
+HEAD_PRICE_HINTS = ("product:price:amount", "og:price:amount", "application/ld+json")
+PRICE_META = ("product:price:amount", "og:price:amount")
+CURRENCY_META = ("product:price:currency", "og:price:currency")
+MAX_PRICE_CANDIDATES = 10
+
+
+def _num(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace(",", "").strip())
+    except ValueError:
+        return parse_price_any(str(value))
+
+
+def _first(value: Any) -> Any:
+    return value[0] if isinstance(value, list) and value else value
+
+
+def _types(node: Dict) -> List[str]:
+    t = node.get("@type", [])
+    return [t] if isinstance(t, str) else list(t)
+
+
+def _walk_ld(data: Any):
+    """Yield every dict in a JSON-LD payload (handles @graph, lists, nesting)."""
+    if isinstance(data, list):
+        for d in data:
+            yield from _walk_ld(d)
+    elif isinstance(data, dict):
+        yield data
+        for key in ("@graph", "mainEntity", "itemListElement"):
+            if key in data:
+                yield from _walk_ld(data[key])
+
+
+class _Fields:
+    """Accumulates candidates from one pass; earlier (stronger) sources win."""
+    def __init__(self):
+        self.meta: Dict[str, str] = {}
+        self.ld_name = self.ld_price = self.ld_currency = self.ld_image = self.ld_brand = None
+        self.ld_breadcrumbs: List[str] = []
+        self.md_price = self.md_currency = None
+        self.title: Optional[str] = None
+        self.price_texts: List[str] = []
+        self.breadcrumbs: Optional[List[str]] = None
+
+    def add_ld(self, text: str):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return
+        for node in _walk_ld(data):
+            types = _types(node)
+            if "Product" in types and self.ld_name is None:
+                self.ld_name = node.get("name")
+                img = _first(node.get("image"))
+                self.ld_image = img.get("url") if isinstance(img, dict) else img
+                brand = _first(node.get("brand"))
+                self.ld_brand = brand.get("name") if isinstance(brand, dict) else brand
+                for offer in (node.get("offers") if isinstance(node.get("offers"), list) else [node.get("offers") or {}]):
+                    if not isinstance(offer, dict):
+                        continue
+                    price = _num(offer.get("price", offer.get("lowPrice")))
+                    if price is None and isinstance(offer.get("priceSpecification"), dict):
+                        price = _num(offer["priceSpecification"].get("price"))
+                    if price is not None:
+                        self.ld_price, self.ld_currency = price, offer.get("priceCurrency")
+                        break
+            elif "BreadcrumbList" in types and not self.ld_breadcrumbs:
+                for el in node.get("itemListElement") or []:
+                    if isinstance(el, dict):
+                        item = el.get("item")
+                        name = el.get("name") or (item.get("name") if isinstance(item, dict) else None)
+                        if name:
+                            self.ld_breadcrumbs.append(str(name))
+
+    def visit(self, el, full: bool):
+        tag = el.tag
+        if not isinstance(tag, str):
+            return
+        if tag == "meta":
+            key = el.get("property") or el.get("name") or el.get("itemprop")
+            content = el.get("content")
+            if key and content and key not in self.meta:
+                self.meta[key] = content.strip()
+        elif tag == "script":
+            if (el.get("type") or "").lower() == "application/ld+json" and el.text:
+                self.add_ld(el.text)
+            return
+        elif tag == "title" and self.title is None:
+            self.title = el.text_content()
+        if not full:
+            return
+        prop = el.get("itemprop")
+        if prop == "price" and self.md_price is None:
+            self.md_price = _num(el.get("content") or el.text_content())
+        elif prop == "priceCurrency" and self.md_currency is None:
+            self.md_currency = el.get("content") or el.text_content().strip()
+        marker = ((el.get("class") or "") + " " + (el.get("id") or "")).lower()
+        if "price" in marker and len(self.price_texts) < MAX_PRICE_CANDIDATES:
+            self.price_texts.append(" ".join(t.strip() for t in el.itertext() if t.strip()))
+        if self.breadcrumbs is None and "breadcrumb" in marker:
+            self.breadcrumbs = [a.text_content().strip() for a in el.iter("a") if a.text_content().strip()]
+
+    def meta_currency(self) -> Optional[str]:
+        return next((self.meta[k] for k in CURRENCY_META if self.meta.get(k)), None)
+
+    def price(self) -> Optional[float]:
+        if self.ld_price is not None:
+            return self.ld_price
+        for prop in PRICE_META:
+            p = _num(self.meta.get(prop))
+            if p is not None:
+                return p
+        if self.md_price is not None:
+            return self.md_price
+        for txt in self.price_texts:
+            p = parse_price_any(txt)
+            if p is not None:
+                return p
+        return None
+
+
+def _collect(tree, full: bool) -> _Fields:
+    f = _Fields()
+    for el in tree.iter():
+        f.visit(el, full)
+    return f
+
+
+def extract_fields(html: str) -> _Fields:
+    """Parse once. The body is never parsed when <head> already settles the name, price
+    and currency: a JSON-LD price, or a meta price with no JSON-LD in the body (which
+    would outrank it). Breadcrumbs are then read from head JSON-LD only."""
+    html = XML_DECL_RE.sub("", html, count=1)  # lxml rejects str input with an encoding declaration
+    m = HEAD_END_RE.search(html)
+    if m and any(h in html[:m.start()] for h in HEAD_PRICE_HINTS):
+        f = _collect(lxml.html.document_fromstring(html[:m.end()]), full=False)
+        price_settled = f.ld_price is not None or (f.price() is not None and "application/ld+json" not in html[m.end():])
+        currency_settled = f.ld_currency or f.meta_currency()
+        if (f.meta.get("og:title") or f.ld_name) and price_settled and currency_settled:
+            return f
+    return _collect(lxml.html.document_fromstring(html), full=True)
+
+
+def extract_product(html: str, url: str, source: str) -> Dict:
+    """Structured product fields from a product page (JSON-LD, microdata, OpenGraph, price classes).
+
+    Returns the same item dict the providers have always built.
+    """
+    item, ms = parse_page(html, url, source)
+    if ms is not None:
+        get_telemetry().parse(url, ms)
+    return item
+
+
+def parse_page(html: str, url: str, source: str) -> Tuple[Dict, Optional[float]]:
+    """``extract_product`` without telemetry, for parser processes: ``(item, parse ms)``."""
+    if not html or not html.strip():
+        return {"name": "", "price_egp": None, "currency": "EGP", "url": url, "image_url": "", "brand": None, "category": None, "source": source}, None
+    t0 = time.perf_counter()
+    f = extract_fields(html)
+    name = f.meta.get("og:title") or f.ld_name or f.title or ""
+    img = f.meta.get("og:image") or f.ld_image or ""
+    crumbs = f.breadcrumbs or f.ld_breadcrumbs
+    currency = f.ld_currency or f.meta_currency() or f.md_currency or "EGP"
+    item = {"name": str(name).strip(), "price_egp": f.price(), "currency": currency, "url": url,
+            "image_url": urljoin(url, img) if img else "", "brand": f.meta.get("product:brand") or f.ld_brand,
+            "category": " > ".join(crumbs[-2:]) if crumbs else None, "source": source}
+    return item, (time.perf_counter() - t0) * 1000
@@ -0,0 +1,117 @@
+import os, re, json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# (platform, where, pattern, label): `where` is "header" (``name: value`` lines,
+# lowercased names) or "body" (the first part of the homepage HTML)
+SIGNALS = [
+    ("shopify", "header", r"^x-shopid:|^x-shopify-stage:|^powered-by: shopify", "shopify header"),
+    ("shopify", "body", r"cdn\.shopify\.com|\.myshopify\.com", "shopify cdn"),
+    ("shopify", "body", r"Shopify\.theme|window\.Shopify\b", "Shopify.theme"),
+    ("woocommerce", "body", r"<meta[^>]+generator[^>]+WooCommerce", "generator WooCommerce"),
+    ("woocommerce", "body", r"/wp-content/plugins/woocommerce/|\bwoocommerce-page\b|wc-block-", "woocommerce assets"),
+    ("woocommerce", "header", r"^set-cookie:.*\bwoocommerce_|^link:.*/wp-json/.*api\.w\.org", "wp-json link"),
+    ("woocommerce", "body", r"/wp-json/wc/store/", "wc store api"),
+    ("magento", "header", r"^x-magento-|^set-cookie:.*\bmage-", "magento header"),
+    ("magento", "body", r"text/x-magento-init|Magento_[A-Z]\w+|mage/cookies", "magento init"),
+    ("magento", "body", r"/static/(version\d+/)?frontend/", "magento static"),
+    ("spa", "body", r"id=\"__next\"|__NEXT_DATA__|window\.__NUXT__|ng-version=", "js framework"),
+    ("spa", "body", r"<div id=\"(root|app)\">\s*</div>", "empty app root"),
+]
+_COMPILED = [(p, where, re.compile(rx, re.I | re.M), label) for p, where, rx, label in SIGNALS]
+
+# Static chain per platform (provider class names). Platform APIs of other stores
+# are left out; SPAs render their links with JS, so the link-scraping heuristic is too.
+PLATFORM_CHAINS = {
+    "shopify": ["ShopifySitemapProvider", "GenericSitemapProvider", "HeuristicCatalogProvider"],
+    "woocommerce": ["WooCommerceStoreApiProvider", "GenericSitemapProvider", "HeuristicCatalogProvider"],
+    "magento": ["GenericSitemapProvider", "HeuristicCatalogProvider"],
+    "spa": ["GenericSitemapProvider"],
+}
+
+
+def classify(headers: Dict[str, str], html: str) -> Tuple[Optional[str], List[str]]:
+    """``(platform or None, matched signal labels)`` from response headers and homepage HTML."""
+    head = "\n".join(f"{k.lower()}: {v}" for k, v in headers.items())
+    body = html[:300_000]
+    found: Dict[str, List[str]] = {}
+    for platform, where, rx, label in _COMPILED:
+        if rx.search(head if where == "header" else body):
+            found.setdefault(platform, []).append(label)
+    # A store platform wins over framework markers (themes ship React widgets too)
+    stores = [p for p in ("shopify", "woocommerce", "magento") if p in found]
+    if stores:
+        best = max(stores, key=lambda p: len(found[p]))
+        return best, found[best]
+    if "spa" in found and len(re.findall(r"<a\s[^>]*href=", body, re.I)) < 10:
+        return "spa", found["spa"]
+    return None, []
+
+
+def fingerprint(client, base_url: str) -> Tuple[Optional[str], List[str]]:
+    """Classify a store with one GET of its homepage (memoized, so later providers reuse it)."""
+    try:
+        r = client.get(base_url)
+    except Exception:
+        return None, []
+    return classify(dict(r.headers), r.text or "")
+
+
+def order_chain(platform: Optional[str], providers: List[type]) -> List[type]:
+    """The static provider classes to try for ``platform``, best first (all of them when unknown)."""
+    names = PLATFORM_CHAINS.get(platform or "")
+    if not names:
+        return list(providers)
+    by_name = {P.__name__: P for P in providers}
+    return [by_name[n] for n in names if n in by_name]
+
+
+class StrategyState:
+    """Per-site record of the provider that produced the items on the last run.
+
+    ``fresh`` returns it while younger than ``ttl_days``; run_for_site then tries that
+    provider alone and re-probes (fingerprint + full chain) when its yield collapses.
+    """
+    def __init__(self, path: Optional[str] = None, entry: Optional[Dict] = None):
+        self.path = path
+        self.entry = entry or {}
+
+    @classmethod
+    def load(cls, state_dir: str, domain: str) -> "StrategyState":
+        path = os.path.join(state_dir, f"{domain}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = {}
+        return cls(path, entry)
+
+    def fresh(self, ttl_days: float) -> Optional[Dict]:
+        if not self.entry.get("provider") or not self.entry.get("items"):
+            return None
+        try:
+            updated = datetime.fromisoformat(self.entry["updated"].rstrip("Z"))
+        except (KeyError, ValueError):
+            return None
+        return self.entry if datetime.utcnow() - updated < timedelta(days=ttl_days) else None
+
+    def record(self, provider: Optional[str], platform: Optional[str], items: int):
+        """Remember the winner; ``provider=None`` (nothing yielded) forgets the old one."""
+        if provider is None:
+            self.entry = {"platform": platform} if platform else {}
+        else:
+            self.entry = {"provider": provider, "platform": platform, "items": items,
+                          "updated": datetime.utcnow().isoformat(timespec="seconds") + "Z"}
+
+    def confirm(self, items: int):
+        """The cached provider held up: keep it (and its age, so the TTL still forces a re-probe)."""
+        self.entry["items"] = items
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entry, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -1,47 +1,39 @@
-from .base import HttpClient, soup_from, og_content, guess_price
-from typing import List, Dict
+from .base import HttpClient, collect_products
+from .extract import extract_product
+from .sitemap import iter_sitemap, SitemapState
+from .relevance import RelevanceFilter
+from typing import List, Dict, Tuple, Optional
 from urllib.parse import urljoin, urlparse
-import re
 
 class GenericSitemapProvider:
+    lastmod_state: Optional[SitemapState] = None
+    relevance: Optional[RelevanceFilter] = None
+
     def __init__(self, base_url: str, client: HttpClient):
         self.base_url = base_url.rstrip("/")
         self.client = client
         self.source = urlparse(self.base_url).netloc
+        self.url_hints: Dict[str, str] = {}  # product URL -> sitemap image:title
+
+    def discover_product_entries(self, limit: int = 0) -> List[Tuple[str, Optional[str]]]:
+        """(url, lastmod) for product-like pages, following sitemap indexes and .xml.gz children."""
+        found: Dict[str, Optional[str]] = {}
+        for u, lastmod in iter_sitemap(self.client, urljoin(self.base_url, "/sitemap.xml"), titles=self.url_hints):
+            if u in found or not any(x in u.lower() for x in ["/product", "/products", "/item", "/p/"]):
+                continue
+            found[u] = lastmod
+            if limit and len(found) >= limit:
+                break
+        return list(found.items())
 
     def discover_product_urls(self, limit: int = 0) -> List[str]:
-        try:
-            r = self.client.get(urljoin(self.base_url, "/sitemap.xml"))
-            urls = re.findall(r"<loc>(.*?)</loc>", r.text)
-        except Exception:
-            return []
-        product_like = [u for u in urls if any(x in u.lower() for x in ["/product", "/products", "/item", "/p/"])]
-        seen=set(); dedup=[]
-        for u in product_like:
-            if u in seen: continue
-            seen.add(u); dedup.append(u)
-        return dedup if limit == 0 else dedup[:limit]
+        return [u for u, _ in self.discover_product_entries(limit)]
+
+    def fetch_page(self, url: str) -> str:
+        return self.client.get(url).text
 
     def parse_product(self, url: str) -> Dict:
-        r = self.client.get(url)
-        soup = soup_from(r)
-        title = og_content(soup, "og:title") or (soup.title.string if soup.title else "")
-        price = guess_price(soup)
-        img = og_content(soup, "og:image") or ""
-        brand = og_content(soup, "product:brand")
-        return {"name": title.strip(), "price_egp": float(price) if price is not None else None, "currency": "EGP", "url": url, "image_url": img, "brand": brand, "category": None, "source": self.source}
+        return extract_product(self.fetch_page(url), url, self.source)
 
     def search(self, keywords: List[str], limit_pages: int = 0) -> List[Dict]:
-        out = []
-        urls = self.discover_product_urls(limit=limit_pages)
-        for u in urls:
-            try:
-                item = self.parse_product(u)
-                if not item["name"]: continue
-                if keywords:
-                    low = item["name"].lower()
-                    if not any(k.lower() in low for k in keywords): continue
-                out.append(item)
-            except Exception:
-                continue
-        return out
+        return collect_products(self, self.discover_product_entries(limit=limit_pages), keywords)
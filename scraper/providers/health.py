@@ -0,0 +1,108 @@
+import time, threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+
+class CircuitOpen(requests.ConnectionError):
+    """Raised by ``HttpClient.get`` instead of a request while the host's breaker is open."""
+
+
+class _Host:
+    __slots__ = ("requests", "errors", "timeouts", "consecutive", "open_until", "probing", "skipped", "trips")
+
+    def __init__(self):
+        self.requests = self.errors = self.timeouts = self.consecutive = self.skipped = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.trips: List[Dict] = []
+
+
+class HostHealth:
+    """Per-host error / timeout rates and a consecutive-failure circuit breaker.
+
+    A failure is a connection error, a timeout or a 5xx after retries (4xx answers
+    such as a missing sitemap mean the host is fine). After ``failure_threshold``
+    failures in a row the host's circuit opens: ``before`` raises ``CircuitOpen``
+    at once for every further URL, so a dead store costs a few connect timeouts
+    instead of one full timeout per URL. After ``cooldown_seconds`` one probe
+    request is let through (half-open); success closes the circuit, failure
+    re-opens it. ``cooldown_seconds: 0`` keeps it open for the rest of the run.
+    ``failure_threshold: 0`` disables the breaker.
+    """
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 300.0):
+        self.failure_threshold = int(failure_threshold)
+        self.cooldown_seconds = float(cooldown_seconds)
+        self._hosts: Dict[str, _Host] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict]) -> "HostHealth":
+        """Build from the ``health`` section of scrape_config.yaml."""
+        cfg = cfg or {}
+        return cls(**{k: cfg[k] for k in ("failure_threshold", "cooldown_seconds") if k in cfg})
+
+    def _host(self, url: str) -> _Host:
+        host = urlparse(url).netloc
+        h = self._hosts.get(host)
+        if h is None:
+            h = self._hosts[host] = _Host()
+        return h
+
+    def before(self, url: str):
+        with self._lock:
+            h = self._host(url)
+            if not h.open_until:
+                return
+            if h.probing or time.monotonic() < h.open_until:
+                h.skipped += 1
+                raise CircuitOpen(f"circuit open for {urlparse(url).netloc} after {h.trips[-1]['failures']} failures")
+            h.probing = True  # half-open: this request is the probe, the rest keep failing fast
+
+    def record(self, url: str, status: Optional[int] = None, error: Optional[BaseException] = None):
+        with self._lock:
+            h = self._host(url)
+            h.requests += 1
+            if error is None and (status is None or status < 500):
+                h.consecutive = 0
+                if h.open_until:
+                    h.trips[-1]["closed_at"] = _now()
+                h.open_until, h.probing = 0.0, False
+                return
+            h.errors += 1
+            h.timeouts += 1 if isinstance(error, requests.Timeout) else 0
+            h.consecutive += 1
+            if h.probing or (self.failure_threshold and not h.open_until and h.consecutive >= self.failure_threshold):
+                if not h.probing:
+                    h.trips.append({"opened_at": _now(), "failures": h.consecutive,
+                                    "reason": type(error).__name__ if error is not None else f"HTTP {status}"})
+                h.open_until = time.monotonic() + self.cooldown_seconds if self.cooldown_seconds > 0 else float("inf")
+                h.probing = False
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            h = self._hosts.get(host)
+            return bool(h and h.open_until and (h.probing or time.monotonic() < h.open_until))
+
+    @staticmethod
+    def _entry(h: _Host) -> Dict:
+        n = max(1, h.requests)
+        return {"requests": h.requests, "errors": h.errors, "timeouts": h.timeouts,
+                "error_rate": round(h.errors / n, 3), "timeout_rate": round(h.timeouts / n, 3),
+                "skipped": h.skipped, "circuit": "open" if h.open_until else "closed", "trips": [dict(t) for t in h.trips]}
+
+    def host_report(self, host: str) -> Optional[Dict]:
+        with self._lock:
+            h = self._hosts.get(host)
+            return self._entry(h) if h else None
+
+    def report(self) -> Dict[str, Dict]:
+        """Per host: request / error / timeout counts and rates, skipped URLs and breaker trips."""
+        with self._lock:
+            return {host: self._entry(h) for host, h in sorted(self._hosts.items()) if h.requests or h.skipped}
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds") + "Z"
@@ -1,19 +1,67 @@
-from .base import HttpClient, soup_from, og_content, guess_price
-from typing import List, Dict
+from .base import HttpClient, soup_from, collect_products, page_done
+from .budget import BudgetExceeded
+from .extract import extract_product
+from .listing import parse_listing
+from .relevance import RelevanceFilter
+from typing import List, Dict, Optional
 from urllib.parse import urljoin, urlparse
 import re
 
+CATALOG_PATHS = ["/shop", "/products", "/catalog", "/gaming", "/store"]
+
 class HeuristicCatalogProvider:
-    def __init__(self, base_url: str, source: str, client: HttpClient):
+    """Catalog pages and the homepage of stores without a usable API or sitemap.
+
+    In listing mode (default) the product cards on those pages, their pagination and
+    the category pages they link to are read directly (one request per page of
+    cards); only cards without a price, and product links outside any card grid, are
+    fetched one page per product.
+    """
+    relevance: Optional[RelevanceFilter] = None
+
+    def __init__(self, base_url: str, client: HttpClient, source: Optional[str] = None, listing: bool = True, max_listing_pages: int = 40):
         self.base_url = base_url
-        self.source = source
+        self.source = source or urlparse(base_url).netloc
         self.client = client
+        self.listing = listing
+        self.max_listing_pages = max_listing_pages
+        self.url_hints: Dict[str, str] = {}  # product URL -> listing anchor text
+        self.listing_pages = 0
+
+    def harvest_listings(self, limit: int = 0) -> List[Dict]:
+        """Product cards from catalog pages, following pagination before category links."""
+        queue = [urljoin(self.base_url, p) for p in CATALOG_PATHS] + [self.base_url]
+        queued = set(queue)
+        cards: Dict[str, Dict] = {}
+        while queue and self.listing_pages < self.max_listing_pages and not (limit and len(cards) >= limit):
+            page = queue.pop(0)
+            try:
+                r = self.client.get(page)
+            except BudgetExceeded:
+                break
+            except Exception:
+                continue
+            if r.url != page and r.url in queued:  # e.g. /shop redirecting to the homepage
+                continue
+            queued.add(r.url)
+            self.listing_pages += 1
+            items, nxt, categories = parse_listing(r.text, r.url, self.source)
+            for it in items:
+                cards.setdefault(it["url"], it)
+            if nxt and nxt not in queued:
+                queued.add(nxt)
+                queue.insert(0, nxt)
+            for c in categories:
+                if c not in queued:
+                    queued.add(c)
+                    queue.append(c)
+        out = list(cards.values())
+        return out[:limit] if limit else out
 
     def discover_product_urls(self, limit: int = 0) -> List[str]:
         urls = []
         # Try common catalog paths
-        paths = ["/shop", "/products", "/catalog", "/gaming", "/store"]
-        for path in paths:
+        for path in CATALOG_PATHS:
             try:
                 r = self.client.get(urljoin(self.base_url, path))
                 soup = soup_from(r)
@@ -25,6 +73,7 @@ class HeuristicCatalogProvider:
                     low = full.lower()
                     if any(p in low for p in ["/product/", "/products/", "/item/", "/p/", "/gaming/", "/keyboard", "/mouse", "/headset"]):
                         urls.append(full)
+                        self._hint(full, a)
             except Exception:
                 continue
         # Also try homepage
@@ -39,6 +88,7 @@ class HeuristicCatalogProvider:
                 low = full.lower()
                 if any(p in low for p in ["/product/", "/products/", "/item/", "/p/", "/gaming/", "/keyboard", "/mouse", "/headset"]):
                     urls.append(full)
+                    self._hint(full, a)
         except Exception:
             pass
         # Deduplicate
@@ -50,35 +100,37 @@ class HeuristicCatalogProvider:
                 dedup.append(u)
         return dedup if limit == 0 else dedup[:limit]
 
+    def _hint(self, url: str, a):
+        text = a.get_text(" ", strip=True) or a.get("title") or ""
+        if text and len(text) > len(self.url_hints.get(url, "")):
+            self.url_hints[url] = text
+
+    def fetch_page(self, url: str) -> str:
+        return self.client.get(url).text
+
     def parse_product(self, url: str) -> Dict:
-        r = self.client.get(url)
-        soup = soup_from(r)
-        title = og_content(soup, "og:title") or (soup.title.string if soup.title else "")
-        price = guess_price(soup)
-        img = og_content(soup, "og:image") or ""
-        brand = og_content(soup, "product:brand")
-        # Try to extract category from breadcrumbs or schema
-        category = None
-        breadcrumbs = soup.select("[class*=breadcrumb], [id*=breadcrumb]")
-        if breadcrumbs:
-            cats = [el.get_text(strip=True) for el in breadcrumbs[0].find_all("a")]
-            if cats:
-                category = " > ".join(cats[-2:])  # Last two levels
-        return {"name": title.strip(), "price_egp": float(price) if price is not None else None, "currency": "EGP", "url": url, "image_url": img, "brand": brand, "category": category, "source": self.source}
+        return extract_product(self.fetch_page(url), url, self.source)
 
     def search(self, keywords: List[str], limit_pages: int = 0) -> List[Dict]:
-        out = []
-        urls = self.discover_product_urls(limit=limit_pages)
-        for u in urls:
-            try:
-                item = self.parse_product(u)
-                if not item["name"]:
-                    continue
-                if keywords:
-                    low = item["name"].lower()
-                    if not any(k.lower() in low for k in keywords):
-                        continue
-                out.append(item)
-            except Exception:
+        cards = self.harvest_listings(limit=limit_pages) if self.listing else []
+        memo = getattr(self.client, "memo", None)
+        out, seen = [], set()
+        for it in cards:
+            seen.add(it["url"])
+            if memo is not None and memo.is_resolved(it["url"]):
                 continue
-        return out
+            if it["name"] and it["price_egp"] is not None:
+                if not keywords or any(k.lower() in it["name"].lower() for k in keywords):
+                    out.append(it)
+                # A complete card counts as a parsed page (memo, relevance, budget)
+                try:
+                    page_done(self, it["url"], it)
+                except BudgetExceeded:
+                    return out
+            else:
+                self.url_hints.setdefault(it["url"], it["name"])
+        # Cards without a price, plus product links outside any card grid (catalog pages are memoized)
+        urls = [it["url"] for it in cards if not (it["name"] and it["price_egp"] is not None)]
+        if not limit_pages or len(cards) < limit_pages:
+            urls += [u for u in self.discover_product_urls(limit=limit_pages) if u not in seen]
+        return out + collect_products(self, [(u, None) for u in urls], keywords)
@@ -0,0 +1,190 @@
+import os, json, time, hashlib, threading
+from typing import Optional, Dict
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Only these response headers are kept with a cached body.
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+
+
+class HttpCache:
+    """Opt-in on-disk HTTP cache used by ``HttpClient``.
+
+    Bodies are stored under ``root/<xx>/<sha1>.bin`` with a JSON sidecar holding the
+    validators (``ETag``/``Last-Modified``). Entries younger than the host's TTL are
+    served without a request; older ones are revalidated with ``If-None-Match`` /
+    ``If-Modified-Since`` and a 304 is answered from disk. Total size is bounded by
+    ``max_bytes`` with least-recently-used eviction. The directory survives between
+    runs (restore it with actions/cache on CI).
+    """
+    INDEX = "index.json"
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 * 1024, ttl_seconds: float = 0,
+                 hosts: Optional[Dict[str, Dict]] = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_seconds = float(ttl_seconds)
+        self.hosts = hosts or {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._index: Dict[str, list] = self._load_index()   # key -> [size, last_access]
+        self._total = sum(v[0] for v in self._index.values())
+        self.hits = self.revalidated = self.misses = 0
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict], root: Optional[str] = None) -> Optional["HttpCache"]:
+        """Build from the ``http_cache`` config section; ``None`` when no directory is set."""
+        cfg = cfg or {}
+        root = root or cfg.get("dir")
+        if not root:
+            return None
+        return cls(root, max_bytes=int(float(cfg.get("max_mb", 512)) * 1024 * 1024),
+                   ttl_seconds=cfg.get("ttl_seconds", 0), hosts=cfg.get("hosts"))
+
+    # -- storage -------------------------------------------------------------
+    def _key(self, url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        d = os.path.join(self.root, key[:2])
+        return os.path.join(d, key + ".bin"), os.path.join(d, key + ".json")
+
+    def _load_index(self) -> Dict[str, list]:
+        try:
+            with open(os.path.join(self.root, self.INDEX), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        # Index missing (e.g. the previous run was killed): rebuild it from the sidecars.
+        index = {}
+        for sub in os.listdir(self.root):
+            d = os.path.join(self.root, sub)
+            if not os.path.isdir(d):
+                continue
+            for name in os.listdir(d):
+                if name.endswith(".bin"):
+                    st = os.stat(os.path.join(d, name))
+                    index[name[:-4]] = [st.st_size, st.st_mtime]
+        return index
+
+    def close(self):
+        """Persist the LRU index (call once at the end of the run)."""
+        with self._lock:
+            tmp = os.path.join(self.root, self.INDEX + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+            os.replace(tmp, os.path.join(self.root, self.INDEX))
+
+    def _remove(self, key: str):
+        size, _ = self._index.pop(key, (0, 0))
+        self._total -= size
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        for key, _ in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+            self._remove(key)
+            if self._total <= self.max_bytes * 0.9:
+                break
+
+    # -- lookups -------------------------------------------------------------
+    def count(self, outcome: str):
+        """Bump the ``hits`` / ``revalidated`` / ``misses`` counter (fetch threads share the cache)."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def ttl_for(self, url: str) -> float:
+        return float(self.hosts.get(urlparse(url).netloc, {}).get("ttl_seconds", self.ttl_seconds))
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """The cached entry for ``url`` or ``None``. The lock covers only the index; the
+        files are read outside it (``_write`` replaces them atomically), so fetch threads
+        don't queue behind each other's disk reads."""
+        key = self._key(url)
+        with self._lock:
+            if key not in self._index:
+                return None
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                meta["body"] = f.read()
+        except FileNotFoundError:
+            return None  # evicted by another thread since the index check
+        except (OSError, ValueError):
+            with self._lock:
+                self._remove(key)
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index[key][1] = time.time()
+        return meta
+
+    def is_fresh(self, entry: Dict) -> bool:
+        ttl = self.ttl_for(entry["url"])
+        return ttl > 0 and time.time() - entry["stored_at"] < ttl
+
+    def conditional_headers(self, entry: Dict) -> Dict[str, str]:
+        h = entry.get("headers", {})
+        out = {}
+        if h.get("ETag"):
+            out["If-None-Match"] = h["ETag"]
+        if h.get("Last-Modified"):
+            out["If-Modified-Since"] = h["Last-Modified"]
+        return out
+
+    def store(self, url: str, resp: requests.Response):
+        headers = {k: resp.headers[k] for k in KEPT_HEADERS if k in resp.headers}
+        if not (headers.get("ETag") or headers.get("Last-Modified") or self.ttl_for(url) > 0):
+            return  # nothing to revalidate with and no TTL: caching would never pay off
+        body = resp.content
+        meta = {"url": url, "status": resp.status_code, "encoding": resp.encoding,
+                "headers": headers, "stored_at": time.time()}
+        self._write(url, meta, body)
+
+    def refresh(self, entry: Dict, resp: requests.Response):
+        """A 304 arrived: keep the body, update validators and the freshness clock."""
+        for k in ("ETag", "Last-Modified", "Cache-Control"):
+            if k in resp.headers:
+                entry["headers"][k] = resp.headers[k]
+        entry["stored_at"] = time.time()
+        body = entry.pop("body")
+        self._write(entry["url"], entry, body)
+        entry["body"] = body
+
+    def _write(self, url: str, meta: Dict, body: bytes):
+        key = self._key(url)
+        body_path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        # Written aside and renamed into place: a concurrent lookup sees a whole file
+        suffix = f".{threading.get_ident()}.tmp"
+        with open(body_path + suffix, "wb") as f:
+            f.write(body)
+        with open(meta_path + suffix, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(body_path + suffix, body_path)
+        os.replace(meta_path + suffix, meta_path)
+        with self._lock:
+            old = self._index.get(key)
+            self._total += len(body) - (old[0] if old else 0)
+            self._index[key] = [len(body), time.time()]
+            self._evict()
+
+    def to_response(self, entry: Dict) -> requests.Response:
+        resp = requests.Response()
+        resp.status_code = entry.get("status", 200)
+        resp._content = entry["body"]
+        resp._content_consumed = True
+        resp.url = entry["url"]
+        resp.encoding = entry.get("encoding")
+        resp.headers = CaseInsensitiveDict(entry.get("headers", {}))
+        resp.from_cache = True
+        return resp
@@ -0,0 +1,209 @@
+import re, time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse, parse_qsl, urlencode
+
+import lxml.html
+
+from util import parse_price_any
+from .extract import XML_DECL_RE
+from .telemetry import get_telemetry
+
+MIN_CARDS = 3
+# Card links that are actions, not the product
+ACTION_RE = re.compile(r"add-to-cart|/cart|wishlist|compare|quick-?view|^#|^javascript:|^mailto:|^tel:", re.I)
+# Category / collection pages worth walking for more cards
+CATEGORY_RE = re.compile(r"/(collections|product-category|category|categories|c|shop)/[^/?#]+", re.I)
+PRODUCT_PATH_RE = re.compile(r"/products?/", re.I)
+PAGE_PARAMS = ("page", "p", "pg", "paged")
+STRUCK = ("del", "s", "strike")
+OLD_PRICE_RE = re.compile(r"compare|\b(old|was)\b")
+PATH_PAGE_RE = re.compile(r"/page/(\d+)/?$")
+
+
+def _classes(el) -> str:
+    return (el.get("class") or "").lower()
+
+
+def _sig(el) -> Tuple[str, str]:
+    # Tag and first class: themes append per-card classes (post-123, product_cat-mice, first/last)
+    first = _classes(el).split()[:1]
+    return el.tag, re.sub(r"\d+", "", first[0]) if first else ""
+
+
+def _text(el) -> str:
+    return " ".join(t.strip() for t in el.itertext() if t.strip())
+
+
+def _shown_text(el) -> str:
+    """Text of ``el`` without struck-through (compare-at) prices."""
+    parts = []
+    def walk(e):
+        if isinstance(e.tag, str) and e.tag not in STRUCK:
+            parts.append(e.text or "")
+            for c in e:
+                walk(c)
+                parts.append(c.tail or "")
+    walk(el)
+    return " ".join(t.strip() for t in parts if t.strip())
+
+
+def _card_price(card) -> Optional[float]:
+    """Current price of a card: itemprop, sale (<ins> / *sale*) price, then any price-classed text."""
+    for el in card.iter():
+        if isinstance(el.tag, str) and el.get("itemprop") == "price":
+            p = parse_price_any(el.get("content") or _text(el))
+            if p is not None:
+                return p
+    priced = [el for el in card.iter() if isinstance(el.tag, str) and el.tag not in STRUCK
+              and "price" in _classes(el) + " " + (el.get("id") or "").lower() and not OLD_PRICE_RE.search(_classes(el))]
+    # Innermost sale element first: a "price--on-sale" wrapper also holds the regular price
+    sale = sorted((el for el in priced if "sale" in _classes(el)), key=lambda el: sum(1 for _ in el.iter()))
+    for el in list(card.iter("ins")) + sale + priced:
+        p = parse_price_any(_shown_text(el))
+        if p is not None:
+            return p
+    return None
+
+
+def _card_currency(card) -> Optional[str]:
+    for el in card.iter():
+        if isinstance(el.tag, str) and el.get("itemprop") == "priceCurrency":
+            return (el.get("content") or _text(el)).strip() or None
+    return None
+
+
+def _page_currency(root) -> Optional[str]:
+    for prop in ("product:price:currency", "og:price:currency"):
+        for el in root.iter("meta"):
+            if (el.get("property") or el.get("name")) == prop and el.get("content"):
+                return el.get("content").strip()
+    return None
+
+
+def _card_link(card, page_url: str) -> Optional[str]:
+    links = [card] if card.tag == "a" and card.get("href") else []
+    links += [a for a in card.iter("a") if a.get("href")]
+    for a in links:
+        href = a.get("href").strip()
+        if href and not ACTION_RE.search(href):
+            return urljoin(page_url, href)
+    return None
+
+
+def _card_name(card) -> str:
+    for el in card.iter():
+        if not isinstance(el.tag, str):
+            continue
+        cls = _classes(el)
+        if el.tag in ("h2", "h3", "h4", "h5") or (("title" in cls or "name" in cls) and "price" not in cls):
+            name = _text(el)
+            if name:
+                return name
+    for a in card.iter("a"):
+        if a.get("title"):
+            return a.get("title").strip()
+    for img in card.iter("img"):
+        if img.get("alt"):
+            return img.get("alt").strip()
+    texts = [_text(a) for a in card.iter("a")]
+    return max(texts, key=len, default="")
+
+
+def _card_image(card, page_url: str) -> str:
+    for img in card.iter("img"):
+        src = img.get("data-src") or img.get("src") or (img.get("srcset") or img.get("data-srcset") or "").split(" ")[0]
+        if src and not src.startswith("data:"):
+            return urljoin(page_url, src)
+    return ""
+
+
+def find_cards(root) -> List:
+    """The biggest repeated card structure: elements with the same tag and classes under
+    same-looking parents (so a grid split into rows is one group), each holding a link,
+    most of them a price."""
+    groups: Dict[Tuple, List] = {}
+    for parent in root.iter():
+        if not isinstance(parent.tag, str):
+            continue
+        kids = [c for c in parent if isinstance(c.tag, str)]
+        if len(kids) < 2:
+            continue
+        for c in kids:
+            groups.setdefault((_sig(parent), _sig(c)), []).append(c)
+    best, best_score = [], 0
+    for cards in groups.values():
+        if len(cards) < MIN_CARDS:
+            continue
+        cards = [c for c in cards if c.tag == "a" or c.find(".//a[@href]") is not None]
+        priced = sum(1 for c in cards if _card_price(c) is not None)
+        # Menus and footers repeat links too, but without prices
+        if len(cards) < MIN_CARDS or priced * 2 < len(cards):
+            continue
+        score = len(cards) + priced
+        if score > best_score:
+            best, best_score = cards, score
+    return best
+
+
+def next_page(root, page_url: str) -> Optional[str]:
+    """rel=next, else the link to the following ``?page=N`` / ``/page/N/``."""
+    for el in root.iter("link", "a"):
+        if "next" in (el.get("rel") or "").lower().split() and el.get("href"):
+            return urljoin(page_url, el.get("href"))
+    u = urlparse(page_url)
+    q = dict(parse_qsl(u.query))
+    param = next((p for p in PAGE_PARAMS if p in q and q[p].isdigit()), None)
+    m = PATH_PAGE_RE.search(u.path)
+    current = int(q[param]) if param else int(m.group(1)) if m else 1
+    wanted = set()
+    for p in ([param] if param else PAGE_PARAMS):
+        wanted.add(u._replace(query=urlencode({**q, p: str(current + 1)})).geturl())
+    base_path = PATH_PAGE_RE.sub("", u.path).rstrip("/")
+    wanted.add(u._replace(path=f"{base_path}/page/{current + 1}/", query=u.query).geturl())
+    for a in root.iter("a"):
+        href = a.get("href")
+        if href and urljoin(page_url, href).rstrip("/") in {w.rstrip("/") for w in wanted}:
+            return urljoin(page_url, href)
+    return None
+
+
+def category_links(root, page_url: str) -> List[str]:
+    host = urlparse(page_url).netloc
+    out = []
+    for a in root.iter("a"):
+        href = a.get("href")
+        if not href:
+            continue
+        full = urljoin(page_url, href).split("#")[0]
+        u = urlparse(full)
+        # Query strings are pagination / sort / filter views of a listing already queued
+        if u.netloc == host and not u.query and CATEGORY_RE.search(u.path) and not PRODUCT_PATH_RE.search(u.path) and full not in out:
+            out.append(full)
+    return out
+
+
+def parse_listing(html: str, page_url: str, source: str) -> Tuple[List[Dict], Optional[str], List[str]]:
+    """Product cards on a catalog / category page: ``(items, next page URL, category links)``.
+
+    Items carry the same fields as ``extract_product``; ``price_egp`` is None for
+    cards without a readable price (the caller fetches those product pages).
+    """
+    if not html or not html.strip():
+        return [], None, []
+    t0 = time.perf_counter()
+    root = lxml.html.document_fromstring(XML_DECL_RE.sub("", html, count=1))
+    # Same currency sources as extract_product (microdata, then page meta), else EGP
+    page_currency = _page_currency(root) or "EGP"
+    items, seen = [], set()
+    for card in find_cards(root):
+        url = _card_link(card, page_url)
+        if not url or url in seen:
+            continue
+        seen.add(url)
+        items.append({"name": _card_name(card), "price_egp": _card_price(card),
+                      "currency": _card_currency(card) or page_currency, "url": url,
+                      "image_url": _card_image(card, page_url), "brand": None, "category": None, "source": source})
+    nxt = next_page(root, page_url) if items else None
+    cats = category_links(root, page_url)
+    get_telemetry().parse(page_url, (time.perf_counter() - t0) * 1000)
+    return items, nxt, cats
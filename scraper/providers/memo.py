@@ -0,0 +1,122 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Iterable, Callable
+
+import requests
+
+
+def url_key(url: str) -> str:
+    """Key for "same page" checks: drop the fragment and a trailing slash."""
+    return url.split("#", 1)[0].rstrip("/")
+
+
+class FetchMemo:
+    """Run-scoped memo shared by every provider working on one site.
+
+    Holds successful GET responses (LRU, bounded by total body bytes), 4xx
+    failures, parsed product items, and the set of product URLs an earlier
+    provider already turned into an item. ``on_parsed(url, item)`` is called for
+    every newly parsed page (the run journal hooks in here).
+    """
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_entry_bytes: int = 8 * 1024 * 1024,
+                 on_parsed: Optional[Callable[[str, Dict], None]] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._responses: "OrderedDict[str, requests.Response]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total = 0
+        self._errors: Dict[str, requests.HTTPError] = {}
+        self._parsed: Dict[str, Dict] = {}
+        self._resolved = set()
+        self._lock = threading.Lock()
+        self.on_parsed = on_parsed
+        self.hits = 0
+
+    # -- responses -----------------------------------------------------------
+    def response(self, url: str) -> Optional[requests.Response]:
+        with self._lock:
+            if url in self._errors:
+                self.hits += 1
+                raise self._errors[url]
+            resp = self._responses.get(url)
+            if resp is not None:
+                self._responses.move_to_end(url)
+                self.hits += 1
+            return resp
+
+    def put_response(self, url: str, resp: requests.Response):
+        size = len(resp.content)
+        if size > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._total += size - self._sizes.get(url, 0)
+            self._responses[url] = resp
+            self._sizes[url] = size
+            while self._total > self.max_bytes and self._responses:
+                old, _ = self._responses.popitem(last=False)
+                self._total -= self._sizes.pop(old)
+
+    def put_error(self, url: str, exc: requests.HTTPError):
+        with self._lock:
+            self._errors[url] = exc
+
+    # -- parsed items / cross-provider resolution ----------------------------
+    def parsed(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._parsed.get(url_key(url))
+        return dict(item) if item is not None else None
+
+    def put_parsed(self, url: str, item: Dict):
+        with self._lock:
+            self._parsed[url_key(url)] = dict(item)
+        if self.on_parsed is not None:
+            self.on_parsed(url, item)
+
+    def seed_parsed(self, items: Dict[str, Dict]):
+        """Preload items parsed by an earlier, interrupted run (no ``on_parsed`` call)."""
+        with self._lock:
+            self._parsed.update((url_key(u), dict(it)) for u, it in items.items())
+
+    def is_resolved(self, url: str) -> bool:
+        return url_key(url) in self._resolved
+
+    def resolve(self, urls: Iterable[str]):
+        with self._lock:
+            self._resolved.update(url_key(u) for u in urls if u)
+
+
+class SiteClient:
+    """``HttpClient`` view for one site that answers repeated GETs from a ``FetchMemo``.
+
+    ``budget``, when set, is passed on to ``HttpClient``, which charges it only for GETs
+    that reach the network (not memo or fresh HTTP cache hits).
+
+    Anything other than ``get`` is delegated to the shared client.
+    """
+    def __init__(self, client, memo: Optional[FetchMemo] = None):
+        self.client = client
+        self.memo = memo or FetchMemo()
+        self.budget = None  # set per provider stage by run_for_site
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def get(self, url: str, **kwargs):
+        if not set(kwargs) <= {"stream"}:
+            return self.client.get(url, budget=self.budget, **kwargs)
+        hit = self.memo.response(url)
+        if hit is not None:
+            return hit
+        try:
+            resp = self.client.get(url, budget=self.budget, **kwargs)
+        except requests.HTTPError as e:
+            if e.response is not None and 400 <= e.response.status_code < 500 and e.response.status_code != 429:
+                self.memo.put_error(url, e)
+            raise
+        if kwargs.get("stream") and not getattr(resp, "from_cache", False):
+            # Only buffer streamed bodies of known, modest size; big ones keep streaming
+            length = resp.headers.get("Content-Length", "")
+            if not length.isdigit() or int(length) > self.memo.max_entry_bytes:
+                return resp
+        self.memo.put_response(url, resp)
+        return resp
@@ -0,0 +1,121 @@
+import os, threading
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from .extract import extract_product, parse_page
+from .telemetry import get_telemetry
+
+
+class PagePipeline:
+    """Overlaps product page downloads with HTML parsing.
+
+    ``run`` walks the jobs (discovery streams in lazily) keeping up to
+    ``queue_size`` pages in flight: ``fetch_workers`` threads download bodies and
+    hand them straight to a process pool of ``processes`` parsers, so parse CPU
+    runs off the GIL while the next pages download. Results come back in job
+    order. Per-host pacing is still the rate limiter's job. The process pool is
+    shared by every site and started on first use; ``processes: 0`` parses in the
+    fetch threads instead.
+    """
+    def __init__(self, fetch_workers: int = 2, queue_size: int = 32, processes: Optional[int] = None):
+        self.fetch_workers = max(1, int(fetch_workers))
+        self.queue_size = max(1, int(queue_size))
+        self.processes = (os.cpu_count() or 1) if processes is None else max(0, int(processes))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _parse_pool(self) -> Optional[ProcessPoolExecutor]:
+        if not self.processes:
+            return None
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that already runs site threads can deadlock the child
+                self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=mp.get_context("spawn"))
+            return self._pool
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _fetch(self, provider, url: str):
+        """Fetch thread: the item, or ``(html, parse future)`` when a parser process takes it."""
+        fetch_page = getattr(provider, "fetch_page", None)
+        if fetch_page is None:  # provider without a separable fetch step
+            return provider.parse_product(url)
+        html = fetch_page(url)
+        pool = self._parse_pool()
+        if pool is None:
+            return extract_product(html, url, provider.source)
+        try:
+            return html, pool.submit(parse_page, html, url, provider.source)
+        except (BrokenProcessPool, RuntimeError):  # pool broken or shut down: parse here
+            return extract_product(html, url, provider.source)
+
+    def _result(self, provider, url: str, fut: Future) -> Any:
+        try:
+            got = fut.result()
+            if isinstance(got, dict):
+                return got
+            html, parsed = got
+            try:
+                item, ms = parsed.result()
+            except BrokenProcessPool:  # a parser died (e.g. OOM-killed); parse this page here
+                return extract_product(html, url, provider.source)
+            if ms is not None:
+                get_telemetry().parse(url, ms)
+            return item
+        except Exception as e:
+            return e
+
+    def run(self, provider, jobs: Iterable[Tuple]) -> Iterator[Tuple[Tuple, Any]]:
+        """Yield ``(job, item)`` in job order for jobs ``(url, ready_item, ...)``.
+
+        Jobs with a ``ready_item`` (memo / unchanged lastmod) are passed through
+        without a fetch. ``item`` is the exception when fetching or parsing failed.
+        Closing the iterator early cancels pages that have not started downloading.
+        """
+        window: "deque[Tuple[Tuple, Optional[Future]]]" = deque()
+        fetchers = ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix="fetch")
+        try:
+            for job in jobs:
+                window.append((job, None if job[1] is not None else fetchers.submit(self._fetch, provider, job[0])))
+                while len(window) >= self.queue_size:
+                    done, fut = window.popleft()
+                    yield done, done[1] if fut is None else self._result(provider, done[0], fut)
+            while window:
+                done, fut = window.popleft()
+                yield done, done[1] if fut is None else self._result(provider, done[0], fut)
+        finally:
+            fetchers.shutdown(wait=True, cancel_futures=True)
+
+
+_pipeline: Optional[PagePipeline] = None
+_pipeline_cfg: Dict = {}
+_pipeline_lock = threading.Lock()
+
+
+def configure_pipeline(cfg: Optional[Dict]):
+    """Set options (the ``pipeline`` config section) for the shared pipeline before first use."""
+    global _pipeline_cfg
+    _pipeline_cfg = dict(cfg or {})
+
+
+def get_pipeline() -> PagePipeline:
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = PagePipeline(**_pipeline_cfg)
+        return _pipeline
+
+
+def shutdown_pipeline():
+    global _pipeline
+    with _pipeline_lock:
+        pipeline, _pipeline = _pipeline, None
+    if pipeline is not None:
+        pipeline.close()
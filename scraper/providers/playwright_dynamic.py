@@ -1,72 +1,212 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterable
 from urllib.parse import urlparse, urljoin
-import re, os, contextlib
+import os, asyncio, threading, contextlib
 
-from playwright.sync_api import sync_playwright
-from playwright_stealth import stealth_sync
+from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
 
+from .sitemap import parse_sitemap_text
+from .extract import extract_product
+from .memo import FetchMemo
+from .relevance import RelevanceFilter
+from .budget import Budget, BudgetExceeded
+from .rate_limit import HostRateLimiter
 
-def og_content(soup: BeautifulSoup, prop: str) -> Optional[str]:
-    tag = soup.find("meta", property=prop) or soup.find("meta", attrs={"name": prop})
-    return tag["content"].strip() if tag and tag.get("content") else None
+try:  # playwright-stealth 2.x
+    from playwright_stealth import Stealth
+    async def _apply_stealth(ctx):
+        await Stealth().apply_stealth_async(ctx)
+except ImportError:
+    try:  # playwright-stealth 1.x patches pages, not contexts
+        from playwright_stealth import stealth_async
+        async def _apply_stealth(ctx):
+            ctx.on("page", stealth_async)
+    except ImportError:
+        async def _apply_stealth(ctx):
+            return None
 
+DEFAULT_WAIT_SELECTOR = "meta[property='og:title'], [class*=price], [id*=price]"
+DEFAULT_BLOCKED_RESOURCES = ("image", "font", "media")
+DEFAULT_BLOCKED_HOSTS = ("google-analytics.com", "googletagmanager.com", "doubleclick.net", "facebook.net",
+                         "connect.facebook.com", "hotjar.com", "clarity.ms", "analytics.tiktok.com", "snap.licdn.com")
 
-def guess_price(soup: BeautifulSoup) -> Optional[float]:
-    for prop in ["product:price:amount", "og:price:amount"]:
-        c = og_content(soup, prop)
-        if c:
-            try: return float(c.replace(",", ""))
-            except: pass
-    cand = soup.select("[class*=price], [id*=price]")
-    for el in cand[:12]:
-        txt = el.get_text(" ", strip=True).replace(",", "")
-        m = re.search(r'(\d{2,6}(?:[.,]\d{2})?)', txt)
-        if m:
-            try: return float(m.group(1))
-            except: pass
-    return None
 
+class BrowserPool:
+    """One Chromium per run, shared by every site, rendering pages concurrently.
 
-class PlaywrightDynamicProvider:
-    def __init__(self, base_url: str):
-        self.base_url = base_url.rstrip("/")
-        self.source = urlparse(self.base_url).netloc
+    The async Playwright API runs on a private event loop thread; callers on any
+    thread submit work through ``render``/``render_many``. ``max_pages`` browser
+    contexts are created once (stealth applied, images/fonts/media and analytics
+    blocked at the route level) and handed out through a queue, so at most that many
+    pages render at a time. With ``rate_limiter`` (the run's ``HostRateLimiter``) every
+    navigation first takes a token for its host, like an ``HttpClient`` GET.
+    """
+    def __init__(self, max_pages: int = 4, headless: bool = True, wait_until: str = "domcontentloaded",
+                 wait_for_selector: Optional[str] = DEFAULT_WAIT_SELECTOR, nav_timeout_ms: int = 35000,
+                 selector_timeout_ms: int = 8000, block_resources: Iterable[str] = DEFAULT_BLOCKED_RESOURCES,
+                 block_hosts: Iterable[str] = DEFAULT_BLOCKED_HOSTS, locale: str = "en-EG", user_agent: Optional[str] = None,
+                 rate_limiter: Optional[HostRateLimiter] = None):
+        self.max_pages = max(1, int(max_pages))
+        self.headless = headless
+        self.wait_until = wait_until
+        self.wait_for_selector = wait_for_selector
+        self.nav_timeout_ms = nav_timeout_ms
+        self.selector_timeout_ms = selector_timeout_ms
+        self.block_resources = set(block_resources or ())
+        self.block_hosts = tuple(block_hosts or ())
+        self.locale = locale
+        self.user_agent = user_agent or os.getenv("SCRAPER_USER_AGENT", None)
+        self.rate_limiter = rate_limiter
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # -- lifecycle -----------------------------------------------------------
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="playwright-pool", daemon=True)
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._astart(), loop).result()
+            except Exception:
+                with contextlib.suppress(Exception):
+                    asyncio.run_coroutine_threadsafe(self._aclose(), loop).result(timeout=30)
+                loop.call_soon_threadsafe(loop.stop)
+                raise
+            self._loop, self._thread = loop, thread
+
+    async def _astart(self):
+        self._pw = await async_playwright().start()
+        self._browser = await self._pw.chromium.launch(headless=self.headless)
+        self._contexts: asyncio.Queue = asyncio.Queue()
+        for _ in range(self.max_pages):
+            ctx = await self._browser.new_context(locale=self.locale, user_agent=self.user_agent)
+            await _apply_stealth(ctx)
+            if self.block_resources or self.block_hosts:
+                await ctx.route("**/*", self._route)
+            self._contexts.put_nowait(ctx)
 
-    def _launch(self):
-        pw = sync_playwright().start()
-        launch_args = {"headless": True}
-        browser = pw.chromium.launch(**launch_args)
-        ctx = browser.new_context(locale="en-EG", user_agent=os.getenv("SCRAPER_USER_AGENT", None))
-        stealth_sync(ctx)
-        page = ctx.new_page()
-        return pw, browser, ctx, page
+    async def _route(self, route):
+        req = route.request
+        if req.resource_type in self.block_resources or any(h in req.url for h in self.block_hosts):
+            await route.abort()
+        else:
+            await route.continue_()
 
-    def _close(self, pw, browser, ctx):
+    async def _aclose(self):
         with contextlib.suppress(Exception):
-            ctx.close()
+            await self._browser.close()
         with contextlib.suppress(Exception):
-            browser.close()
+            await self._pw.stop()
+
+    def close(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
         with contextlib.suppress(Exception):
-            pw.stop()
+            asyncio.run_coroutine_threadsafe(self._aclose(), loop).result(timeout=30)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout=10)
 
-    def _render(self, url: str) -> Optional[str]:
-        pw, browser, ctx, page = self._launch()
-        html = None
+    # -- rendering -----------------------------------------------------------
+    async def _arender(self, url: str) -> Optional[str]:
+        # Wait for the host's token without blocking the loop, so other hosts keep rendering
+        wait = self.rate_limiter.try_acquire(url) if self.rate_limiter is not None else 0
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.rate_limiter.try_acquire(url)
+        ctx = await self._contexts.get()
+        page = None
         try:
-            page.goto(url, wait_until="domcontentloaded", timeout=35000)
-            with contextlib.suppress(Exception):
-                page.wait_for_selector("meta[property='og:title'], [class*=price], [id*=price]", timeout=8000)
-            html = page.content()
+            page = await ctx.new_page()
+            resp = await page.goto(url, wait_until=self.wait_until, timeout=self.nav_timeout_ms)
+            if self.rate_limiter is not None and resp is not None:
+                self.rate_limiter.on_response(url, resp.status, resp.headers.get("retry-after"))
+            if self.wait_for_selector:
+                with contextlib.suppress(Exception):
+                    await page.wait_for_selector(self.wait_for_selector, timeout=self.selector_timeout_ms)
+            return await page.content()
+        except Exception:
+            return None
         finally:
-            self._close(pw, browser, ctx)
-        return html
+            if page is not None:
+                with contextlib.suppress(Exception):
+                    await page.close()
+            self._contexts.put_nowait(ctx)
+
+    async def _arender_many(self, urls: List[str]) -> List[Optional[str]]:
+        return await asyncio.gather(*(self._arender(u) for u in urls))
+
+    def render(self, url: str) -> Optional[str]:
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._arender(url), self._loop).result()
+
+    def render_many(self, urls: List[str]) -> List[Optional[str]]:
+        """Render concurrently (bounded by ``max_pages``); results keep input order."""
+        if not urls:
+            return []
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._arender_many(list(urls)), self._loop).result()
+
+
+_pool: Optional[BrowserPool] = None
+_pool_cfg: Dict = {}
+_pool_lock = threading.Lock()
+
+
+def configure_pool(cfg: Optional[Dict], rate_limiter: Optional[HostRateLimiter] = None):
+    """Set options (the ``playwright`` config section) for the shared pool before first use."""
+    global _pool_cfg
+    _pool_cfg = dict(cfg or {})
+    if rate_limiter is not None:
+        _pool_cfg["rate_limiter"] = rate_limiter
+
+
+def get_pool() -> BrowserPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(**_pool_cfg)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+class PlaywrightDynamicProvider:
+    # Products rendered per batch; keeps memory bounded while the pool stays busy
+    batch_size = 32
+
+    relevance: Optional[RelevanceFilter] = None
+    # Each render counts as a request; exceeding it stops before the next batch
+    budget: Optional[Budget] = None
+
+    def __init__(self, base_url: str, pool: Optional[BrowserPool] = None, memo: Optional[FetchMemo] = None):
+        self.base_url = base_url.rstrip("/")
+        self.source = urlparse(self.base_url).netloc
+        self.pool = pool or get_pool()
+        self.memo = memo
+
+    configure_pool = staticmethod(configure_pool)
+    shutdown_pool = staticmethod(shutdown_pool)
+
+    def _render(self, url: str) -> Optional[str]:
+        return self.pool.render(url)
 
     def discover_product_urls(self, limit: int = 0) -> List[str]:
         urls: List[str] = []
         html = self._render(self.base_url + "/sitemap.xml")
         if html:
-            urls += re.findall(r"<loc>(.*?)</loc>", html)
+            urls += [loc for kind, loc, _, _ in parse_sitemap_text(html) if kind == "url"]
         urls = [u for u in urls if "/product" in u.lower() or "/products/" in u.lower() or "/item/" in u.lower()]
         if not urls:
             html = self._render(self.base_url)
@@ -90,25 +230,44 @@ class PlaywrightDynamicProvider:
         html = self._render(url)
         if not html:
             return {}
-        soup = BeautifulSoup(html, "lxml")
-        title = og_content(soup, "og:title") or (soup.title.string if soup.title else "")
-        price = guess_price(soup)
-        img = og_content(soup, "og:image") or ""
-        return {"name": (title or "").strip(), "price_egp": float(price) if price is not None else None, "currency": "EGP", "url": url, "image_url": img, "brand": og_content(soup, "product:brand"), "category": None, "source": self.source}
+        return extract_product(html, url, self.source)
 
     def search(self, keywords: List[str], limit_pages: int = 0) -> List[Dict]:
         out = []
         urls = self.discover_product_urls(limit=limit_pages)
-        for u in urls:
+        if self.memo is not None:
+            # Static providers may already have resolved some of these
+            urls = [u for u in urls if not self.memo.is_resolved(u)]
+        if self.relevance is not None:
+            urls = [u for u, _ in self.relevance.select((u, None) for u in urls)]
+        try:
+            for i in range(0, len(urls), self.batch_size):
+                batch = urls[i:i + self.batch_size]
+                if self.budget is not None:
+                    for _ in batch:
+                        self.budget.on_request()
+                out.extend(self._parse_batch(batch, keywords))
+        except BudgetExceeded:
+            pass  # keep what was rendered; run_for_site logs the decision
+        return out
+
+    def _parse_batch(self, urls: List[str], keywords: List[str]) -> List[Dict]:
+        out = []
+        for u, html in zip(urls, self.pool.render_many(urls)):
             try:
-                item = self.parse_product(u)
-                if not item or not item.get("name"):
-                    continue
-                if keywords:
-                    low = item["name"].lower()
-                    if not any(k.lower() in low for k in keywords):
-                        continue
-                out.append(item)
+                item = extract_product(html, u, self.source) if html else {}
             except Exception:
+                item = {}
+            if self.budget is not None:
+                with contextlib.suppress(BudgetExceeded):  # acted on before the next batch
+                    self.budget.on_page(bool(item.get("name")) and item.get("price_egp") is not None)
+            if self.relevance is not None and item:
+                self.relevance.observe(u, item.get("name"))
+            if not item.get("name"):
                 continue
+            if keywords:
+                low = item["name"].lower()
+                if not any(k.lower() in low for k in keywords):
+                    continue
+            out.append(item)
         return out
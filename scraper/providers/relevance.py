@@ -0,0 +1,86 @@
+import re, zlib
+from typing import List, Dict, Optional, Iterable, Iterator, Tuple, Callable
+from urllib.parse import urlparse, unquote
+
+# Same include terms as edith's is_gaming_accessory and exclusions as ScraperConfig
+GAMING_TERMS = ["gaming", "keyboard", "mouse", "headset", "controller", "joystick", "pad", "steering", "wheel"]
+EXCLUDE_TERMS = ["chair", "console"]
+WORD_RE = re.compile(r"[^\W\d_]{2,}")
+# Path segments that say where a page lives, not what it is
+PATH_NOISE = {"products", "product", "item", "items", "collections", "shop", "store", "ar", "en", "p", "html", "php"}
+
+
+def _compile(terms: Iterable[str]) -> Optional[re.Pattern]:
+    terms = sorted({t.strip().lower() for t in terms if t and t.strip()}, key=len, reverse=True)
+    if not terms:
+        return None
+    # One alternation; terms must start a word, so "pad" does not fire on "ipad"
+    return re.compile(r"(?<![^\W_])(?:" + "|".join(re.escape(t) for t in terms) + ")", re.I)
+
+
+def slug_text(url: str) -> str:
+    """Words of a product URL's path (``/products/logitech-g102-mouse`` -> ``logitech g102 mouse``)."""
+    parts = [p for p in re.split(r"[/\-_.+]+", unquote(urlparse(url).path).lower()) if p and p not in PATH_NOISE]
+    return " ".join(parts)
+
+
+class RelevanceFilter:
+    """Decides from a URL slug and any pre-fetch hint (sitemap ``image:title``, anchor
+    text) whether a product page is worth fetching.
+
+    A page is skipped only when there is evidence against it: an exclude term, or at
+    least ``min_words`` words of text with no keyword/include term. Opaque URLs
+    (``/products/12345``) are always fetched. ``sample_rate`` re-admits a
+    deterministic fraction of would-be skips so recall can be measured: a sampled
+    page whose parsed name turns out relevant counts as ``missed``.
+    """
+    def __init__(self, keywords: List[str], include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                 sample_rate: float = 0.0, min_words: int = 2):
+        self.include = _compile(list(keywords) + list(GAMING_TERMS if include is None else include))
+        self.keywords = _compile(keywords)
+        self.exclude = _compile(EXCLUDE_TERMS if exclude is None else exclude)
+        self.sample_rate = sample_rate
+        self.min_words = min_words
+        self.kept = self.skipped = self.sampled = self.missed = 0
+        self._sampled: set = set()
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict], keywords: List[str]) -> "RelevanceFilter":
+        cfg = cfg or {}
+        return cls(keywords, include=cfg.get("include"), exclude=cfg.get("exclude"),
+                   sample_rate=float(cfg.get("sample_rate", 0.0)), min_words=int(cfg.get("min_words", 2)))
+
+    def score(self, url: str, hint: Optional[str] = None) -> Optional[int]:
+        """Distinct include terms found (negative on an exclusion), or None when the text says too little."""
+        text = slug_text(url) + " " + (hint or "")
+        hits = {m.group(0).lower() for m in self.include.finditer(text)} if self.include else set()
+        if self.exclude and self.exclude.search(text) and not (self.keywords and self.keywords.search(text)):
+            return -1
+        if hits:
+            return len(hits)
+        return 0 if len(WORD_RE.findall(text)) >= self.min_words else None
+
+    def _sample(self, url: str) -> bool:
+        return self.sample_rate > 0 and zlib.crc32(url.encode()) % 10000 < self.sample_rate * 10000
+
+    def select(self, entries: Iterable[Tuple[str, Optional[str]]], hint: Callable[[str], Optional[str]] = lambda u: None) -> Iterator[Tuple[str, Optional[str]]]:
+        for entry in entries:
+            s = self.score(entry[0], hint(entry[0]))
+            if s is None or s > 0:
+                self.kept += 1
+                yield entry
+            elif self._sample(entry[0]):
+                self.sampled += 1
+                self._sampled.add(entry[0])
+                yield entry
+            else:
+                self.skipped += 1
+
+    def observe(self, url: str, name: str):
+        """Post-parse check of a sampled page: would the prefilter have dropped a relevant product?"""
+        if url in self._sampled and self.include and self.include.search(name or ""):
+            if not (self.exclude and self.exclude.search(name) and not (self.keywords and self.keywords.search(name))):
+                self.missed += 1
+
+    def summary(self) -> str:
+        return f"prefilter kept {self.kept}, skipped {self.skipped}, sampled {self.sampled} (missed {self.missed})"
@@ -1,48 +1,115 @@
-from .base import HttpClient, soup_from, og_content, guess_price
-from typing import List, Dict
+import requests
+
+from .base import HttpClient, collect_products, page_done
+from .budget import BudgetExceeded
+from .extract import extract_product
+from .sitemap import iter_sitemap, SitemapState
+from .relevance import RelevanceFilter
+from typing import List, Dict, Tuple, Optional, Iterator
 from urllib.parse import urljoin, urlparse
-import re
+
+JSON_PAGE_SIZE = 250  # Shopify's maximum for /products.json
 
 class ShopifySitemapProvider:
-    def __init__(self, base_url: str, client: HttpClient):
+    lastmod_state: Optional[SitemapState] = None
+    relevance: Optional[RelevanceFilter] = None
+
+    def __init__(self, base_url: str, client: HttpClient, use_json: bool = True, collections: Optional[List[str]] = None, max_json_pages: int = 200):
         self.base_url = base_url.rstrip("/")
         self.client = client
         self.source = urlparse(self.base_url).netloc
+        self.use_json = use_json
+        self.collections = collections or []
+        self.max_json_pages = max_json_pages
+        self.url_hints: Dict[str, str] = {}  # product URL -> sitemap image:title
+        self.error: Optional[str] = None  # bulk pagination cut short; run_for_site logs it
 
-    def discover_product_urls(self, limit: int = 0) -> List[str]:
-        urls: List[str] = []
+    def _json_endpoints(self) -> List[str]:
+        if self.collections:
+            return [f"/collections/{h}/products.json" for h in self.collections]
+        return ["/products.json"]
+
+    def iter_json_products(self) -> Iterator[Dict]:
+        """Raw product objects from the paginated bulk endpoint(s).
+
+        Raises if the first page is not a Shopify product listing, so callers can
+        fall back to the sitemap/HTML path on non-Shopify stores.
+        """
+        for path in self._json_endpoints():
+            for page in range(1, self.max_json_pages + 1):
+                # Query string is part of the URL (not params=) so the HTTP cache can key on it
+                r = self.client.get(urljoin(self.base_url, f"{path}?limit={JSON_PAGE_SIZE}&page={page}"))
+                products = r.json()["products"]
+                if not products:
+                    break
+                yield from products
+                if len(products) < JSON_PAGE_SIZE:
+                    break
+
+    def item_from_json(self, p: Dict) -> Dict:
+        variants = p.get("variants") or []
+        prices = [float(v["price"]) for v in variants if v.get("available", True) and v.get("price")]
+        if not prices:
+            prices = [float(v["price"]) for v in variants if v.get("price")]
+        images = p.get("images") or []
+        img = images[0].get("src", "") if images else ""
+        return {"name": (p.get("title") or "").strip(), "price_egp": min(prices) if prices else None, "currency": "EGP",
+                "url": f"{self.base_url}/products/{p.get('handle', '')}", "image_url": img,
+                "brand": p.get("vendor") or None, "category": p.get("product_type") or None, "source": self.source}
+
+    def search_json(self, keywords: List[str], limit_pages: int = 0) -> Optional[List[Dict]]:
+        """Bulk path: ~250 products per request, no HTML parsing. None if unavailable;
+        a failure after the first page sets ``error`` and returns what was read."""
+        out = []
+        seen = 0
+        handles = set()  # a product can sit in several collections
+        try:
+            for p in self.iter_json_products():
+                if p.get("handle") in handles:
+                    continue
+                handles.add(p.get("handle"))
+                seen += 1
+                item = self.item_from_json(p)
+                if item["name"] and (not keywords or any(k.lower() in item["name"].lower() for k in keywords)):
+                    out.append(item)
+                page_done(self, item["url"], item)
+                if limit_pages and seen >= limit_pages:
+                    break
+        except BudgetExceeded:
+            pass  # the decision is on the budget; run_for_site logs it
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            if not seen:
+                return None  # no bulk endpoint: not Shopify, or it is disabled
+            self.error = f"products.json failed after {seen} products ({type(e).__name__}: {e})"
+        return out
+
+    def discover_product_entries(self, limit: int = 0) -> List[Tuple[str, Optional[str]]]:
+        """(url, lastmod) for product pages; /sitemap.xml is an index whose children are followed."""
+        found: Dict[str, Optional[str]] = {}
+        visited = set()
         for path in ["/sitemap.xml", "/sitemap_products_1.xml", "/sitemap_products.xml"]:
-            try:
-                r = self.client.get(urljoin(self.base_url, path))
-                urls += re.findall(r"<loc>(.*?)</loc>", r.text)
-            except Exception:
-                continue
-        urls = [u for u in urls if "/products/" in u]
-        seen=set(); dedup=[]
-        for u in urls:
-            if u in seen: continue
-            seen.add(u); dedup.append(u)
-        return dedup if limit == 0 else dedup[:limit]
+            for u, lastmod in iter_sitemap(self.client, urljoin(self.base_url, path), visited=visited, titles=self.url_hints):
+                if "/products/" not in u or u in found:
+                    continue
+                found[u] = lastmod
+                if limit and len(found) >= limit:
+                    return list(found.items())
+        return list(found.items())
+
+    def discover_product_urls(self, limit: int = 0) -> List[str]:
+        return [u for u, _ in self.discover_product_entries(limit)]
+
+    def fetch_page(self, url: str) -> str:
+        return self.client.get(url).text
 
     def parse_product(self, url: str) -> Dict:
-        r = self.client.get(url)
-        soup = soup_from(r)
-        title = og_content(soup, "og:title") or (soup.title.string if soup.title else "")
-        price = guess_price(soup)
-        img = og_content(soup, "og:image") or ""
-        return {"name": title.strip(), "price_egp": float(price) if price is not None else None, "currency": "EGP", "url": url, "image_url": img, "brand": None, "category": None, "source": self.source}
+        return extract_product(self.fetch_page(url), url, self.source)
 
     def search(self, keywords: List[str], limit_pages: int = 0) -> List[Dict]:
-        out = []
-        urls = self.discover_product_urls(limit=limit_pages)
-        for u in urls:
-            try:
-                item = self.parse_product(u)
-                if not item["name"]: continue
-                if keywords:
-                    low = item["name"].lower()
-                    if not any(k.lower() in low for k in keywords): continue
-                out.append(item)
-            except Exception:
-                continue
-        return out
+        got = self.search_json(keywords, limit_pages=limit_pages) if self.use_json else None
+        if got is not None and self.error is None:
+            return got
+        # No bulk endpoint, or it broke off: product pages cover the rest
+        done = {it["url"] for it in got or []}
+        entries = [e for e in self.discover_product_entries(limit=limit_pages) if e[0] not in done]
+        return (got or []) + collect_products(self, entries, keywords)
@@ -0,0 +1,156 @@
+import os, re, json, zlib
+import xml.etree.ElementTree as ET
+from typing import Iterable, Iterator, Optional, Tuple, Dict, List, Set
+from urllib.parse import urljoin
+
+CHUNK_SIZE = 64 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+LOC_RE = re.compile(r"<loc>\s*(.*?)\s*</loc>", re.S)
+
+IMAGE_NS = "{http://www.google.com/schemas/sitemap-image/1.1}"
+
+# (kind, loc, lastmod, title) where kind is "url" for pages and "sitemap" for index
+# children; title is the first <image:title> of a page (often the product name)
+SitemapRecord = Tuple[str, str, Optional[str], Optional[str]]
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _gunzip_if_needed(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Pass chunks through, transparently inflating a gzip stream (``.xml.gz``)."""
+    it = iter(chunks)
+    for first in it:
+        if not first:
+            continue
+        if not first.startswith(GZIP_MAGIC):
+            yield first
+            yield from it
+            return
+        d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        yield d.decompress(first)
+        for chunk in it:
+            yield d.decompress(chunk)
+        yield d.flush()
+        return
+
+
+def parse_sitemap_chunks(chunks: Iterable[bytes]) -> Iterator[SitemapRecord]:
+    """Incrementally parse a sitemap or sitemap index from byte chunks.
+
+    Consumed entries are detached from the root as soon as they are read, so memory
+    stays bounded by the chunk size rather than the document size.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    loc = lastmod = title = None
+    for chunk in _gunzip_if_needed(chunks):
+        parser.feed(chunk)
+        for event, el in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = el
+                continue
+            tag = _local(el.tag)
+            if tag == "loc" and not el.tag.startswith(IMAGE_NS):
+                loc = (el.text or "").strip()
+            elif tag == "lastmod":
+                lastmod = (el.text or "").strip() or None
+            elif tag == "title" and el.tag.startswith(IMAGE_NS):
+                title = title or (el.text or "").strip() or None
+            elif tag in ("url", "sitemap"):
+                if loc:
+                    yield ("url" if tag == "url" else "sitemap", loc, lastmod, title)
+                loc = lastmod = title = None
+                # Clearing alone would leave an empty element per entry under <urlset>
+                root.clear()
+    parser.close()
+
+
+def parse_sitemap_text(text: str) -> Iterator[SitemapRecord]:
+    """Parse an in-memory sitemap; falls back to a ``<loc>`` scan for broken XML."""
+    try:
+        yield from list(parse_sitemap_chunks([text.encode("utf-8")]))
+    except ET.ParseError:
+        for loc in LOC_RE.findall(text):
+            yield ("url", loc, None, None)
+
+
+def iter_sitemap(client, url: str, max_depth: int = 4, visited: Optional[Set[str]] = None,
+                 titles: Optional[Dict[str, str]] = None) -> Iterator[Tuple[str, Optional[str]]]:
+    """Yield ``(page_url, lastmod)`` from a sitemap, following nested indexes.
+
+    The body is streamed and parsed as it arrives; ``.xml.gz`` children are inflated
+    on the fly. Unreachable or malformed sitemaps are skipped silently. Pass the same
+    ``visited`` set across calls to avoid fetching a sitemap twice, and a ``titles``
+    dict to collect each page's ``<image:title>``.
+    """
+    visited = visited if visited is not None else set()
+    if url in visited or max_depth < 0:
+        return
+    visited.add(url)
+    children: List[str] = []
+    try:
+        resp = client.get(url, stream=True)
+    except Exception:
+        return
+    try:
+        for kind, loc, lastmod, title in parse_sitemap_chunks(resp.iter_content(CHUNK_SIZE)):
+            if kind == "sitemap":
+                children.append(urljoin(url, loc))
+            else:
+                if title and titles is not None:
+                    titles[loc] = title
+                yield loc, lastmod
+    except (ET.ParseError, zlib.error):
+        pass
+    finally:
+        resp.close()
+    for child in children:
+        yield from iter_sitemap(client, child, max_depth - 1, visited, titles)
+
+
+class SitemapState:
+    """Per-site record of ``url -> (lastmod, parsed item)`` from the previous run.
+
+    Lets providers skip refetching product pages whose sitemap ``<lastmod>`` did not
+    change. Only URLs seen in the current run are written back, so pages that left
+    the sitemap drop out of the state automatically.
+    """
+    def __init__(self, path: Optional[str] = None, entries: Optional[Dict[str, Dict]] = None):
+        self.path = path
+        self.previous = entries or {}
+        self.current: Dict[str, Dict] = {}
+        self.reused = 0
+
+    @classmethod
+    def load(cls, state_dir: str, domain: str) -> "SitemapState":
+        path = os.path.join(state_dir, f"{domain}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        return cls(path, entries)
+
+    def unchanged(self, url: str, lastmod: Optional[str]) -> Optional[Dict]:
+        """Previous item for ``url`` if its lastmod is known and identical, else None."""
+        prev = self.previous.get(url)
+        if not lastmod or not prev or prev.get("lastmod") != lastmod or not prev.get("item"):
+            return None
+        self.reused += 1
+        return dict(prev["item"])
+
+    def record(self, url: str, lastmod: Optional[str], item: Optional[Dict]):
+        if lastmod:
+            self.current[url] = {"lastmod": lastmod, "item": dict(item) if item else None}
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.current, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -0,0 +1,182 @@
+import os, json, time, threading
+from typing import List, Dict, Optional
+from urllib.parse import urlparse
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    v = sorted(values)
+    out = {f"p{int(q * 100)}": round(v[min(len(v) - 1, int(q * len(v)))], 1) for q in QUANTILES}
+    out["max"] = round(v[-1], 1)
+    return out
+
+
+class _Site:
+    def __init__(self):
+        self.requests = 0
+        self.status: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.cache: Dict[str, int] = {}
+        self.bytes = 0
+        self.retries = 0
+        self.sleep_ms = 0.0
+        self.latency_ms: List[float] = []
+        self.ttfb_ms: List[float] = []
+        self.parse_ms: List[float] = []
+        self.stages: Dict[str, Dict] = {}
+
+
+class Telemetry:
+    """Structured per-request / per-page / per-stage events, aggregated per host.
+
+    ``HttpClient`` records every GET (latency, time to headers, bytes, status or
+    error, retries, rate-limit sleep, cache outcome; streamed GETs once their body
+    has been read), ``extract_product`` records
+    parse time and ``run_for_site`` records each provider stage. Events are
+    optionally appended to an NDJSON trace; aggregates go to ``run_report.json``
+    and, on request, a Prometheus textfile.
+    """
+    def __init__(self, trace_path: Optional[str] = None):
+        self._sites: Dict[str, _Site] = {}
+        self._lock = threading.Lock()
+        self._trace = None
+        if trace_path:
+            d = os.path.dirname(trace_path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self._trace = open(trace_path, "w", encoding="utf-8")
+
+    def _site(self, host: str) -> _Site:
+        s = self._sites.get(host)
+        if s is None:
+            s = self._sites[host] = _Site()
+        return s
+
+    def _emit(self, rec: Dict):
+        if self._trace is not None:
+            rec["ts"] = round(time.time(), 3)
+            self._trace.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def request(self, url: str, status: Optional[int], ms: float, ttfb_ms: Optional[float] = None, nbytes: Optional[int] = None,
+                retries: int = 0, sleep_ms: float = 0.0, cache: Optional[str] = None, error: Optional[str] = None):
+        host = urlparse(url).netloc
+        with self._lock:
+            s = self._site(host)
+            s.requests += 1
+            if error:
+                s.errors[error] = s.errors.get(error, 0) + 1
+            else:
+                s.status[str(status)] = s.status.get(str(status), 0) + 1
+            if cache:
+                s.cache[cache] = s.cache.get(cache, 0) + 1
+            s.bytes += nbytes or 0
+            s.retries += retries
+            s.sleep_ms += sleep_ms
+            s.latency_ms.append(ms)
+            if ttfb_ms is not None:
+                s.ttfb_ms.append(ttfb_ms)
+            self._emit({"event": "request", "site": host, "url": url, "status": status, "ms": round(ms, 1),
+                        "ttfb_ms": None if ttfb_ms is None else round(ttfb_ms, 1), "bytes": nbytes, "retries": retries,
+                        "sleep_ms": round(sleep_ms, 1), "cache": cache, "error": error})
+
+    def parse(self, url: str, ms: float):
+        host = urlparse(url).netloc
+        with self._lock:
+            self._site(host).parse_ms.append(ms)
+            self._emit({"event": "parse", "site": host, "url": url, "ms": round(ms, 2)})
+
+    def stage(self, site: str, stage: str, seconds: float, items: int, error: Optional[str] = None):
+        with self._lock:
+            st = self._site(site).stages.setdefault(stage, {"seconds": 0.0, "items": 0, "errors": 0})
+            st["seconds"] = round(st["seconds"] + seconds, 3)
+            st["items"] += items
+            st["errors"] += 1 if error else 0
+            self._emit({"event": "stage", "site": site, "stage": stage, "seconds": round(seconds, 3), "items": items, "error": error})
+
+    # -- output --------------------------------------------------------------
+    def report(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {host: {"requests": s.requests, "status": s.status, "errors": s.errors, "cache": s.cache,
+                           "bytes": s.bytes, "retries": s.retries, "rate_limit_sleep_s": round(s.sleep_ms / 1000, 2),
+                           "latency_ms": percentiles(s.latency_ms), "ttfb_ms": percentiles(s.ttfb_ms),
+                           "parse_pages": len(s.parse_ms), "parse_ms": percentiles(s.parse_ms), "stages": s.stages}
+                    for host, s in sorted(self._sites.items())}
+
+    def write_prometheus(self, path: str):
+        """Node-exporter textfile collector format."""
+        lines = []
+        def metric(name, kind, help_):
+            lines.extend([f"# HELP scraper_{name} {help_}", f"# TYPE scraper_{name} {kind}"])
+        def esc(v):
+            return str(v).replace("\\", "\\\\").replace('"', '\\"')
+        with self._lock:
+            sites = sorted(self._sites.items())
+            metric("requests_total", "counter", "HTTP GETs by status (or error class)")
+            for h, s in sites:
+                for k, n in sorted(s.status.items()):
+                    lines.append(f'scraper_requests_total{{site="{esc(h)}",status="{k}"}} {n}')
+                for k, n in sorted(s.errors.items()):
+                    lines.append(f'scraper_requests_total{{site="{esc(h)}",status="{esc(k)}"}} {n}')
+            for name, attr, help_ in (("response_bytes_total", "bytes", "Response body bytes"),
+                                      ("retries_total", "retries", "Throttled requests retried"),
+                                      ("rate_limit_sleep_seconds_total", "sleep_ms", "Time spent waiting for the host rate limiter")):
+                metric(name, "counter", help_)
+                for h, s in sites:
+                    v = round(s.sleep_ms / 1000, 3) if attr == "sleep_ms" else getattr(s, attr)
+                    lines.append(f'scraper_{name}{{site="{esc(h)}"}} {v}')
+            for name, attr, help_ in (("request_seconds", "latency_ms", "GET latency including body, excluding rate-limit waits"),
+                                      ("parse_seconds", "parse_ms", "Product page extraction time")):
+                metric(name, "summary", help_)
+                for h, s in sites:
+                    vals = sorted(getattr(s, attr))
+                    if not vals:
+                        continue
+                    for q in QUANTILES:
+                        lines.append(f'scraper_{name}{{site="{esc(h)}",quantile="{q}"}} {vals[min(len(vals) - 1, int(q * len(vals)))] / 1000:.4f}')
+                    lines.append(f'scraper_{name}_sum{{site="{esc(h)}"}} {sum(vals) / 1000:.4f}')
+                    lines.append(f'scraper_{name}_count{{site="{esc(h)}"}} {len(vals)}')
+            metric("stage_seconds", "gauge", "Wall time per provider stage")
+            for h, s in sites:
+                for stage, st in sorted(s.stages.items()):
+                    lines.append(f'scraper_stage_seconds{{site="{esc(h)}",stage="{esc(stage)}"}} {st["seconds"]}')
+            metric("stage_items", "gauge", "Items yielded per provider stage")
+            for h, s in sites:
+                for stage, st in sorted(s.stages.items()):
+                    lines.append(f'scraper_stage_items{{site="{esc(h)}",stage="{esc(stage)}"}} {st["items"]}')
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        with self._lock:
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+
+
+_telemetry: Optional[Telemetry] = None
+_telemetry_lock = threading.Lock()
+
+
+def configure_telemetry(trace_path: Optional[str] = None) -> Telemetry:
+    """Install the run-wide collector (call once, before any request)."""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is not None:
+            _telemetry.close()
+        _telemetry = Telemetry(trace_path)
+        return _telemetry
+
+
+def get_telemetry() -> Telemetry:
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None:
+            _telemetry = Telemetry()
+        return _telemetry
@@ -0,0 +1,77 @@
+from .base import HttpClient, page_done
+from .budget import BudgetExceeded
+from typing import List, Dict, Optional, Iterator
+from urllib.parse import urljoin, urlparse
+import html
+
+import requests
+
+STORE_API_PATH = "/wp-json/wc/store/v1/products"
+
+class WooCommerceStoreApiProvider:
+    """Bulk catalog extraction from the public WooCommerce Store API.
+
+    The first page doubles as detection: anything other than a JSON list means the
+    site isn't WooCommerce (or the API is disabled) and the provider yields nothing.
+    A failure on a later page keeps what was read and sets ``error``.
+    """
+    def __init__(self, base_url: str, client: HttpClient, per_page: int = 100, max_pages: int = 200):
+        self.base_url = base_url.rstrip("/")
+        self.client = client
+        self.source = urlparse(self.base_url).netloc
+        self.per_page = per_page
+        self.max_pages = max_pages
+        self.error: Optional[str] = None  # pagination cut short; run_for_site logs it
+
+    def iter_api_products(self) -> Iterator[Dict]:
+        total_pages = self.max_pages
+        for page in range(1, self.max_pages + 1):
+            r = self.client.get(urljoin(self.base_url, f"{STORE_API_PATH}?per_page={self.per_page}&page={page}"))
+            products = r.json()
+            if not isinstance(products, list):
+                raise ValueError("Store API did not return a product list")
+            if page == 1 and r.headers.get("X-WP-TotalPages", "").isdigit():
+                total_pages = min(total_pages, int(r.headers["X-WP-TotalPages"]))
+            yield from products
+            if len(products) < self.per_page or page >= total_pages:
+                break
+
+    @staticmethod
+    def price_from_api(prices: Dict) -> Optional[float]:
+        """Store API prices are integer strings in minor units (e.g. "125000" + minor_unit 2)."""
+        raw = (prices or {}).get("price")
+        if raw in (None, ""):
+            return None
+        try:
+            return int(raw) / (10 ** int(prices.get("currency_minor_unit", 2)))
+        except (TypeError, ValueError):
+            return None
+
+    def item_from_api(self, p: Dict) -> Dict:
+        prices = p.get("prices") or {}
+        images = p.get("images") or []
+        cats = [c.get("name") for c in p.get("categories") or [] if c.get("name")]
+        return {"name": html.unescape(p.get("name") or "").strip(), "price_egp": self.price_from_api(prices),
+                "currency": prices.get("currency_code") or "EGP", "url": p.get("permalink") or "",
+                "image_url": images[0].get("src", "") if images else "", "brand": None,
+                "category": html.unescape(" > ".join(cats[-2:])) if cats else None, "source": self.source}
+
+    def search(self, keywords: List[str], limit_pages: int = 0) -> List[Dict]:
+        out = []
+        seen = 0
+        try:
+            for p in self.iter_api_products():
+                seen += 1
+                item = self.item_from_api(p)
+                if item["name"] and (not keywords or any(k.lower() in item["name"].lower() for k in keywords)):
+                    out.append(item)
+                if item["url"]:
+                    page_done(self, item["url"], item)
+                if limit_pages and seen >= limit_pages:
+                    break
+        except BudgetExceeded:
+            pass  # the decision is on the budget; run_for_site logs it
+        except (requests.RequestException, ValueError, KeyError, TypeError, AttributeError) as e:
+            if seen:
+                self.error = f"Store API failed after {seen} products ({type(e).__name__}: {e})"
+        return out
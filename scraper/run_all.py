@@ -1,12 +1,24 @@
 
-import os, argparse, json, csv, sys
-from typing import List, Dict
+import os, argparse, json, sys, time
+from typing import List, Dict, Optional
 from urllib.parse import urlparse
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
 from providers.base import HttpClient
+from providers.rate_limit import HostRateLimiter
+from providers.http_cache import HttpCache
+from providers.health import HostHealth
+from providers.sitemap import SitemapState
+from providers.memo import FetchMemo, SiteClient
+from providers.relevance import RelevanceFilter
+from providers.budget import Budget, BudgetExceeded
+from providers.fingerprint import StrategyState, fingerprint, order_chain
+from providers.telemetry import configure_telemetry, get_telemetry
+from providers.pipeline import configure_pipeline, shutdown_pipeline
 from providers.shopify_sitemap import ShopifySitemapProvider
+from providers.woocommerce_store_api import WooCommerceStoreApiProvider
 from providers.generic_sitemap import GenericSitemapProvider
 from providers.heuristic_catalog import HeuristicCatalogProvider
 
@@ -17,82 +29,192 @@ def get_dynamic_provider():
     except Exception:
         return None
 
-from util import norm_name, make_id
-
-# Desired export columns in exact order
-EXPORT_COLUMNS = ["id", "product name", "product price", "currency", "product url", "site name", "time stamp"]
-
-def to_export_row(it: Dict) -> Dict:
-    """Map internal item -> strict ordered export row with required keys only."""
-    return {
-        "id": it.get("id") or "",
-        "product name": it.get("name") or "",
-        "product price": it.get("price_egp", None),
-        "currency": it.get("currency") or "EGP",
-        "product url": it.get("url") or "",
-        "site name": it.get("source") or "",
-        "time stamp": it.get("scraped_at") or "",
-    }
-
-def write_json(path, items: List[Dict]):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(items, f, ensure_ascii=False, indent=2)
+from util import make_id
+from export import ExportPipeline, JsonArrayWriter, parquet_supported
+from store import ProductStore
+from journal import RunJournal
+from shards import ShardOutput, ShardSet, assign_shards, parse_shard
+from serve import main as serve
 
-def write_csv(path, items: List[Dict]):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=EXPORT_COLUMNS)
-        w.writeheader()
-        for it in items:
-            w.writerow(it)
+def load_config(path: str) -> Dict:
+    """Read scrape_config.yaml; missing file or missing PyYAML means defaults."""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        import yaml
+    except ImportError:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
 
-def run_for_site(base_url: str, client: HttpClient, keywords: List[str], limit_per_site: int, log_dir: str, dynamic_mode: str) -> List[Dict]:
+def run_for_site(base_url: str, client: HttpClient, keywords: List[str], limit_per_site: int, log_dir: str, dynamic_mode: str, state_dir: Optional[str] = None, provider_opts: Optional[Dict[str, Dict]] = None, memo_mb: float = 32, journal: Optional[RunJournal] = None, prefilter: Optional[Dict] = None, budgets: Optional[Dict] = None, strategy: Optional[Dict] = None) -> List[Dict]:
     logs = []
     def log(msg):
         ts = datetime.utcnow().isoformat()+"Z"
         logs.append(f"[{ts}] {msg}")
 
+    dom = urlparse(base_url).netloc
+    # Previous run's sitemap lastmods: unchanged product pages are reused, not refetched
+    sitemap_state = SitemapState.load(os.path.join(state_dir, "sitemaps"), dom) if state_dir else None
+
+    # Per-provider constructor options from the `providers` section of scrape_config.yaml
+    provider_opts = provider_opts or {}
+    # Run-scoped memo shared by the whole provider chain: repeated GETs (sitemap.xml,
+    # homepage) are answered from memory and URLs an earlier provider resolved are skipped.
+    memo = FetchMemo(max_bytes=int(memo_mb * 1024 * 1024),
+                     on_parsed=(lambda u, it: journal.record_url(dom, u, it)) if journal is not None else None)
+    if journal is not None and journal.parsed_urls(dom):
+        # Pages parsed before an interrupted run was killed are not fetched again
+        memo.seed_parsed(journal.parsed_urls(dom))
+        log(f"Resumed {len(journal.parsed_urls(dom))} product pages from the run journal")
+    site_client = SiteClient(client, memo)
+    # Opt-in pre-fetch relevance filter (slug / sitemap image:title / anchor text), one per site
+    relevance = RelevanceFilter.from_config(prefilter, keywords) if prefilter is not None else None
+
+    # Request / wall-time / failure / yield limits (`budgets` in the config): one for the
+    # whole site, and one per provider stage that also charges the site budget
+    budgets = budgets or {}
+    site_budget = Budget.from_config("site", budgets.get("site"))
+
+    telemetry = get_telemetry()
+    health = getattr(client, "health", None)
+    yields: Dict[str, int] = {}
+    def run_stage(name, prov) -> List[Dict]:
+        budget = Budget.from_config(name, {**(budgets.get("default") or {}), **((budgets.get("providers") or {}).get(name) or {})}, parent=site_budget)
+        site_client.budget = budget
+        yields.setdefault(name, 0)
+        if hasattr(prov, "budget"):
+            prov.budget = budget
+        t0 = time.perf_counter()
+        try:
+            got = prov.search(keywords, limit_pages=limit_per_site if limit_per_site>0 else 0)
+        except BudgetExceeded:
+            got = []
+        except Exception as e:
+            telemetry.stage(dom, name, time.perf_counter() - t0, 0, error=type(e).__name__)
+            raise
+        finally:
+            site_client.budget = None
+        secs = time.perf_counter() - t0
+        yields[name] = yields.get(name, 0) + len(got)
+        telemetry.stage(dom, name, secs, len(got))
+        log(f"{name} yielded {len(got)} items in {secs:.1f}s")
+        if getattr(prov, "error", None):
+            log(f"WARN {name}: {prov.error}")
+        if budget.exhausted:
+            # Hand over to the next strategy with whatever this one found
+            log(f"Budget: {budget.summary()}")
+        return got
+
     items: List[Dict] = []
-    def try_static():
-        for Provider in [ShopifySitemapProvider, GenericSitemapProvider, HeuristicCatalogProvider]:
+    def host_down() -> bool:
+        return health is not None and health.is_open(dom)
+
+    def try_static(chain):
+        for Provider in chain:
             try:
-                prov = Provider(base_url, client)
+                prov = Provider(base_url, site_client, **provider_opts.get(Provider.__name__, {}))
+                if hasattr(prov, "lastmod_state"):
+                    prov.lastmod_state = sitemap_state
+                if hasattr(prov, "relevance"):
+                    prov.relevance = relevance
                 log(f"Trying {Provider.__name__}")
-                got = prov.search(keywords, limit_pages=limit_per_site if limit_per_site>0 else 0)
-                log(f"{Provider.__name__} yielded {len(got)} items")
+                got = run_stage(Provider.__name__, prov)
                 items.extend(got)
-                if len(items) >= 50:
+                memo.resolve(it.get("url") for it in got)
+                if len(items) >= 50 and not getattr(prov, "error", None):
                     break
             except Exception as e:
                 log(f"ERROR {Provider.__name__}: {e}")
+            if site_budget.exhausted:
+                break
+            if host_down():
+                log("Circuit breaker open; skipping the remaining providers")
+                break
 
     dyn_cls = get_dynamic_provider()
-
-    if dynamic_mode == "always" and dyn_cls:
+    def try_dynamic():
         try:
-            log("Dynamic mode = always. Using Playwright first.")
-            prov = dyn_cls(base_url)
-            got = prov.search(keywords, limit_pages=limit_per_site if limit_per_site>0 else 0)
-            log(f"PlaywrightDynamicProvider yielded {len(got)} items")
+            prov = dyn_cls(base_url, memo=memo)
+            prov.relevance = relevance
+            got = run_stage("PlaywrightDynamicProvider", prov)
             items.extend(got)
+            memo.resolve(it.get("url") for it in got)
         except Exception as e:
             log(f"ERROR PlaywrightDynamicProvider: {e}")
-        if len(items) < 50:
-            try_static()
-    else:
-        try_static()
-        if dyn_cls and (dynamic_mode == "auto") and len(items) < 10:
-            try:
-                log("Static yielded few/none; falling back to PlaywrightDynamicProvider.")
-                prov = dyn_cls(base_url)
-                got = prov.search(keywords, limit_pages=limit_per_site if limit_per_site>0 else 0)
-                log(f"PlaywrightDynamicProvider yielded {len(got)} items")
-                items.extend(got)
-            except Exception as e:
-                log(f"ERROR PlaywrightDynamicProvider: {e}")
 
-    dom = urlparse(base_url).netloc
+    static = [ShopifySitemapProvider, WooCommerceStoreApiProvider, GenericSitemapProvider, HeuristicCatalogProvider]
+    usable = {P.__name__: P for P in static}
+    if dyn_cls and dynamic_mode != "never":
+        usable["PlaywrightDynamicProvider"] = dyn_cls
+
+    # Last run's winning provider (`strategy` in the config) is tried alone while fresh
+    strategy = strategy or {}
+    strategy_state = StrategyState.load(os.path.join(state_dir, "strategy"), dom) if state_dir and strategy.get("enabled", True) else None
+    cached = strategy_state.fresh(float(strategy.get("ttl_days", 14))) if strategy_state is not None else None
+    if cached and cached["provider"] not in usable:
+        cached = None
+    platform = cached.get("platform") if cached else None
+    if cached:
+        log(f"Cached strategy: {cached['provider']} ({cached['items']} items last run, probed {cached['updated'][:10]})")
+        if cached["provider"] == "PlaywrightDynamicProvider":
+            try_dynamic()
+        else:
+            try_static([usable[cached["provider"]]])
+        if len(items) < float(strategy.get("collapse_ratio", 0.5)) * cached["items"] and not site_budget.exhausted and not host_down():
+            log(f"Yield collapsed ({len(items)} vs {cached['items']} last run); re-probing")
+            cached = None
+
+    if not cached and not site_budget.exhausted:
+        # One homepage GET (memoized for the providers) picks and orders the static chain
+        site_client.budget = site_budget
+        platform, signals = fingerprint(site_client, base_url)
+        site_client.budget = None
+        chain = [P for P in order_chain(platform, static) if P.__name__ not in yields]
+        log(f"Fingerprint: {platform or 'unknown'}" + (f" ({', '.join(signals)})" if signals else "")
+            + f"; chain {' -> '.join(P.__name__ for P in chain) or '(none)'}")
+        dyn_tried = "PlaywrightDynamicProvider" in yields
+        if dynamic_mode == "always" and dyn_cls and not dyn_tried:
+            log("Dynamic mode = always. Using Playwright first.")
+            try_dynamic()
+            if len(items) < 50 and not site_budget.exhausted:
+                try_static(chain)
+        else:
+            try_static(chain)
+            if dyn_cls and (dynamic_mode == "auto") and len(items) < 10 and not site_budget.exhausted and not dyn_tried:
+                if host_down():
+                    # The browser would only pay navigation timeouts against a dead host
+                    log("Circuit breaker open; not falling back to PlaywrightDynamicProvider.")
+                else:
+                    log("Static yielded few/none; falling back to PlaywrightDynamicProvider.")
+                    try_dynamic()
+
+    if strategy_state is not None and not site_budget.exhausted and not host_down():  # an outage says nothing about the strategy
+        if cached:
+            strategy_state.confirm(len(items))
+        else:
+            best = max(yields, key=lambda n: yields[n], default=None)
+            strategy_state.record(best if best and yields[best] else None, platform, yields.get(best, 0))
+            if best and yields[best]:
+                log(f"Strategy: {best} remembered for later runs")
+        strategy_state.save()
+
+    log(f"Fetch memo answered {memo.hits} repeated requests")
+    hr = health.host_report(dom) if health is not None else None
+    if hr and hr["errors"]:
+        log(f"Health: {hr['errors']}/{hr['requests']} requests failed ({hr['timeouts']} timeouts), "
+            f"{hr['skipped']} skipped by the circuit breaker")
+        for t in hr["trips"]:
+            log(f"Circuit opened at {t['opened_at']} after {t['failures']} consecutive failures ({t['reason']})"
+                + (f", closed at {t['closed_at']}" if "closed_at" in t else ""))
+    if site_budget.exhausted:
+        log(f"Budget: {site_budget.summary()}")
+    if relevance is not None:
+        log(f"URL {relevance.summary()}")
+    if sitemap_state is not None:
+        log(f"Sitemap lastmod unchanged for {sitemap_state.reused} product pages (reused previous run)")
+        sitemap_state.save()
+
     os.makedirs(log_dir, exist_ok=True)
     with open(os.path.join(log_dir, f"{dom}.log"), "w", encoding="utf-8") as f:
         f.write("\n".join(logs))
@@ -108,106 +230,265 @@ def run_for_site(base_url: str, client: HttpClient, keywords: List[str], limit_p
 
     return items
 
-def dedupe(items: List[Dict]) -> List[Dict]:
-    seen=set(); out=[]
-    for it in items:
-        key=(it.get("id") or norm_name(it.get("name","")), it.get("source",""))
-        if key in seen: continue
-        seen.add(key); out.append(it)
-    return out
+def read_sites(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [ln.strip() for ln in f if ln.strip()]
+
+def finish_store(store: ProductStore) -> Dict:
+    """Close the store's run and write the "what changed" files; returns the report entry."""
+    store.finish_run()
+    # "What changed" reports and the current snapshot are queries over the store, not diffs of JSON in git
+    queries = {"price_changes": store.price_changes(), "new": store.new_items(), "disappeared": store.disappeared(),
+               "snapshot": store.snapshot()}
+    counts = {}
+    for name, rows in queries.items():
+        with JsonArrayWriter(f"data/combined/{name}.json") as w:
+            for row in rows:
+                w.write(row)
+        counts[name] = w.count
+    store.close()
+    return {"run_id": store.run_id, **counts}
+
+def check_parquet(parquet_dir: Optional[str]) -> Optional[str]:
+    if parquet_dir and not parquet_supported():
+        print("pyarrow is not installed; skipping the Parquet export", file=sys.stderr)
+        return None
+    return parquet_dir
+
+def merge(argv: List[str]):
+    """``run_all.py merge``: build the combined outputs from ``--shard`` runs, one site at a time."""
+    p = argparse.ArgumentParser(prog="run_all.py merge", description="Merge the outputs of `run_all.py --shard i/N` runs")
+    p.add_argument("--shards", type=int, required=True, help="N, the shard count the crawl used")
+    p.add_argument("--shards-dir", default="data/shards")
+    p.add_argument("--sites-file", default="scraper/sites.txt")
+    p.add_argument("--min-price", type=float, default=100.0)
+    p.add_argument("--max-price", type=float, default=2500.0)
+    p.add_argument("--state-dir", default="data/state")
+    p.add_argument("--db", default=os.getenv("SCRAPER_DB"))
+    p.add_argument("--parquet", default=os.getenv("SCRAPER_PARQUET"))
+    args = p.parse_args(argv)
+
+    sites = read_sites(args.sites_file)
+    shards = ShardSet(args.shards_dir, args.shards, [urlparse(s).netloc for s in sites])
+    if shards.missing:
+        # Sites they did not get to are carried over from last run's data/raw files rather than
+        # dropped from the catalog; the store only judges disappearance for sites crawled this run
+        print(f"Missing or unfinished shards: {', '.join(shards.missing)}; keeping last run's items for their unfinished sites", file=sys.stderr)
+    parquet_dir = check_parquet(args.parquet)
+    store = ProductStore(args.db) if args.db else None
+    if store is not None:
+        store.start_run()
+
+    per_counts, carried = {}, {}
+    os.makedirs("data/combined", exist_ok=True)
+    # Same order and code path as an unsharded run; only one site's items are in memory at a time
+    with ExportPipeline(args.min_price, args.max_price, parquet_dir=parquet_dir) as export:
+        for site in sites:
+            dom = urlparse(site).netloc
+            if not shards.has_site(dom):
+                carried[dom] = export.carry_site(dom)
+                if store is not None:
+                    store.carry_site(dom)
+                continue
+            got = shards.items(dom)
+            per_counts[dom] = len(got)
+            export.add_site(dom, got)
+            if store is not None:
+                store.add_site(dom, got)
+    shards.install("data/site_reports", args.state_dir or None)
+
+    parts = list(shards.reports.values())
+    report={
+        "generated_at": datetime.utcnow().isoformat()+"Z",
+        "min_price": args.min_price,
+        "max_price": args.max_price,
+        "sites": per_counts,
+        "total_raw": export.total_raw,
+        "total_clean": export.total_clean,
+        "product_groups": export.total_groups,
+        "dynamic_mode": parts[0].get("dynamic_mode") if parts else None,
+        "shards": {name: {"sites": len(r.get("sites", {})), "total_raw": r.get("total_raw"), "generated_at": r.get("generated_at")}
+                   for name, r in sorted(shards.reports.items())},
+    }
+    if shards.missing:
+        report["missing_shards"] = shards.missing
+        report["carried_sites"] = carried
+    if export.parquet is not None:
+        report["parquet"] = {"dir": parquet_dir, "files": export.parquet.files, "rows": export.parquet.rows}
+    resumed = sum(r.get("resumed_sites", 0) for r in parts)
+    if resumed:
+        report["resumed_sites"] = resumed
+    # Hosts never span shards, so per-host telemetry merges by union
+    report["telemetry"] = {h: t for r in parts for h, t in (r.get("telemetry") or {}).items()}
+    report["health"] = {h: t for r in parts for h, t in (r.get("health") or {}).items()}
+    caches = [r["http_cache"] for r in parts if r.get("http_cache")]
+    if caches:
+        report["http_cache"] = {k: sum(c.get(k, 0) for c in caches) for k in ("hits", "revalidated", "misses")}
+    if store is not None:
+        report["changes"] = finish_store(store)
+    with open("data/run_report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps({k: v for k, v in report.items() if k != "telemetry"}, indent=2))
 
 def main():
+    if sys.argv[1:2] == ["merge"]:
+        return merge(sys.argv[2:])
+    if sys.argv[1:2] == ["serve"]:
+        return serve(sys.argv[2:])
     p = argparse.ArgumentParser()
     p.add_argument("--sites-file", default="scraper/sites.txt")
+    p.add_argument("--config", default="scraper/scrape_config.yaml")
     p.add_argument("--keywords-file", default=None)
     p.add_argument("--min-price", type=float, default=100.0)
     p.add_argument("--max-price", type=float, default=2500.0)
     p.add_argument("--limit-per-site", type=int, default=0, help="0 = unlimited")
-    p.add_argument("--timeout", type=int, default=25)
+    p.add_argument("--timeout", type=int, default=25, help="Read timeout in seconds (connect timeout: health.connect_timeout)")
     p.add_argument("--delay-ms", type=int, default=900)
     p.add_argument("--user-agent", default=None)
+    p.add_argument("--state-dir", default="data/state", help="Cross-run state (sitemap lastmods); '' disables incremental discovery")
+    p.add_argument("--resume", action="store_true", help="Continue an interrupted run from <state-dir>/journal.ndjson")
+    p.add_argument("--db", default=os.getenv("SCRAPER_DB"), help="SQLite product store with price history (opt-in), e.g. data/state/products.sqlite")
+    p.add_argument("--parquet", default=os.getenv("SCRAPER_PARQUET"), help="Also write raw rows as Parquet partitioned by site and date under this directory (needs pyarrow), e.g. data/parquet")
+    p.add_argument("--http-cache", default=os.getenv("SCRAPER_HTTP_CACHE"), help="Directory for the on-disk HTTP cache (opt-in)")
+    p.add_argument("--prefilter-urls", action="store_true", help="Skip product pages whose URL slug / sitemap title / link text is clearly off-topic (see `relevance` in the config)")
+    p.add_argument("--trace", default=None, help="Write per-request/parse/stage events as NDJSON to this file")
+    p.add_argument("--metrics-file", default=None, help="Write aggregated metrics in Prometheus textfile format")
     p.add_argument("--dynamic-mode", default=os.getenv("SCRAPER_DYNAMIC_MODE","auto"), choices=["auto","never","always"])
+    p.add_argument("--site-concurrency", type=int, default=int(os.getenv("SCRAPER_SITE_CONCURRENCY", "1")), help="Number of sites crawled in parallel")
+    p.add_argument("--shard", default=None, help="i/N: crawl only the sites dealt to shard i of N (by host hash order) and write <shards-dir>/i-of-N for `run_all.py merge`")
+    p.add_argument("--shards-dir", default="data/shards")
     args = p.parse_args()
 
-    with open(args.sites_file, "r", encoding="utf-8") as f:
-        sites=[ln.strip() for ln in f if ln.strip()]
+    sites = read_sites(args.sites_file)
+    shard = parse_shard(args.shard) if args.shard else None
+    if shard is not None:
+        assignment = assign_shards([urlparse(s).netloc for s in sites], shard[1])
+        sites = [s for s in sites if assignment[urlparse(s).netloc.lower()] == shard[0]]
 
     keywords=[]
     if args.keywords_file and os.path.exists(args.keywords_file):
         with open(args.keywords_file, "r", encoding="utf-8") as f:
             keywords=[ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
 
-    client = HttpClient(timeout=args.timeout, delay_ms=args.delay_ms, user_agent=args.user_agent)
+    cfg = load_config(args.config)
+    telemetry = configure_telemetry(args.trace)
+    rl_cfg = cfg.get("rate_limit") or {}
+    limiter = HostRateLimiter.from_config(rl_cfg, delay_ms=args.delay_ms)
+    dyn_cls = get_dynamic_provider()
+    if dyn_cls:
+        # One pooled browser for the whole run (started lazily on first dynamic render),
+        # paced by the same per-host limiter as HTTP requests
+        dyn_cls.configure_pool(cfg.get("playwright"), rate_limiter=limiter)
+    # Product page fetch threads + parser processes (started on first page)
+    configure_pipeline(cfg.get("pipeline"))
+
+    cache = HttpCache.from_config(cfg.get("http_cache"), root=args.http_cache)
+    health_cfg = cfg.get("health") or {}
+    client = HttpClient(timeout=args.timeout, delay_ms=args.delay_ms, user_agent=args.user_agent,
+                        rate_limiter=limiter, max_retries=int(rl_cfg.get("max_retries", 2)), cache=cache,
+                        health=HostHealth.from_config(health_cfg), connect_timeout=health_cfg.get("connect_timeout", 5))
+
+    # A shard only crawls; the store and the combined / Parquet exports are built by `merge`
+    store = ProductStore(args.db) if args.db and shard is None else None
+    if store is not None:
+        store.start_run()
+
+    # Progress journal: completed sites and parsed product URLs survive a killed job
+    journal_name = "journal.ndjson" if shard is None else f"journal-{shard[0]}-of-{shard[1]}.ndjson"
+    journal = RunJournal.open(os.path.join(args.state_dir, journal_name), resume=args.resume) if args.state_dir else None
 
-    all_items=[]; per_counts={}
+    parquet_dir = check_parquet(args.parquet) if shard is None else None
+
+    per_counts={}
     os.makedirs("data/raw", exist_ok=True)
     os.makedirs("data/combined", exist_ok=True)
     os.makedirs("data/site_reports", exist_ok=True)
 
-    # Collect site items (internal, rich), but write per-site exports in strict order
-    for site in tqdm(sites, desc="Sites"):
-        got = run_for_site(site, client, keywords, args.limit_per_site, log_dir="data/site_reports", dynamic_mode=args.dynamic_mode)
-        dom = urlparse(site).netloc
-        per_counts[dom]=len(got)
-
-        # Per-site exports (CSV/JSON) with strict schema
-        export_rows = [to_export_row(it) for it in got]
-        write_json(f"data/raw/{dom}.json", export_rows)
-        write_csv(f"data/raw/{dom}.csv", export_rows)
-
-        all_items.extend(got)
-
-    # Combined RAW (still strict schema)
-    combined_export = [to_export_row(it) for it in all_items]
-    write_json("data/combined/products_raw.json", combined_export)
-    write_csv("data/combined/products_raw.csv", combined_export)
-
-    # Clean: price within range, non-empty name
-    clean_internal=[]
-    for it in all_items:
-        price = it.get("price_egp")
-        if price is None: 
-            continue
-        if not (args.min_price <= float(price) <= args.max_price):
-            continue
-        if not it.get("name"): 
-            continue
-        clean_internal.append(it)
-
-    clean_internal = dedupe(clean_internal)
-
-    # Combined CLEAN (strict schema)
-    clean_export = [to_export_row(it) for it in clean_internal]
-    write_json("data/combined/products_clean.json", clean_export)
-    write_csv("data/combined/products_clean.csv", clean_export)
-
-    # Front-end dataset (can keep richer fields for the viewer)
-    os.makedirs("web/data", exist_ok=True)
-    # Minimal viewer data: keep name, price, url, image, source
-    view = [{
-        "id": it.get("id"),
-        "name": it.get("name"),
-        "price_egp": it.get("price_egp"),
-        "currency": it.get("currency","EGP"),
-        "url": it.get("url"),
-        "image_url": it.get("image_url",""),
-        "source": it.get("source"),
-        "scraped_at": it.get("scraped_at"),
-    } for it in clean_internal]
-    with open("web/data/products.json", "w", encoding="utf-8") as f:
-        json.dump(view, f, ensure_ascii=False, indent=2)
+    # Sites run in parallel; each site's own requests stay sequential. Completed sites
+    # are streamed into the exporters in sites.txt order (out-of-order finishers wait
+    # in `pending`), so outputs don't depend on timing and only unflushed sites are
+    # held in memory. Sites already completed in a resumed journal skip the crawl and
+    # are rebuilt into the outputs from their journaled items.
+    pending: Dict[int, List[Dict]] = {}
+    next_idx = 0
+    resumed_sites = 0
+    try:
+        output = (ShardOutput(args.shards_dir, shard[0], shard[1], state_dir=args.state_dir or None) if shard is not None
+                  else ExportPipeline(args.min_price, args.max_price, parquet_dir=parquet_dir))
+        log_dir = output.log_dir if shard is not None else "data/site_reports"
+        with output as export, \
+                ThreadPoolExecutor(max_workers=max(1, args.site_concurrency)) as pool:
+            def flush():
+                nonlocal next_idx
+                while next_idx in pending:
+                    got = pending.pop(next_idx)
+                    dom = urlparse(sites[next_idx]).netloc
+                    per_counts[dom] = len(got)
+                    export.add_site(dom, got)
+                    if store is not None:
+                        store.add_site(dom, got)
+                    next_idx += 1
+
+            futures = {}
+            for idx, site in enumerate(sites):
+                done = journal.completed(urlparse(site).netloc) if journal is not None else None
+                if done is not None:
+                    pending[idx] = done
+                    resumed_sites += 1
+                    continue
+                futures[pool.submit(run_for_site, site, client, keywords, args.limit_per_site, log_dir=log_dir, dynamic_mode=args.dynamic_mode, state_dir=args.state_dir or None, provider_opts=cfg.get("providers"), memo_mb=float(cfg.get("fetch_memo_mb", 32)), journal=journal, prefilter=(cfg.get("relevance") or {}) if args.prefilter_urls else None, budgets=cfg.get("budgets"), strategy=cfg.get("strategy"))] = idx
+            flush()
+            for fut in tqdm(as_completed(futures), total=len(futures), desc="Sites"):
+                idx = futures[fut]
+                pending[idx] = fut.result()
+                if journal is not None:
+                    journal.record_site(urlparse(sites[idx]).netloc, pending[idx])
+                flush()
+    except BaseException:
+        if journal is not None:
+            journal.close()  # keep what was recorded for --resume
+        raise
+    finally:
+        if dyn_cls:
+            dyn_cls.shutdown_pool()
+        shutdown_pipeline()
+        client.close()
 
     report={
         "generated_at": datetime.utcnow().isoformat()+"Z",
         "min_price": args.min_price,
         "max_price": args.max_price,
         "sites": per_counts,
-        "total_raw": len(all_items),
-        "total_clean": len(clean_internal),
-        "dynamic_mode": args.dynamic_mode,
+        "total_raw": export.total_raw,
     }
-    with open("data/run_report.json", "w", encoding="utf-8") as f:
-        json.dump(report, f, ensure_ascii=False, indent=2)
+    if shard is None:
+        report["total_clean"] = export.total_clean
+        report["product_groups"] = export.total_groups
+    else:
+        report["shard"] = f"{shard[0]}/{shard[1]}"
+    report["dynamic_mode"] = args.dynamic_mode
+    if shard is None and export.parquet is not None:
+        report["parquet"] = {"dir": parquet_dir, "files": export.parquet.files, "rows": export.parquet.rows}
+    if journal is not None and journal.resumed:
+        report["resumed_sites"] = resumed_sites
+    # Per-host request latency/bytes/status/retries/sleep, parse time and provider stage timings
+    report["telemetry"] = telemetry.report()
+    report["health"] = client.health.report()
+    if args.metrics_file:
+        telemetry.write_prometheus(args.metrics_file)
+    telemetry.close()
+    if cache is not None:
+        cache.close()
+        report["http_cache"] = {"hits": cache.hits, "revalidated": cache.revalidated, "misses": cache.misses}
+    if store is not None:
+        report["changes"] = finish_store(store)
+    if shard is not None:
+        export.write_report(report)  # marks the shard complete for `merge`
+    else:
+        with open("data/run_report.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if journal is not None:
+        journal.finish()
     print(json.dumps(report, indent=2))
 
 if __name__ == "__main__":
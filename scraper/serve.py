@@ -0,0 +1,308 @@
+"""``run_all.py serve``: a local query API over the clean dataset, plus the viewer in ``web/``.
+
+    python scraper/run_all.py serve                       # latest run's web/data/bundle
+    python scraper/run_all.py serve --data data/combined/products_clean.json --port 8080
+
+Endpoints (JSON, gzip when accepted, ETag / If-None-Match):
+  GET /api/meta                                   count, fields, price bounds, stores
+  GET /api/search?q=&source=&min=&max=&offset=&limit=
+  GET /api/price?min=&max=&offset=&limit=         price range
+  GET /api/stores                                 stores with product counts
+  GET /api/stores/<store>?q=&min=&max=&offset=&limit=
+Every other path is a file under ``--web-dir`` (``/`` is the viewer).
+"""
+import os, sys, json, gzip, hashlib, argparse, mimetypes, threading, time
+from array import array
+from bisect import bisect_left, bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs, unquote
+
+from export import to_view_row
+from shards import iter_ndjson
+from viewer import SHARD_FIELDS, ViewerBundle, tokens, trigrams
+
+PAGE_SIZE = 96
+MAX_LIMIT = 500
+GZIP_MIN_BYTES = 1024
+# Export column names (products_clean.*) -> item keys
+EXPORT_KEYS = {"product name": "name", "product price": "price_egp", "product url": "url", "site name": "source", "time stamp": "scraped_at"}
+PRICE = SHARD_FIELDS.index("price_egp")
+NAME = SHARD_FIELDS.index("name")
+SOURCE = SHARD_FIELDS.index("source")
+
+
+def load_rows(path: str) -> Tuple[List[List], Optional[str]]:
+    """Price-sorted rows in ``SHARD_FIELDS`` layout and the dataset timestamp.
+
+    ``path`` is a viewer bundle directory (its ``manifest.json``) or a JSON array /
+    NDJSON file of viewer or export rows; files get their groups computed here.
+    """
+    if os.path.isdir(path):
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        rows: List[List] = []
+        for s in manifest["shards"]:
+            with open(os.path.join(path, s["file"]), "r", encoding="utf-8") as f:
+                rows.extend(json.load(f))
+        if manifest.get("fields") != SHARD_FIELDS:
+            rows = [[dict(zip(manifest["fields"], r)).get(k) for k in SHARD_FIELDS] for r in rows]
+        return rows, manifest.get("generated_at")
+    if path.endswith(".ndjson"):
+        items = iter_ndjson(path)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+    bundle = ViewerBundle(out_dir="")
+    for it in items:
+        bundle.add(to_view_row({EXPORT_KEYS.get(k, k): v for k, v in it.items()}))
+    return bundle.finish_rows(), None
+
+
+def _intersect(a, b) -> List[int]:
+    small, big = (a, b) if len(a) <= len(b) else (b, a)
+    big = set(big)
+    return [d for d in small if d in big]
+
+
+class ProductIndex:
+    """Read-only indexes over price-sorted rows (document number = position).
+
+    A price range is a contiguous document range found with ``bisect`` on the
+    sorted price array; the token inverted index (viewer tokens, so Arabic names
+    work like in ``web/app.js``) and the per-store postings are sorted document
+    arrays, so any combination of filters is an intersection clipped to that range.
+    Query terms match like the viewer: shorter than 3 characters by token prefix,
+    otherwise as a substring of a token (via a trigram index over the vocabulary).
+    """
+    def __init__(self, rows: List[List], generated_at: Optional[str] = None):
+        self.rows = rows
+        self.generated_at = generated_at
+        priced = next((i for i, r in enumerate(rows) if r[PRICE] is None), len(rows))
+        self.prices = array("d", (r[PRICE] for r in rows[:priced]))
+        postings: Dict[str, array] = {}
+        self.sources: Dict[str, array] = {}
+        for doc, r in enumerate(rows):
+            for tok in dict.fromkeys(tokens(r[NAME])):
+                postings.setdefault(tok, array("i")).append(doc)
+            self.sources.setdefault(r[SOURCE] or "", array("i")).append(doc)
+        self.postings = postings
+        self.vocab = sorted(postings)
+        self.grams: Dict[str, List[str]] = {}
+        for tok in self.vocab:
+            for g in dict.fromkeys(trigrams(tok)):
+                self.grams.setdefault(g, []).append(tok)
+        self.version = hashlib.sha1(f"{generated_at}|{len(rows)}|{rows[-1] if rows else ''}".encode()).hexdigest()[:16]
+
+    def term_docs(self, term: str) -> List[int]:
+        if len(term) < 3:
+            i = bisect_left(self.vocab, term)
+            toks = []
+            while i < len(self.vocab) and self.vocab[i].startswith(term):
+                toks.append(self.vocab[i])
+                i += 1
+        else:
+            cand = None
+            for g in dict.fromkeys(trigrams(term)):
+                got = self.grams.get(g)
+                if not got:
+                    return []
+                cand = set(got) if cand is None else cand.intersection(got)
+            toks = [t for t in cand if term in t]
+        if len(toks) == 1:
+            return list(self.postings[toks[0]])
+        return sorted({d for t in toks for d in self.postings[t]})
+
+    def price_range(self, lo: Optional[float], hi: Optional[float]) -> Tuple[int, int]:
+        if lo is None and hi is None:
+            return 0, len(self.rows)
+        a = bisect_left(self.prices, lo) if lo is not None else 0
+        return a, max(a, bisect_right(self.prices, hi) if hi is not None else len(self.prices))
+
+    def search(self, q: str = "", source: Optional[str] = None, lo: Optional[float] = None, hi: Optional[float] = None,
+               offset: int = 0, limit: int = PAGE_SIZE) -> Dict:
+        a, b = self.price_range(lo, hi)
+        ids = None
+        for term in dict.fromkeys(tokens(q)):
+            docs = self.term_docs(term)
+            ids = docs if ids is None else _intersect(ids, docs)
+        if source is not None:
+            docs = self.sources.get(source, [])
+            ids = list(docs) if ids is None else _intersect(ids, docs)
+        if ids is None:
+            total, page = b - a, range(a + offset, min(b, a + offset + limit))
+        else:
+            i, j = bisect_left(ids, a), bisect_left(ids, b)
+            total, page = j - i, ids[i + offset:min(j, i + offset + limit)]
+        return {"total": total, "offset": offset, "limit": limit,
+                "items": [dict(zip(SHARD_FIELDS, self.rows[d])) for d in page]}
+
+    def meta(self) -> Dict:
+        return {"count": len(self.rows), "generated_at": self.generated_at, "fields": SHARD_FIELDS, "page_size": PAGE_SIZE,
+                "price": {"min": self.prices[0] if self.prices else None, "max": self.prices[-1] if self.prices else None},
+                "sources": {s: {"count": len(d)} for s, d in sorted(self.sources.items())}}
+
+
+class Dataset:
+    """The index for ``path``, rebuilt when the file (or bundle manifest) changes on disk."""
+    def __init__(self, path: str, check_seconds: float = 2.0):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._stamp = None
+        self._checked = 0.0
+        self._index: Optional[ProductIndex] = None
+        self._lock = threading.Lock()
+
+    def _mtime(self) -> float:
+        p = os.path.join(self.path, "manifest.json") if os.path.isdir(self.path) else self.path
+        return os.stat(p).st_mtime_ns
+
+    def index(self) -> ProductIndex:
+        with self._lock:
+            now = time.monotonic()
+            if self._index is None or now - self._checked > self.check_seconds:
+                self._checked = now
+                stamp = self._mtime()
+                if stamp != self._stamp:
+                    self._index = ProductIndex(*load_rows(self.path))
+                    self._stamp = stamp
+            return self._index
+
+
+def _num(qs: Dict, key: str) -> Optional[float]:
+    try:
+        return float(qs[key][0]) if qs.get(key, [""])[0] != "" else None
+    except ValueError:
+        return None
+
+
+def _int(qs: Dict, key: str, default: int, top: int) -> int:
+    try:
+        return max(0, min(top, int(qs.get(key, [default])[0])))
+    except ValueError:
+        return default
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "EdithServe/1.0"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def do_GET(self):
+        u = urlparse(self.path)
+        try:
+            if u.path.startswith("/api/"):
+                self.api(unquote(u.path[5:]).strip("/"), parse_qs(u.query))
+            else:
+                self.static(unquote(u.path))
+        except Exception as e:
+            self.send_body(500, json.dumps({"error": f"{type(e).__name__}: {e}"}).encode(), "application/json")
+
+    def api(self, route: str, qs: Dict):
+        index = self.server.dataset.index()
+        etag = '"%s"' % hashlib.sha1(f"{index.version}|{self.path}".encode()).hexdigest()[:20]
+        if self.headers.get("If-None-Match") == etag:
+            return self.send_body(304, b"", None, etag)
+        page = dict(offset=_int(qs, "offset", 0, len(index.rows)), limit=_int(qs, "limit", PAGE_SIZE, MAX_LIMIT))
+        q = qs.get("q", [""])[0]
+        lo, hi = _num(qs, "min"), _num(qs, "max")
+        source = qs.get("source", [""])[0] or None
+        if route == "meta":
+            out = index.meta()
+        elif route == "search":
+            out = index.search(q, source, lo, hi, **page)
+        elif route == "price":
+            out = index.search("", None, lo, hi, **page)
+        elif route == "stores":
+            out = {"stores": [{"source": s, "count": v["count"]} for s, v in index.meta()["sources"].items()]}
+        elif route.startswith("stores/"):
+            store = route[len("stores/"):]
+            if store not in index.sources:
+                return self.send_body(404, json.dumps({"error": f"unknown store {store!r}"}).encode(), "application/json")
+            out = index.search(q, store, lo, hi, **page)
+        else:
+            return self.send_body(404, json.dumps({"error": f"no endpoint /api/{route}"}).encode(), "application/json")
+        self.send_body(200, json.dumps(out, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), "application/json; charset=utf-8", etag)
+
+    def static(self, path: str):
+        root = os.path.realpath(self.server.web_dir)
+        full = os.path.realpath(os.path.join(root, path.lstrip("/") or "index.html"))
+        if os.path.isdir(full):
+            full = os.path.join(full, "index.html")
+        if not full.startswith(root + os.sep) or not os.path.isfile(full):
+            return self.send_body(404, b"Not found", "text/plain")
+        st = os.stat(full)
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        # Bundle files are content-hashed (see ViewerBundle); everything else revalidates
+        immutable = "/bundle/" in full and not full.endswith("manifest.json")
+        if self.headers.get("If-None-Match") == etag:
+            return self.send_body(304, b"", None, etag, immutable)
+        with open(full, "rb") as f:
+            body = f.read()
+        self.send_body(200, body, mimetypes.guess_type(full)[0] or "application/octet-stream", etag, immutable)
+
+    def send_body(self, status: int, body: bytes, ctype: Optional[str], etag: Optional[str] = None, immutable: bool = False):
+        self.send_response(status)
+        if ctype:
+            self.send_header("Content-Type", ctype)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable" if immutable else "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        compressible = ctype and (ctype.startswith("text/") or "json" in ctype or "javascript" in ctype)
+        if compressible and len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=6)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, dataset: Dataset, web_dir: str, verbose: bool = False):
+        super().__init__(addr, Handler)
+        self.dataset = dataset
+        self.web_dir = web_dir
+        self.verbose = verbose
+
+
+def default_data() -> str:
+    """The latest run's viewer bundle, else the clean export."""
+    for path in ("web/data/bundle", "data/combined/products_clean.ndjson", "data/combined/products_clean.json"):
+        if os.path.exists(os.path.join(path, "manifest.json") if path.endswith("bundle") else path):
+            return path
+    return "web/data/bundle"
+
+
+def main(argv: List[str]):
+    p = argparse.ArgumentParser(prog="run_all.py serve", description="Query API over the clean dataset, plus the web viewer")
+    p.add_argument("--data", default=None, help="Viewer bundle dir or products_clean.{json,ndjson} (default: latest run's web/data/bundle)")
+    p.add_argument("--web-dir", default="web")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--verbose", action="store_true", help="Log every request")
+    args = p.parse_args(argv)
+    dataset = Dataset(args.data or default_data())
+    t0 = time.perf_counter()
+    index = dataset.index()
+    srv = Server((args.host, args.port), dataset, args.web_dir, verbose=args.verbose)
+    print(f"Indexed {len(index.rows)} products from {dataset.path} in {time.perf_counter() - t0:.2f}s; "
+          f"serving http://{args.host}:{srv.server_port}/ (API under /api/)", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
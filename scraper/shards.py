@@ -0,0 +1,151 @@
+import os, json, shutil, zlib
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+
+from export import NdjsonWriter
+
+# Per-site state directories under --state-dir that travel with a shard
+STATE_KINDS = ("sitemaps", "strategy")
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """``"i/N"`` -> ``(i, N)`` with ``0 <= i < N``."""
+    try:
+        i, n = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"--shard must look like i/N, got {spec!r}")
+    if n < 1 or not 0 <= i < n:
+        raise ValueError(f"--shard {spec}: need 0 <= i < N")
+    return i, n
+
+
+def host_hash(host: str) -> int:
+    """crc32 of the lower-cased host, so every runner and Python version agrees."""
+    return zlib.crc32(host.lower().encode("utf-8"))
+
+
+def shard_of(host: str, count: int) -> int:
+    """Stable shard for a host on its own (hash modulo ``count``); ``assign_shards`` is
+    what the crawl uses, this is the fallback for a host missing from the sites list."""
+    return host_hash(host) % count
+
+
+def assign_shards(hosts: Iterable[str], count: int) -> Dict[str, int]:
+    """Host -> shard for the whole sites list: hosts sorted by ``host_hash`` and dealt
+    round-robin, so shard sizes differ by at most one site (hash modulo a handful of
+    shards leaves some nearly empty). Depends only on the set of hosts, so every shard
+    runner and the merge agree, and a host keeps its shard (with its HTTP cache and
+    journal) until the sites list changes."""
+    order = sorted({h.lower() for h in hosts}, key=lambda h: (host_hash(h), h))
+    return {h: i % count for i, h in enumerate(order)}
+
+
+def shard_dir(root: str, index: int, count: int) -> str:
+    return os.path.join(root, f"{index}-of-{count}")
+
+
+def iter_ndjson(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class ShardOutput:
+    """Crawl output of one shard, merged later by ``run_all.py merge``.
+
+    Stands in for ``ExportPipeline`` in ``--shard`` runs: each completed site's
+    annotated items go to ``items/<domain>.ndjson`` and its updated sitemap and
+    strategy state is copied to ``state/``, so the shard directory alone (one CI artifact)
+    carries everything the merge needs. ``run_report.json`` is written last and
+    marks the shard as complete.
+    """
+    def __init__(self, root: str, index: int, count: int, state_dir: Optional[str] = None):
+        self.dir = shard_dir(root, index, count)
+        self.state_dir = state_dir
+        # A fresh (or resumed) run rebuilds every site, so stale output must not leak into the merge
+        for stale in ("items", "state"):
+            shutil.rmtree(os.path.join(self.dir, stale), ignore_errors=True)
+        if os.path.exists(self.report_path):
+            os.remove(self.report_path)
+        os.makedirs(self.dir, exist_ok=True)
+        self.total_raw = 0
+
+    @property
+    def report_path(self) -> str:
+        return os.path.join(self.dir, "run_report.json")
+
+    @property
+    def log_dir(self) -> str:
+        return os.path.join(self.dir, "site_reports")
+
+    def add_site(self, dom: str, items: List[Dict]):
+        with NdjsonWriter(os.path.join(self.dir, "items", f"{dom}.ndjson")) as w:
+            for it in items:
+                w.write(it)
+        self.total_raw += len(items)
+        for kind in STATE_KINDS if self.state_dir else ():
+            src = os.path.join(self.state_dir, kind, f"{dom}.json")
+            if os.path.exists(src):
+                os.makedirs(os.path.join(self.dir, "state", kind), exist_ok=True)
+                shutil.copyfile(src, os.path.join(self.dir, "state", kind, f"{dom}.json"))
+
+    def write_report(self, report: Dict):
+        with open(self.report_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        os.replace(self.report_path + ".tmp", self.report_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class ShardSet:
+    """Read side of ``count`` shard directories under ``root``, one site at a time.
+    ``hosts`` is the sites list the crawl was sharded from."""
+    def __init__(self, root: str, count: int, hosts: Iterable[str]):
+        self.root = root
+        self.count = count
+        self.assignment = assign_shards(hosts, count)
+        self.reports: Dict[str, Dict] = {}
+        self.missing: List[str] = []
+        for i in range(count):
+            d = shard_dir(root, i, count)
+            try:
+                with open(os.path.join(d, "run_report.json"), "r", encoding="utf-8") as f:
+                    self.reports[os.path.basename(d)] = json.load(f)
+            except (OSError, ValueError):
+                self.missing.append(os.path.basename(d))
+
+    def dir_for(self, dom: str) -> str:
+        index = self.assignment.get(dom.lower())
+        return shard_dir(self.root, shard_of(dom, self.count) if index is None else index, self.count)
+
+    def complete(self, dom: str) -> bool:
+        return os.path.basename(self.dir_for(dom)) in self.reports
+
+    def _items_path(self, dom: str) -> str:
+        return os.path.join(self.dir_for(dom), "items", f"{dom}.ndjson")
+
+    def has_site(self, dom: str) -> bool:
+        """The site was crawled: its shard finished, or got as far as this site before it
+        failed or timed out (item files are written atomically once a site completes)."""
+        return self.complete(dom) or os.path.exists(self._items_path(dom))
+
+    def items(self, dom: str) -> List[Dict]:
+        path = self._items_path(dom)
+        return list(iter_ndjson(path)) if self.has_site(dom) and os.path.exists(path) else []
+
+    def install(self, log_dir: str, state_dir: Optional[str]):
+        """Copy the shards' site logs and per-site state to where an unsharded run keeps them."""
+        for i in range(self.count):
+            d = shard_dir(self.root, i, self.count)
+            pairs = [(os.path.join(d, "site_reports"), log_dir)]
+            pairs += [(os.path.join(d, "state", kind), os.path.join(state_dir, kind) if state_dir else None) for kind in STATE_KINDS]
+            for src, dst in pairs:
+                if dst is None or not os.path.isdir(src):
+                    continue
+                os.makedirs(dst, exist_ok=True)
+                for fn in os.listdir(src):
+                    shutil.copyfile(os.path.join(src, fn), os.path.join(dst, fn))
@@ -0,0 +1,147 @@
+import os, sqlite3
+from datetime import datetime
+from typing import List, Dict, Optional, Iterator
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at  TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS run_sites (
+    run_id  INTEGER NOT NULL,
+    source  TEXT NOT NULL,
+    items   INTEGER NOT NULL,
+    PRIMARY KEY (run_id, source)
+);
+CREATE TABLE IF NOT EXISTS products (
+    id         TEXT PRIMARY KEY,
+    name       TEXT,
+    price_egp  REAL,
+    currency   TEXT,
+    url        TEXT,
+    image_url  TEXT,
+    source     TEXT,
+    first_seen TEXT,
+    last_seen  TEXT,
+    first_run  INTEGER,
+    last_run   INTEGER
+);
+CREATE INDEX IF NOT EXISTS products_last_run ON products (last_run, source);
+CREATE TABLE IF NOT EXISTS price_history (
+    id          TEXT NOT NULL,
+    run_id      INTEGER NOT NULL,
+    price_egp   REAL,
+    observed_at TEXT NOT NULL,
+    PRIMARY KEY (id, run_id)
+);
+"""
+
+PRODUCT_FIELDS = ("id", "name", "price_egp", "currency", "url", "image_url", "source")
+
+
+class ProductStore:
+    """Embedded SQLite (WAL) state keyed by the stable ``make_id``.
+
+    ``products`` holds the latest state of every product ever seen; ``price_history``
+    is append-only and gets a row whenever a product is first seen or its price
+    changes. Each run is recorded so exports can be expressed as queries: the
+    current snapshot, price changes since the previous run, and items that
+    disappeared from sites that were crawled successfully.
+    """
+    def __init__(self, path: str):
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.run_id: Optional[int] = None
+        self.prev_run_id: Optional[int] = None
+
+    def start_run(self) -> int:
+        row = self.conn.execute("SELECT MAX(run_id) FROM runs WHERE finished_at IS NOT NULL").fetchone()
+        self.prev_run_id = row[0]
+        with self.conn:
+            cur = self.conn.execute("INSERT INTO runs (started_at) VALUES (?)", (datetime.utcnow().isoformat()+"Z",))
+        self.run_id = cur.lastrowid
+        return self.run_id
+
+    def add_site(self, dom: str, items: List[Dict]):
+        """Batched upsert of one site's items (one transaction per site)."""
+        rows = [tuple(it.get(k) for k in PRODUCT_FIELDS) + (it.get("scraped_at"),) for it in items if it.get("id")]
+        with self.conn:
+            # History first, while `products` still holds the previous price
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO price_history (id, run_id, price_egp, observed_at) "
+                "SELECT ?1, ?2, ?3, ?4 WHERE NOT EXISTS (SELECT 1 FROM products WHERE id = ?1 AND price_egp IS ?3)",
+                [(r[0], self.run_id, r[2], r[7]) for r in rows])
+            self.conn.executemany(
+                "INSERT INTO products (id, name, price_egp, currency, url, image_url, source, first_seen, last_seen, first_run, last_run) "
+                "VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?8, ?9, ?9) "
+                "ON CONFLICT(id) DO UPDATE SET name=excluded.name, price_egp=excluded.price_egp, currency=excluded.currency, "
+                "url=excluded.url, image_url=excluded.image_url, source=excluded.source, last_seen=excluded.last_seen, last_run=excluded.last_run",
+                [r + (self.run_id,) for r in rows])
+            self.conn.execute("INSERT OR REPLACE INTO run_sites (run_id, source, items) VALUES (?, ?, ?)", (self.run_id, dom, len(items)))
+
+    def carry_site(self, dom: str) -> int:
+        """Keep a site that was not crawled this run (its shard failed first) in this run's
+        snapshot: its products from the previous run move to this run unchanged.
+        ``last_seen`` and ``price_history`` are left alone (nothing was observed), and no
+        ``run_sites`` row is written, so ``disappeared`` does not judge the site."""
+        if self.prev_run_id is None:
+            return 0
+        with self.conn:
+            cur = self.conn.execute("UPDATE products SET last_run = ? WHERE source = ? AND last_run = ?",
+                                    (self.run_id, dom, self.prev_run_id))
+        return cur.rowcount
+
+    def finish_run(self):
+        with self.conn:
+            self.conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (datetime.utcnow().isoformat()+"Z", self.run_id))
+
+    # -- queries -------------------------------------------------------------
+    def snapshot(self, run_id: Optional[int] = None) -> Iterator[Dict]:
+        """Products seen in ``run_id`` (default: this run)."""
+        for r in self.conn.execute("SELECT * FROM products WHERE last_run = ? ORDER BY source, id", (run_id or self.run_id,)):
+            yield dict(r)
+
+    def price_changes(self) -> List[Dict]:
+        """Products whose price in this run differs from their previous observation."""
+        q = """
+        SELECT p.id, p.name, p.source, p.url, p.currency,
+               (SELECT h2.price_egp FROM price_history h2 WHERE h2.id = h.id AND h2.run_id < h.run_id
+                ORDER BY h2.run_id DESC LIMIT 1) AS old_price,
+               h.price_egp AS new_price
+        FROM price_history h JOIN products p ON p.id = h.id
+        WHERE h.run_id = ? AND p.first_run < ?
+        ORDER BY p.source, p.name
+        """
+        return [dict(r) for r in self.conn.execute(q, (self.run_id, self.run_id))]
+
+    def new_items(self) -> List[Dict]:
+        return [dict(r) for r in self.conn.execute(
+            "SELECT id, name, price_egp, currency, url, source FROM products WHERE first_run = ? ORDER BY source, name", (self.run_id,))]
+
+    def disappeared(self) -> List[Dict]:
+        """Seen in the previous run but not this one, on sites that returned items this run.
+
+        Sites that came back empty (down, blocked) are excluded so an outage does not
+        read as the whole catalog disappearing.
+        """
+        if self.prev_run_id is None:
+            return []
+        q = """
+        SELECT id, name, price_egp, currency, url, source, last_seen FROM products
+        WHERE last_run = ? AND source IN (SELECT source FROM run_sites WHERE run_id = ? AND items > 0)
+        ORDER BY source, name
+        """
+        return [dict(r) for r in self.conn.execute(q, (self.prev_run_id, self.run_id))]
+
+    def close(self):
+        # Fold the WAL back into the main file so the database is a single file on disk
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.close()
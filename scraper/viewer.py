@@ -0,0 +1,138 @@
+import os, re, json, hashlib
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from matching import match_names, group_id
+
+# Row layout inside price shards (the manifest carries it so the viewer never hard-codes it)
+VIEW_FIELDS = ["id", "name", "price_egp", "currency", "url", "image_url", "source"]
+GROUP_FIELDS = ["product_group", "group_size", "group_min", "group_max"]
+SHARD_FIELDS = VIEW_FIELDS + GROUP_FIELDS
+SHARD_SIZE = 2000
+# Unicode letters/digits, so Arabic names are searchable too (same rule as web/app.js)
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def tokens(text: str) -> List[str]:
+    return TOKEN_RE.findall((text or "").lower())
+
+
+def trigrams(tok: str) -> List[str]:
+    return [tok[i:i+3] for i in range(len(tok) - 2)]
+
+
+def _deltas(ids: List[int]) -> List[int]:
+    return [ids[0]] + [b - a for a, b in zip(ids, ids[1:])] if ids else []
+
+
+def _dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ViewerBundle:
+    """Static dataset for ``web/``: price-sorted shards, per-source postings and a search index.
+
+    Document numbers are positions in ascending price order, so a price range is a
+    contiguous doc range and every posting list comes out price-sorted. Shard files
+    are named by content hash (cacheable forever); only ``manifest.json`` changes
+    name-stably between runs. Files of the previous manifest are kept one run so
+    browsers holding it can still finish loading.
+    """
+    def __init__(self, out_dir: str, shard_size: int = SHARD_SIZE):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        self.rows: List[List] = []
+        self.groups: List[Dict] = []
+
+    def add(self, view_row: Dict):
+        self.rows.append([view_row.get(k) for k in VIEW_FIELDS])
+
+    def assign_groups(self) -> List[Dict]:
+        """Cross-store matching: append ``GROUP_FIELDS`` to every row, return the groups with 2+ members."""
+        members: Dict[int, List[int]] = {}
+        for doc, label in enumerate(match_names([r[1] or "" for r in self.rows])):
+            members.setdefault(label, []).append(doc)
+        groups = []
+        for docs in members.values():
+            rows = [self.rows[d] for d in docs]
+            prices = [r[2] for r in rows if r[2] is not None]
+            lo, hi = (min(prices), max(prices)) if prices else (None, None)
+            gid = group_id([r[0] or "" for r in rows])
+            for r in rows:
+                r += [gid, len(rows), lo, hi]
+            if len(rows) > 1:
+                groups.append({"product_group": gid, "name": rows[0][1], "min_price": lo, "max_price": hi,
+                               "stores": len({r[6] for r in rows}),
+                               "items": [{"id": r[0], "source": r[6], "price_egp": r[2], "url": r[4]} for r in rows]})
+        groups.sort(key=lambda g: (-len(g["items"]), g["name"] or ""))
+        return groups
+
+    def finish_rows(self) -> List[List]:
+        """Sort the rows into document (ascending price) order and attach the group fields."""
+        self.rows.sort(key=lambda r: (r[2] if r[2] is not None else float("inf"), r[1] or ""))
+        self.groups = self.assign_groups()
+        return self.rows
+
+    def _write(self, prefix: str, obj) -> str:
+        data = _dumps(obj)
+        name = f"{prefix}-{hashlib.sha1(data).hexdigest()[:12]}.json"
+        path = os.path.join(self.out_dir, name)
+        if not os.path.exists(path):
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        return name
+
+    def build_index(self) -> Dict:
+        postings: Dict[str, List[int]] = {}
+        for doc, row in enumerate(self.rows):
+            for tok in dict.fromkeys(tokens(row[1])):
+                postings.setdefault(tok, []).append(doc)
+        vocab = sorted(postings)
+        grams: Dict[str, List[int]] = {}
+        for tid, tok in enumerate(vocab):
+            for g in dict.fromkeys(trigrams(tok)):
+                grams.setdefault(g, []).append(tid)
+        return {"tokens": vocab, "postings": [_deltas(postings[t]) for t in vocab],
+                "trigrams": {g: _deltas(ids) for g, ids in sorted(grams.items())}}
+
+    def close(self) -> Optional[Dict]:
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.finish_rows()
+        shards = []
+        for start in range(0, len(self.rows), self.shard_size):
+            chunk = self.rows[start:start + self.shard_size]
+            shards.append({"file": self._write(f"price-{len(shards):03d}", chunk), "start": start,
+                           "count": len(chunk), "min": chunk[0][2], "max": chunk[-1][2]})
+        by_source: Dict[str, List[int]] = {}
+        for doc, row in enumerate(self.rows):
+            by_source.setdefault(row[6] or "", []).append(doc)
+        sources = {src: {"count": len(ids), "file": self._write("source", _deltas(ids))} for src, ids in sorted(by_source.items())}
+        manifest = {"version": 1, "generated_at": datetime.utcnow().isoformat()+"Z", "count": len(self.rows),
+                    "fields": SHARD_FIELDS, "shard_size": self.shard_size, "shards": shards,
+                    "sources": sources, "index": self._write("index", self.build_index())}
+
+        man_path = os.path.join(self.out_dir, "manifest.json")
+        keep = self._files(manifest)
+        if os.path.exists(man_path):
+            try:
+                with open(man_path, "r", encoding="utf-8") as f:
+                    keep |= self._files(json.load(f))
+            except ValueError:
+                pass
+        with open(man_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(man_path + ".tmp", man_path)
+        for name in os.listdir(self.out_dir):
+            if name.endswith(".json") and name != "manifest.json" and name not in keep:
+                os.remove(os.path.join(self.out_dir, name))
+        self.rows = []
+        return manifest
+
+    @staticmethod
+    def _files(manifest: Dict) -> set:
+        files = {s["file"] for s in manifest.get("shards", [])}
+        files |= {s["file"] for s in manifest.get("sources", {}).values()}
+        if manifest.get("index"):
+            files.add(manifest["index"])
+        return files
@@ -1,24 +1,33 @@
-import time, random, requests, re, os
+import requests, re, os
 from typing import Optional, List, Dict
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 
 from ..models import Product
 from ..utils import parse_price_any, make_id
+from .rate_limit import HostRateLimiter
 
 class HttpClient:
-    def __init__(self, timeout: int = 25, delay_ms: int = 900, user_agent: Optional[str] = None):
+    def __init__(self, timeout: int = 25, delay_ms: int = 900, user_agent: Optional[str] = None,
+                 rate_limiter: Optional[HostRateLimiter] = None, max_retries: int = 2):
         self.session = requests.Session()
         self.timeout = timeout
         self.delay_ms = delay_ms
         self.user_agent = user_agent or os.getenv("SCRAPER_USER_AGENT") or "Mozilla/5.0 (compatible; EdithScraper/2.0)"
+        self.rate_limiter = rate_limiter or HostRateLimiter.from_config(None, delay_ms=delay_ms)
+        self.max_retries = max_retries
 
     def get(self, url: str, **kwargs):
         headers = kwargs.pop("headers", {})
         headers.setdefault("User-Agent", self.user_agent)
         headers.setdefault("Accept-Language", "en-EG,en;q=0.9,ar-EG;q=0.8")
-        time.sleep((self.delay_ms + random.randint(0, 300)) / 1000.0)
-        resp = self.session.get(url, headers=headers, timeout=self.timeout, **kwargs)
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(url)
+            resp = self.session.get(url, headers=headers, timeout=self.timeout, **kwargs)
+            throttled = self.rate_limiter.on_response(url, resp.status_code, resp.headers.get("Retry-After"))
+            if not throttled or attempt == self.max_retries:
+                break
+            resp.close()
         resp.raise_for_status()
         return resp
 
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from export import JsonArrayWriter, NdjsonWriter
+
+ROWS = [
+    {"id": "a1", "product name": "Logitech G102 \"Lightsync\"", "product price": 899.0, "currency": "EGP"},
+    {"id": "b2", "product name": "ماوس ألعاب", "product price": None, "tags": ["x", {"y": [1, 2.5]}], "empty": {}},
+    {"id": "c3", "product name": "tab\tand back\\slash", "nested": {"a": {"b": []}}},
+]
+
+
+@pytest.mark.parametrize("rows", [[], ROWS[:1], ROWS])
+def test_json_array_writer_matches_json_dump(tmp_path, rows):
+    path = tmp_path / "out.json"
+    with JsonArrayWriter(str(path)) as w:
+        for row in rows:
+            w.write(row)
+    expected = tmp_path / "expected.json"
+    with open(expected, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+    assert path.read_bytes() == expected.read_bytes()
+    assert w.count == len(rows)
+
+
+def test_discard_keeps_previous_output(tmp_path):
+    path = tmp_path / "out.json"
+    path.write_text("previous", encoding="utf-8")
+    w = JsonArrayWriter(str(path))
+    w.write(ROWS[0])
+    w.discard()
+    assert path.read_text(encoding="utf-8") == "previous"
+    assert not (tmp_path / "out.json.tmp").exists()
+
+
+def test_ndjson_writer_round_trips(tmp_path):
+    path = tmp_path / "out.ndjson"
+    with NdjsonWriter(str(path)) as w:
+        for row in ROWS:
+            w.write(row)
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(ln) for ln in f] == ROWS
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from providers import extract
+from providers.extract import parse_page
+
+URL = "https://shop.example/products/g102"
+
+
+def page(head: str = "", body: str = "") -> str:
+    return f"<!DOCTYPE html><html><head><title>G102 | Shop</title>{head}</head><body>{body}</body></html>"
+
+
+def ld(price, currency="EGP", name="Logitech G102"):
+    return '<script type="application/ld+json">' + json.dumps({
+        "@context": "https://schema.org", "@type": "Product", "name": name, "image": "/img/g102.jpg",
+        "brand": {"@type": "Brand", "name": "Logitech"},
+        "offers": {"@type": "Offer", "price": price, "priceCurrency": currency}}) + "</script>"
+
+
+BODY = '<div class="product"><span class="price">1,299 EGP</span><span itemprop="price" content="1299">1,299</span></div>'
+
+PAGES = {
+    "head_json_ld": page(ld("899.00") + '<meta property="og:title" content="G102 Lightsync">', BODY),
+    "head_meta_price": page('<meta property="og:title" content="G102"><meta property="product:price:amount" content="950">'
+                            '<meta property="product:price:currency" content="EGP">', BODY),
+    "og_currency": page('<meta property="og:title" content="G102"><meta property="og:price:amount" content="30">'
+                        '<meta property="og:price:currency" content="USD">', BODY),
+    # The body's JSON-LD outranks the head meta price, so the body has to be parsed
+    "body_json_ld": page('<meta property="og:title" content="G102"><meta property="product:price:amount" content="950">'
+                         '<meta property="product:price:currency" content="EGP">', ld("875") + BODY),
+    # No currency in <head>: the microdata currency in the body decides it
+    "body_currency": page('<meta property="og:title" content="G102"><meta property="product:price:amount" content="950">',
+                          '<meta itemprop="priceCurrency" content="SAR">' + BODY),
+    "body_only": page("", '<h1>G102</h1>' + BODY),
+}
+
+
+@pytest.fixture
+def passes(monkeypatch):
+    """Records whether each parse ran head-only (False) or over the whole page (True)."""
+    seen = []
+    collect = extract._collect
+
+    def spy(tree, full):
+        seen.append(full)
+        return collect(tree, full)
+    monkeypatch.setattr(extract, "_collect", spy)
+    return seen
+
+
+def full_parse(html: str, monkeypatch) -> dict:
+    with monkeypatch.context() as m:
+        m.setattr(extract, "HEAD_PRICE_HINTS", ())
+        return parse_page(html, URL, "shop.example")[0]
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_fast_path_matches_full_parse(name, monkeypatch):
+    html = PAGES[name]
+    assert parse_page(html, URL, "shop.example")[0] == full_parse(html, monkeypatch)
+
+
+@pytest.mark.parametrize("name, full", [("head_json_ld", False), ("head_meta_price", False), ("og_currency", False),
+                                        ("body_json_ld", True), ("body_currency", True), ("body_only", True)])
+def test_body_parsed_only_when_head_is_not_enough(name, full, passes):
+    parse_page(PAGES[name], URL, "shop.example")
+    assert passes[-1] is full
+
+
+def test_fields():
+    assert parse_page(PAGES["head_json_ld"], URL, "shop.example")[0] == {
+        "name": "G102 Lightsync", "price_egp": 899.0, "currency": "EGP", "url": URL,
+        "image_url": "https://shop.example/img/g102.jpg", "brand": "Logitech", "category": None, "source": "shop.example"}
+    assert parse_page(PAGES["og_currency"], URL, "shop.example")[0]["currency"] == "USD"
+    assert parse_page(PAGES["body_json_ld"], URL, "shop.example")[0]["price_egp"] == 875.0
+    assert parse_page(PAGES["body_currency"], URL, "shop.example")[0]["currency"] == "SAR"
+
+
+def test_empty_page():
+    item, ms = parse_page("  ", URL, "shop.example")
+    assert ms is None and item["name"] == "" and item["price_egp"] is None
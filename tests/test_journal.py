@@ -0,0 +1,65 @@
+import json
+
+from journal import RunJournal
+
+ITEM = {"name": "G102", "price_egp": 899.0}
+
+
+def interrupted(path, torn: str = ""):
+    """A journal whose writer was killed mid-run, optionally mid-line."""
+    j = RunJournal.open(str(path), resume=False)
+    j.record_site("a.example", [ITEM])
+    j.record_url("b.example", "https://b.example/p/1", ITEM)
+    j.close()
+    if torn:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(torn)
+
+
+def records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(ln) for ln in f]
+
+
+def test_resume_after_torn_line(tmp_path):
+    path = tmp_path / "journal.ndjson"
+    interrupted(path, torn='{"t": "url", "site": "b.example", "url": "https://b.exa')
+    j = RunJournal.open(str(path), resume=True)
+    assert j.resumed
+    assert j.completed("a.example") == [ITEM]
+    assert j.parsed_urls("b.example") == {"https://b.example/p/1": ITEM}
+    # The torn tail is cut off, so new records start on a line of their own
+    j.record_url("b.example", "https://b.example/p/2", ITEM)
+    j.close()
+    assert [r["t"] for r in records(path)] == ["run", "site", "url", "url"]
+    assert RunJournal.open(str(path), resume=True).parsed_urls("b.example").keys() == {"https://b.example/p/1", "https://b.example/p/2"}
+
+
+def test_completed_site_supersedes_its_urls(tmp_path):
+    path = tmp_path / "journal.ndjson"
+    interrupted(path)
+    j = RunJournal.open(str(path), resume=True)
+    j.record_site("b.example", [ITEM, ITEM])
+    j.close()
+    j = RunJournal.open(str(path), resume=True)
+    assert j.completed("b.example") == [ITEM, ITEM]
+    assert j.parsed_urls("b.example") == {}
+
+
+def test_finished_journal_starts_over(tmp_path):
+    path = tmp_path / "journal.ndjson"
+    interrupted(path)
+    RunJournal.open(str(path), resume=True).finish()
+    j = RunJournal.open(str(path), resume=True)
+    assert not j.resumed and j.completed("a.example") is None
+    j.close()
+    assert [r["t"] for r in records(path)] == ["run"]
+
+
+def test_no_resume_truncates(tmp_path):
+    path = tmp_path / "journal.ndjson"
+    interrupted(path)
+    j = RunJournal.open(str(path), resume=False)
+    j.close()
+    assert not j.resumed
+    assert [r["t"] for r in records(path)] == ["run"]
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from providers.rate_limit import parse_retry_after
+
+
+@pytest.mark.parametrize("value, expected", [("0", 0.0), ("120", 120.0), (" 7 ", 7.0)])
+def test_delta_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_http_date_in_the_future():
+    when = datetime.now(timezone.utc) + timedelta(seconds=90)
+    assert 80 <= parse_retry_after(format_datetime(when, usegmt=True)) <= 90
+
+
+def test_http_date_in_the_past_means_no_wait():
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+@pytest.mark.parametrize("value", [None, "", "soon", "-5", "1.5"])
+def test_unusable_values(value):
+    assert parse_retry_after(value) is None
@@ -0,0 +1,56 @@
+import os
+from collections import Counter
+from urllib.parse import urlparse
+
+import pytest
+
+from shards import ShardSet, assign_shards, parse_shard, shard_dir, shard_of
+
+SITES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scraper", "sites.txt")
+
+
+def hosts():
+    with open(SITES, encoding="utf-8") as f:
+        return [urlparse(ln.strip()).netloc for ln in f if ln.strip()]
+
+
+def test_shard_of_is_pinned():
+    # crc32 values: these must not change between runners or Python versions
+    assert [shard_of(h, 4) for h in ("2b.com.eg", "www.jumia.com.eg", "example.com")] == [0, 1, 1]
+    assert shard_of("WWW.Jumia.com.eg", 4) == shard_of("www.jumia.com.eg", 4)
+
+
+def test_assignment_is_balanced():
+    hs = hosts()
+    for count in (2, 3, 4, 5):
+        sizes = Counter(assign_shards(hs, count).values())
+        assert sorted(sizes) == list(range(count))
+        assert max(sizes.values()) - min(sizes.values()) <= 1
+
+
+def test_assignment_ignores_order_case_and_duplicates():
+    hs = hosts()
+    expected = assign_shards(hs, 4)
+    assert assign_shards(list(reversed(hs)) + hs[:3], 4) == expected
+    assert assign_shards([h.upper() for h in hs], 4) == expected
+
+
+def test_shard_set_follows_the_assignment(tmp_path):
+    hs = hosts()
+    shards = ShardSet(str(tmp_path), 4, hs)
+    assert shards.missing == [f"{i}-of-4" for i in range(4)]
+    for h, i in assign_shards(hs, 4).items():
+        assert shards.dir_for(h) == shard_dir(str(tmp_path), i, 4)
+    # A host missing from the list falls back to its hash
+    assert shards.dir_for("new.example") == shard_dir(str(tmp_path), shard_of("new.example", 4), 4)
+
+
+@pytest.mark.parametrize("spec, expected", [("0/4", (0, 4)), ("3/4", (3, 4))])
+def test_parse_shard(spec, expected):
+    assert parse_shard(spec) == expected
+
+
+@pytest.mark.parametrize("spec", ["4/4", "1", "a/b", "0/0"])
+def test_parse_shard_rejects(spec):
+    with pytest.raises(ValueError):
+        parse_shard(spec)
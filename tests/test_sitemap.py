@@ -0,0 +1,105 @@
+import gzip
+
+from providers.sitemap import iter_sitemap, parse_sitemap_chunks, parse_sitemap_text
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9" xmlns:image="http://www.google.com/schemas/sitemap-image/1.1">
+  <url><loc>https://shop.example/products/a</loc><lastmod>2024-05-01</lastmod>
+    <image:image><image:loc>https://cdn.example/a.jpg</image:loc><image:title>Gaming Mouse A</image:title></image:image>
+  </url>
+  <url><loc>https://shop.example/products/b</loc></url>
+</urlset>"""
+
+INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://shop.example/sitemap_products_1.xml.gz</loc><lastmod>2024-05-02</lastmod></sitemap>
+  <sitemap><loc>/nested_index.xml</loc></sitemap>
+</sitemapindex>"""
+
+NESTED = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://shop.example/sitemap_products_2.xml</loc></sitemap>
+  <sitemap><loc>https://shop.example/sitemap.xml</loc></sitemap>
+</sitemapindex>"""
+
+EXPECTED = [
+    ("url", "https://shop.example/products/a", "2024-05-01", "Gaming Mouse A"),
+    ("url", "https://shop.example/products/b", None, None),
+]
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_urlset_in_small_chunks():
+    # The image:loc must not replace the page loc, whatever the chunk boundaries
+    for size in (1, 7, 64, len(URLSET)):
+        assert list(parse_sitemap_chunks(chunked(URLSET, size))) == EXPECTED
+
+
+def test_gzip_stream():
+    assert list(parse_sitemap_chunks(chunked(gzip.compress(URLSET), 50))) == EXPECTED
+
+
+def test_index_records():
+    assert list(parse_sitemap_chunks([INDEX])) == [
+        ("sitemap", "https://shop.example/sitemap_products_1.xml.gz", "2024-05-02", None),
+        ("sitemap", "/nested_index.xml", None, None),
+    ]
+
+
+def test_broken_xml_falls_back_to_loc_scan():
+    text = "<urlset><url><loc>https://shop.example/products/a</loc></url><url><loc>https://shop.example/products/b</loc>"
+    assert [r[1] for r in parse_sitemap_text(text)] == ["https://shop.example/products/a", "https://shop.example/products/b"]
+
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.closed = False
+
+    def iter_content(self, size):
+        return iter(chunked(self.body, size))
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get(self, url, stream=False):
+        self.requested.append(url)
+        if url not in self.pages:
+            raise OSError(f"no route to {url}")
+        return FakeResponse(self.pages[url])
+
+
+def test_iter_sitemap_follows_nested_and_gzipped_indexes():
+    child2 = URLSET.replace(b"/products/a", b"/products/c").replace(b"/products/b", b"/products/d")
+    client = FakeClient({
+        "https://shop.example/sitemap.xml": INDEX,
+        "https://shop.example/sitemap_products_1.xml.gz": gzip.compress(URLSET),
+        "https://shop.example/nested_index.xml": NESTED,
+        "https://shop.example/sitemap_products_2.xml": child2,
+    })
+    titles = {}
+    got = list(iter_sitemap(client, "https://shop.example/sitemap.xml", titles=titles))
+    assert got == [
+        ("https://shop.example/products/a", "2024-05-01"),
+        ("https://shop.example/products/b", None),
+        ("https://shop.example/products/c", "2024-05-01"),
+        ("https://shop.example/products/d", None),
+    ]
+    assert titles == {"https://shop.example/products/a": "Gaming Mouse A", "https://shop.example/products/c": "Gaming Mouse A"}
+    # The nested index links back to the root: it is not fetched twice
+    assert client.requested.count("https://shop.example/sitemap.xml") == 1
+
+
+def test_iter_sitemap_respects_max_depth_and_skips_unreachable():
+    client = FakeClient({"https://shop.example/sitemap.xml": INDEX})
+    assert list(iter_sitemap(client, "https://shop.example/sitemap.xml", max_depth=1)) == []
+    assert client.requested == ["https://shop.example/sitemap.xml", "https://shop.example/sitemap_products_1.xml.gz",
+                                "https://shop.example/nested_index.xml"]
@@ -1 +1 @@
-const fmt=new Intl.NumberFormat('ar-EG',{style:'currency',currency:'EGP'});const e={grid:document.getElementById('grid'),count:document.getElementById('count'),search:document.getElementById('search'),brand:document.getElementById('brand'),minPrice:document.getElementById('minPrice'),maxPrice:document.getElementById('maxPrice'),clear:document.getElementById('clear')};let a=[],l=[];async function load(){const t=await fetch('data/products.json?_='+Date.now());a=await t.json();const n=[...new Set(a.map(p=>p.brand).filter(Boolean))].sort();e.brand.innerHTML='<option value="">All brands</option>'+n.map(b=>`<option>${b}</option>`).join('');applyFilters()}function applyFilters(){const t=(e.search.value||'').toLowerCase(),n=e.brand.value||'',r=parseFloat(e.minPrice.value),o=parseFloat(e.maxPrice.value);l=a.filter(p=>{const s=!t||p.name.toLowerCase().includes(t),i=!n||p.brand===n,c=p.price_egp||0,d=isNaN(r)||c>=r,u=isNaN(o)||c<=o;return s&&i&&d&&u});render()}function render(){e.count.textContent=`${l.length} products`;e.grid.innerHTML=l.map(p=>`<article class='card'><img src='${p.image_url||''}' alt='${p.name}' loading='lazy'/><div class='body'><h3>${p.name}</h3><div class='price'>${fmt.format(p.price_egp||0)}</div><div class='meta'>${p.brand||''} • ${p.category||''} • <span>${p.source||''}</span></div><a class='btn' href='${p.url}' target='_blank' rel='noopener'>View</a></div></article>`).join('')}['input','change'].forEach(t=>{e.search.addEventListener(t,applyFilters);e.brand.addEventListener(t,applyFilters);e.minPrice.addEventListener(t,applyFilters);e.maxPrice.addEventListener(t,applyFilters)});e.clear.addEventListener('click',()=>{e.search.value='';e.brand.value='';e.minPrice.value='';e.maxPrice.value='';applyFilters()});load()
\ No newline at end of file
+const fmt=new Intl.NumberFormat('ar-EG',{style:'currency',currency:'EGP'});const e={view:document.getElementById('viewport'),grid:document.getElementById('grid'),count:document.getElementById('count'),search:document.getElementById('search'),source:document.getElementById('source'),minPrice:document.getElementById('minPrice'),maxPrice:document.getElementById('maxPrice'),clear:document.getElementById('clear')};const A='api/',B='data/bundle/',ROW=340,GAP=16,MIN_W=220;let M=null,F={},api=0,Q='',idx=null,res={length:0,get:i=>i},seq=0,raf=0;const loaded=new Map(),pend=new Map(),srcs={};const esc=s=>String(s??'').replace(/[&<>"']/g,c=>({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;',"'":'&#39;'}[c]));const toks=s=>s.toLowerCase().match(/[\p{L}\p{N}]+/gu)||[];const undelta=a=>{const o=new Int32Array(a.length);let v=0;for(let i=0;i<a.length;i++){v+=a[i];o[i]=v}return o};const dl=a=>a.map((v,i)=>i?v-a[i-1]:v);const getJSON=(u,o)=>fetch(u,o).then(r=>{if(!r.ok)throw new Error(u+': '+r.status);return r.json()});const lowerBound=(n,ok)=>{let l=0,h=n;while(l<h){const m=(l+h)>>1;ok(m)?h=m:l=m+1}return l};function intersect(a,b){const o=[];let i=0,j=0;while(i<a.length&&j<b.length){if(a[i]<b[j])i++;else if(a[i]>b[j])j++;else{o.push(a[i]);i++;j++}}return Int32Array.from(o)}function union(ls){if(ls.length===1)return ls[0];const o=Int32Array.from(ls.flatMap(l=>[...l])).sort();return o.filter((v,i)=>!i||v!==o[i-1])}const rowOf=o=>M.fields.map(f=>o[f]);const page=(q,k)=>getJSON(`${A}search?${q}&offset=${k*api}&limit=${api}`);function shard(k){if(loaded.has(k))return Promise.resolve(loaded.get(k));if(!pend.has(k)){const q=Q;pend.set(k,(api?page(q,k).then(r=>r.items.map(rowOf)):getJSON(B+M.shards[k].file)).then(r=>(q===Q&&(loaded.set(k,r),pend.delete(k)),r)))}return pend.get(k)}function srcDocs(s){return srcs[s]||(srcs[s]=M.sources[s]?getJSON(B+M.sources[s].file).then(undelta):Promise.resolve(new Int32Array(0)))}function index(){return idx||(idx=getJSON(B+M.index).then(x=>(x.dec={},x)))}function mkIndex(R){const P=new Map();R.forEach((r,d)=>new Set(toks(r[F.name]||'')).forEach(t=>{P.has(t)||P.set(t,[]);P.get(t).push(d)}));const V=[...P.keys()].sort(),G={};V.forEach((t,i)=>{for(let k=0;k+3<=t.length;k++){const g=G[t.slice(k,k+3)]||(G[t.slice(k,k+3)]=[]);g[g.length-1]!==i&&g.push(i)}});return{tokens:V,postings:V.map(t=>dl(P.get(t))),trigrams:Object.fromEntries(Object.entries(G).map(([g,a])=>[g,dl(a)])),dec:{}}}function post(x,t){return x.dec[t]||(x.dec[t]=undelta(x.postings[t]))}function gram(x,g){const k='g:'+g;return x.dec[k]||(x.dec[k]=undelta(x.trigrams[g]))}function termDocs(x,t){const V=x.tokens;let ids=[];if(t.length<3){for(let k=lowerBound(V.length,m=>V[m]>=t);k<V.length&&V[k].startsWith(t);k++)ids.push(k)}else{let c=null;for(let k=0;k+3<=t.length;k++){const g=t.slice(k,k+3);if(!x.trigrams[g])return new Int32Array(0);c=c?intersect(c,gram(x,g)):gram(x,g)}ids=[...c].filter(k=>V[k].includes(t))}return ids.length?union(ids.map(k=>post(x,k))):new Int32Array(0)}async function bound(p,strict){if(isNaN(p))return strict?M.count:0;const ok=v=>strict?v>p:v>=p,k=M.shards.findIndex(s=>ok(s.max));if(k<0)return M.count;const r=await shard(k);return M.shards[k].start+lowerBound(r.length,m=>ok(r[m][F.price_egp]))}async function apiFilters(my){Q=new URLSearchParams({q:e.search.value||'',source:e.source.value,min:e.minPrice.value,max:e.maxPrice.value}).toString();loaded.clear();pend.clear();const q=Q,r=await page(q,0);if(my!==seq)return;loaded.set(0,r.items.map(rowOf));res={length:r.total,get:k=>k};render()}async function applyFilters(){if(api)return apiFilters(++seq);const my=++seq,q=toks(e.search.value||''),s=e.source.value,a=await bound(parseFloat(e.minPrice.value),false),b=Math.max(a,await bound(parseFloat(e.maxPrice.value),true));let ids=null;if(q.length){const x=await index();for(const t of q){const d=termDocs(x,t);ids=ids?intersect(ids,d):d}}if(s){const d=await srcDocs(s);ids=ids?intersect(ids,d):d}if(my!==seq)return;if(ids){const i=lowerBound(ids.length,m=>ids[m]>=a),j=lowerBound(ids.length,m=>ids[m]>=b),v=ids.subarray(i,Math.max(i,j));res={length:v.length,get:k=>v[k]}}else res={length:b-a,get:k=>a+k};render()}function card(p){return`<article class='card'><img src='${esc(p[F.image_url])}' alt='${esc(p[F.name])}' loading='lazy'/><div class='body'><h3>${esc(p[F.name])}</h3><div class='price'>${fmt.format(p[F.price_egp]||0)}</div><div class='meta'><span>${esc(p[F.source])}</span>${p[F.group_size]>1?` • <span class='group'>${p[F.group_size]} offers: ${fmt.format(p[F.group_min]||0)} – ${fmt.format(p[F.group_max]||0)}</span>`:''}</div><a class='btn' href='${esc(p[F.url])}' target='_blank' rel='noopener'>View</a></div></article>`}function render(){e.count.textContent=`${res.length} products`;const cols=Math.max(1,Math.floor((e.view.clientWidth-GAP)/(MIN_W+GAP))),rows=Math.ceil(res.length/cols);e.view.style.height=rows*ROW+GAP+'px';const top=window.scrollY-e.view.offsetTop,r0=Math.max(0,Math.floor(top/ROW)-2),r1=Math.min(rows,Math.ceil((top+window.innerHeight)/ROW)+2),miss=new Set();let h='';for(let i=r0*cols;i<Math.min(res.length,r1*cols);i++){const d=res.get(i),k=Math.floor(d/M.shard_size),r=loaded.get(k);if(r)h+=card(r[d-k*M.shard_size]);else{miss.add(k);h+=`<article class='card ph'></article>`}}e.grid.style.transform=`translateY(${r0*ROW}px)`;e.grid.innerHTML=h;miss.forEach(k=>shard(k).then(schedule))}function schedule(){raf||(raf=requestAnimationFrame(()=>{raf=0;render()}))}function legacy(a){const f=['id','name','price_egp','currency','url','image_url','source'],R=a.filter(p=>p.price_egp!=null).sort((x,y)=>x.price_egp-y.price_egp||String(x.name).localeCompare(String(y.name))).map(p=>f.map(k=>p[k])),S={};R.forEach((r,d)=>(S[r[6]||'']=S[r[6]||'']||[]).push(d));M={count:R.length,fields:f,shard_size:Math.max(1,R.length),shards:[{start:0,count:R.length,max:R.length?R[R.length-1][2]:0}],sources:Object.fromEntries(Object.entries(S).map(([s,d])=>[s,{count:d.length}]))};loaded.set(0,R);Object.entries(S).forEach(([s,d])=>srcs[s]=Promise.resolve(Int32Array.from(d)));F=Object.fromEntries(f.map((k,i)=>[k,i]));idx=Promise.resolve(mkIndex(R))}async function load(){try{const m=await getJSON(A+'meta',{cache:'no-cache'});api=m.page_size;M={count:m.count,fields:m.fields,shard_size:api,sources:m.sources};F=Object.fromEntries(M.fields.map((k,i)=>[k,i]))}catch(_){try{M=await getJSON(B+'manifest.json',{cache:'no-cache'});F=Object.fromEntries(M.fields.map((k,i)=>[k,i]))}catch(err){legacy(await getJSON('data/products.json',{cache:'no-cache'}))}}e.source.innerHTML='<option value="">All stores</option>'+Object.entries(M.sources).map(([s,v])=>`<option value='${esc(s)}'>${esc(s)} (${v.count})</option>`).join('');applyFilters()}let tm=0;const debounced=()=>{clearTimeout(tm);tm=setTimeout(applyFilters,120)};e.search.addEventListener('input',debounced);['input','change'].forEach(t=>{e.source.addEventListener(t,applyFilters);e.minPrice.addEventListener(t,debounced);e.maxPrice.addEventListener(t,debounced)});window.addEventListener('scroll',schedule,{passive:true});window.addEventListener('resize',schedule);e.clear.addEventListener('click',()=>{e.search.value='';e.source.value='';e.minPrice.value='';e.maxPrice.value='';applyFilters()});load()
\ No newline at end of file